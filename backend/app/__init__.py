@@ -1,13 +1,22 @@
-from flask import Flask, make_response, jsonify
+import hmac
+from flask import Flask, Response, request
+from app.utils.json_provider import OrjsonProvider, jsonify
 from flask_cors import CORS
 from app.config import Config
+from app.database import db
 from app.routers.auth import auth_bp
 from app.routers.role import role_bp
 from app.routers.user import user_bp
 from app.routers.category import category_bp
 from app.routers.material import material_bp
 from app.routers.blob import blob_bp
-import orjson
+from app.routers.comment import comment_bp
+from app.services.upload_service import UploadSweeper
+from app.services.blob_job_service import BlobJobService, BlobJobWorker
+from app.services.material import content_cache
+from app.utils.token_cache import TokenVersionRefresher, token_versions
+from app.utils.metrics import PROMETHEUS_MIMETYPE, install_request_metrics, request_metrics
+import multiprocessing
 
 
 def create_app(config_name=None):
@@ -18,13 +27,9 @@ def create_app(config_name=None):
     app.config['JSONIFY_MIMETYPE'] = "application/json; charset=utf-8"
     app.config['JSON_SORT_KEYS'] = False
     
-    # Enhanced JSON response handling
-    @app.after_request
-    def after_request(response):
-        if response.mimetype == "application/json":
-            response.headers["Content-Type"] = "application/json; charset=utf-8"
-        return response
-    
+    # 使用 orjson 进行 JSON 序列化，响应头直接带上 charset，无需在 after_request 中改写
+    app.json = OrjsonProvider(app)
+
     # 加载其他配置
     app.config.from_object(Config)
     
@@ -34,11 +39,47 @@ def create_app(config_name=None):
     # 配置上传文件夹
     app.config['UPLOAD_FOLDER'] = 'uploads'
     
-    # 使用 orjson 进行 JSON 序列化
+    # 请求性能指标，需先于连接池钩子注册，借出连接的等待时间计入请求耗时
+    if app.config['METRICS_ENABLED']:
+        install_request_metrics(app, request_metrics, db, app.config['METRICS_SERVER_TIMING'])
+
+    # 每个请求从连接池借出一个连接，请求结束时归还
+    @app.before_request
+    def _db_connect():
+        db.connect(reuse_if_open=True)
+
+    @app.teardown_request
+    def _db_close(exc):
+        if not db.is_closed():
+            db.close()
+
     # 服务检测
     @app.route('/', methods=['GET'])
     def health():
         return 'OK'
+
+    # 连接池指标
+    @app.route('/health/db', methods=['GET'])
+    def db_health():
+        return jsonify(db.pool_stats())
+
+    # 教材内容缓存指标
+    @app.route('/health/cache', methods=['GET'])
+    def cache_health():
+        return jsonify(content_cache.stats())
+
+    # 上传后处理任务队列指标
+    @app.route('/health/jobs', methods=['GET'])
+    def jobs_health():
+        return jsonify(BlobJobService.stats())
+    
+    # Prometheus 格式的指标，包括各路由的请求指标、连接池和教材内容缓存状态
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        token = app.config['METRICS_TOKEN']
+        if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return jsonify({'error': 'Unauthorized'}), 401
+        return Response(request_metrics.render(_runtime_gauges()), content_type=PROMETHEUS_MIMETYPE)
     
     # 注册蓝图
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -47,5 +88,47 @@ def create_app(config_name=None):
     app.register_blueprint(category_bp, url_prefix='/api/category')
     app.register_blueprint(material_bp, url_prefix='/api/material')
     app.register_blueprint(blob_bp, url_prefix='/api/blob')
+    app.register_blueprint(comment_bp, url_prefix='/api/comment')
     
-    return app
\ No newline at end of file
+    # 后台线程只在主进程中启动；以 spawn 方式创建的工作进程(如密码哈希进程池)会重新导入入口模块
+    background = multiprocessing.parent_process() is None
+
+    # 后台清理过期的分片上传会话
+    if background and app.config['UPLOAD_SWEEP_INTERVAL'] > 0:
+        app.upload_sweeper = UploadSweeper(app, app.config['UPLOAD_SWEEP_INTERVAL'])
+        app.upload_sweeper.start()
+
+    # 后台执行上传后处理任务，也可以设置为 0 并单独运行 scripts/blob_worker.py
+    if background and app.config['BLOB_JOB_POLL_INTERVAL'] > 0:
+        app.blob_job_worker = BlobJobWorker(
+            app, app.config['BLOB_JOB_POLL_INTERVAL'], app.config['BLOB_JOB_LOCK_TIMEOUT']
+        )
+        app.blob_job_worker.start()
+
+    # 后台刷新 token 版本号映射，其他进程中的吊销/角色变更在一个刷新周期内生效
+    if background and app.config['TOKEN_VERSION_REFRESH_INTERVAL'] > 0:
+        app.token_version_refresher = TokenVersionRefresher(
+            app, token_versions, app.config['TOKEN_VERSION_REFRESH_INTERVAL']
+        )
+        app.token_version_refresher.start()
+    
+    return app
+
+
+def _runtime_gauges() -> dict:
+    """连接池和教材内容缓存的当前状态"""
+    pool = db.pool_stats()
+    cache = content_cache.stats()['local']
+    return {
+        'db_pool_connections_in_use': ('gauge', pool['in_use']),
+        'db_pool_connections_idle': ('gauge', pool['idle']),
+        'db_pool_max_connections': ('gauge', pool['max_connections']),
+        'db_pool_checkouts_total': ('counter', pool['checkouts']),
+        'db_pool_timeouts_total': ('counter', pool['timeouts']),
+        'db_pool_wait_seconds_total': ('counter', pool['wait_time_total']),
+        'content_cache_bytes': ('gauge', cache['bytes']),
+        'content_cache_items': ('gauge', cache['items']),
+        'content_cache_hits_total': ('counter', cache['hits']),
+        'content_cache_misses_total': ('counter', cache['misses']),
+        'content_cache_evictions_total': ('counter', cache['evictions']),
+    }
\ No newline at end of file
@@ -10,15 +10,91 @@ class Config:
     DB_USER = os.getenv('DB_USER', 'root')
     DB_PASSWORD = os.getenv('DB_PASSWORD', 'password')
     DB_NAME = os.getenv('DB_NAME', 'teaching_material')
+
+    # 数据库引擎: mysql(默认) / sqlite(本地压测连接池用)
+    DB_ENGINE = os.getenv('DB_ENGINE', 'mysql')
+    DB_SQLITE_PATH = os.getenv('DB_SQLITE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'local.db'))
+
+    # 连接池配置
+    DB_MAX_CONNECTIONS = int(os.getenv('DB_MAX_CONNECTIONS', 20))  # 最大连接数
+    DB_STALE_TIMEOUT = int(os.getenv('DB_STALE_TIMEOUT', 300))  # 连接存活超过该秒数后回收重建
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 10))  # 连接池耗尽时最长等待秒数
     
     # JWT配置
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'your-jwt-secret-key')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
+    JWT_VERIFY_CACHE_TTL = int(os.getenv('JWT_VERIFY_CACHE_TTL', 300))  # 已验签 token 的缓存时间(秒)，0 表示不缓存
+    JWT_VERIFY_CACHE_SIZE = int(os.getenv('JWT_VERIFY_CACHE_SIZE', 10000))
+    TOKEN_VERSION_REFRESH_INTERVAL = int(os.getenv('TOKEN_VERSION_REFRESH_INTERVAL', 30))  # token 版本号映射的刷新间隔(秒)，0 表示不启动
+
+    # 密码哈希: 算法(pbkdf2/bcrypt)及成本，修改后用户下次登录时自动按新参数重新哈希
+    PASSWORD_HASH_ALGORITHM = os.getenv('PASSWORD_HASH_ALGORITHM', 'pbkdf2')
+    PASSWORD_PBKDF2_ITERATIONS = int(os.getenv('PASSWORD_PBKDF2_ITERATIONS', 260000))
+    PASSWORD_BCRYPT_ROUNDS = int(os.getenv('PASSWORD_BCRYPT_ROUNDS', 12))
+    # 哈希计算使用的进程数，0 表示在请求线程中直接计算
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 32))  # 超过该排队数时返回 429
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))
+    USER_IMPORT_MAX_ROWS = int(os.getenv('USER_IMPORT_MAX_ROWS', 5000))  # 批量导入用户的单次上限
+    
+    # 教材检索后端: mysql(FULLTEXT + ngram) / memory(进程内倒排索引，用于 SQLite 和本地测试)
+    SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'memory' if DB_ENGINE == 'sqlite' else 'mysql')
+    SEARCH_MAX_HITS = int(os.getenv('SEARCH_MAX_HITS', 300))  # memory 后端最多返回的命中数(按相关度取前 N 条，SQLite 3.32 之前单条语句最多 999 个参数)
+    
+    # 分类树缓存: 两次检查共享版本号之间的最短间隔(秒)，0 表示每个请求都检查
+    CATEGORY_CACHE_CHECK_INTERVAL = float(os.getenv('CATEGORY_CACHE_CHECK_INTERVAL', 1))
     
     # 文件上传配置
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB 
 
+    # 文件存储后端: local(本地磁盘 UPLOAD_FOLDER) / s3(S3 兼容对象存储，需安装 boto3)
+    BLOB_STORE = os.getenv('BLOB_STORE', 'local')
+    BLOB_FANOUT_DEPTH = int(os.getenv('BLOB_FANOUT_DEPTH', 1))  # 按 sha256 前缀分目录的层数，每层两个字符
+    BLOB_S3_BUCKET = os.getenv('BLOB_S3_BUCKET', 'teaching-material')
+    BLOB_S3_PREFIX = os.getenv('BLOB_S3_PREFIX', 'blobs')
+    BLOB_S3_ENDPOINT_URL = os.getenv('BLOB_S3_ENDPOINT_URL', '')  # MinIO 等本地服务的地址
+    BLOB_S3_REGION = os.getenv('BLOB_S3_REGION', '')
+    BLOB_S3_ACCESS_KEY = os.getenv('BLOB_S3_ACCESS_KEY', '')
+    BLOB_S3_SECRET_KEY = os.getenv('BLOB_S3_SECRET_KEY', '')
+    BLOB_PRESIGN_EXPIRES = int(os.getenv('BLOB_PRESIGN_EXPIRES', 3600))  # 预签名下载地址有效期(秒)
+
+    # 教材内容缓存: 进程内 LRU(按字节数淘汰) + 可选的 Redis 共享层
+    CONTENT_CACHE_MAX_BYTES = int(os.getenv('CONTENT_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    CONTENT_CACHE_MAX_ITEM_BYTES = int(os.getenv('CONTENT_CACHE_MAX_ITEM_BYTES', 4 * 1024 * 1024))  # 超过该大小的内容不缓存
+    CONTENT_CACHE_REDIS_URL = os.getenv('CONTENT_CACHE_REDIS_URL', '')  # 为空时不启用共享层
+    CONTENT_CACHE_SHARED_TTL = int(os.getenv('CONTENT_CACHE_SHARED_TTL', 24 * 3600))
+
+    # 文件预览: 由前置的 nginx/Apache 直接发送文件内容
+    # BLOB_SENDFILE_MODE 为空时由 Python 进程发送; x-accel 使用 nginx 的 X-Accel-Redirect; x-sendfile 使用 Apache/lighttpd 的 X-Sendfile
+    BLOB_SENDFILE_MODE = os.getenv('BLOB_SENDFILE_MODE', '')
+    BLOB_ACCEL_PREFIX = os.getenv('BLOB_ACCEL_PREFIX', '/protected-uploads/')  # nginx 中映射到上传目录的 internal location
+    BLOB_MAX_RANGES = int(os.getenv('BLOB_MAX_RANGES', 16))  # 单个请求允许的最大 Range 数量，超过时返回整个文件
+
+    # 分片上传配置 (分片以原始请求体流式写入，MAX_CONTENT_LENGTH 对其不生效，由 UPLOAD_MAX_PART_SIZE 限制)
+    UPLOAD_PART_SIZE = int(os.getenv('UPLOAD_PART_SIZE', 8 * 1024 * 1024))  # 建议分片大小 8MB
+    UPLOAD_MAX_PART_SIZE = int(os.getenv('UPLOAD_MAX_PART_SIZE', MAX_CONTENT_LENGTH))  # 单个分片最大字节数，超过时中止写入
+    UPLOAD_MAX_FILE_SIZE = int(os.getenv('UPLOAD_MAX_FILE_SIZE', 4 * 1024 * 1024 * 1024))  # 单个文件最大 4GB
+    UPLOAD_MAX_PARTS = int(os.getenv('UPLOAD_MAX_PARTS', 10000))
+    UPLOAD_SESSION_TTL = timedelta(hours=int(os.getenv('UPLOAD_SESSION_TTL_HOURS', 24)))  # 会话无活动后过期
+    UPLOAD_SWEEP_INTERVAL = int(os.getenv('UPLOAD_SWEEP_INTERVAL', 600))  # 清理过期会话的间隔(秒)，0 表示不启动
+
+    # 上传后处理任务(缩略图/文本提取/元数据)，任务队列保存在 blob_jobs 表中
+    BLOB_JOB_POLL_INTERVAL = int(os.getenv('BLOB_JOB_POLL_INTERVAL', 5))  # 进程内 worker 的轮询间隔(秒)，0 表示不启动，由 scripts/blob_worker.py 单独处理
+    BLOB_JOB_MAX_ATTEMPTS = int(os.getenv('BLOB_JOB_MAX_ATTEMPTS', 5))
+    BLOB_JOB_RETRY_DELAY = int(os.getenv('BLOB_JOB_RETRY_DELAY', 30))  # 首次重试的延迟(秒)，之后按 2 的幂次递增
+    BLOB_JOB_LOCK_TIMEOUT = int(os.getenv('BLOB_JOB_LOCK_TIMEOUT', 600))  # 任务执行超过该时间视为 worker 已退出，重新排队
+    THUMBNAIL_SIZE = int(os.getenv('THUMBNAIL_SIZE', 320))  # 缩略图最长边(像素)
+    THUMBNAIL_QUALITY = int(os.getenv('THUMBNAIL_QUALITY', 80))  # 缩略图 JPEG 质量
+    TEXT_EXTRACT_MAX_CHARS = int(os.getenv('TEXT_EXTRACT_MAX_CHARS', 1000000))  # 提取文本的最大字符数
+
+    # 请求性能指标: /metrics (Prometheus 格式)、Server-Timing 响应头和慢请求日志
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')  # 非空时抓取 /metrics 需携带 Authorization: Bearer <token>
+    METRICS_SERVER_TIMING = os.getenv('METRICS_SERVER_TIMING', 'false').lower() == 'true'  # 响应头会向所有客户端暴露内部耗时，仅在排查问题时开启
+    METRICS_SLOW_REQUEST_MS = int(os.getenv('METRICS_SLOW_REQUEST_MS', 1000))  # 超过该耗时的请求记录日志
+    METRICS_SLOW_SQL_LIMIT = int(os.getenv('METRICS_SLOW_SQL_LIMIT', 50))  # 慢请求日志中最多记录的 SQL 条数
+
     # JSON配置
     JSON_AS_ASCII = False  # 让jsonify正确显示中文
     JSONIFY_MIMETYPE = "application/json; charset=utf-8"  # 指定响应的 MIME 类型和字符集
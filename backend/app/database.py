@@ -1,11 +1,139 @@
-from peewee import MySQLDatabase
+import threading
+import time
+from typing import Any, Callable, List
+from peewee import SENTINEL
+from playhouse.pool import PooledMySQLDatabase, PooledSqliteDatabase, MaxConnectionsExceeded
 from app.config import Config
 
-db = MySQLDatabase(
-    Config.DB_NAME,
-    user=Config.DB_USER,
-    password=Config.DB_PASSWORD,
-    host=Config.DB_HOST,
-    port=Config.DB_PORT,
-    charset='utf8mb4'
-)
+
+class PoolMetricsMixin:
+    """
+    为 peewee 连接池增加运行指标：借出次数、等待时间、超时次数。
+    占用/空闲连接数直接读取连接池内部状态。
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._metrics_lock = threading.Lock()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        super().__init__(*args, **kwargs)
+
+    def connect(self, reuse_if_open=False):
+        # 当前线程已持有连接时不算一次借出
+        if reuse_if_open and not self.is_closed():
+            return super().connect(reuse_if_open)
+
+        start = time.perf_counter()
+        try:
+            result = super().connect(reuse_if_open)
+        except MaxConnectionsExceeded:
+            with self._metrics_lock:
+                self._timeouts += 1
+            raise
+
+        waited = time.perf_counter() - start
+        with self._metrics_lock:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return result
+
+    def pool_stats(self) -> dict:
+        """返回连接池指标快照"""
+        with self._lock:
+            in_use = len(self._in_use)
+            idle = len(self._connections)
+        with self._metrics_lock:
+            checkouts = self._checkouts
+            wait_total = self._wait_total
+            wait_max = self._wait_max
+            timeouts = self._timeouts
+        return {
+            'in_use': in_use,
+            'idle': idle,
+            'max_connections': self._max_connections,
+            'checkouts': checkouts,
+            'timeouts': timeouts,
+            'wait_time_total': round(wait_total, 6),
+            'wait_time_avg': round(wait_total / checkouts, 6) if checkouts else 0.0,
+            'wait_time_max': round(wait_max, 6),
+        }
+
+
+class QueryListenerMixin:
+    """
+    在每条 SQL 执行后回调已注册的监听函数: listener(sql, params, elapsed)
+    用于统计查询次数/耗时，未注册监听时没有额外开销
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._query_listeners: List[Callable[[str, Any, float], None]] = []
+        super().__init__(*args, **kwargs)
+
+    def add_query_listener(self, listener: Callable[[str, Any, float], None]) -> None:
+        # 复制后替换，执行 SQL 的线程遍历时无需加锁
+        self._query_listeners = self._query_listeners + [listener]
+
+    def remove_query_listener(self, listener: Callable[[str, Any, float], None]) -> None:
+        self._query_listeners = [item for item in self._query_listeners if item is not listener]
+
+    def notify_query(self, sql: str, params: Any, elapsed: float) -> None:
+        """绕过 execute_sql 直接在游标上执行的 SQL(如服务端游标)通过此方法上报"""
+        for listener in self._query_listeners:
+            listener(sql, params, elapsed)
+
+    def execute_sql(self, sql, params=None, commit=SENTINEL):
+        listeners = self._query_listeners
+        if not listeners:
+            return super().execute_sql(sql, params, commit)
+
+        start = time.perf_counter()
+        try:
+            return super().execute_sql(sql, params, commit)
+        finally:
+            elapsed = time.perf_counter() - start
+            for listener in listeners:
+                listener(sql, params, elapsed)
+
+
+class InstrumentedPooledMySQLDatabase(QueryListenerMixin, PoolMetricsMixin, PooledMySQLDatabase):
+    pass
+
+
+class InstrumentedPooledSqliteDatabase(QueryListenerMixin, PoolMetricsMixin, PooledSqliteDatabase):
+    pass
+
+
+def create_database(config=Config):
+    """
+    根据配置创建带连接池的数据库对象
+    DB_ENGINE=sqlite 时使用本地 SQLite 文件，便于在没有 MySQL 的环境下压测连接池
+    """
+    pool_options = {
+        'max_connections': config.DB_MAX_CONNECTIONS,
+        'stale_timeout': config.DB_STALE_TIMEOUT,
+        'timeout': config.DB_POOL_TIMEOUT,
+    }
+
+    if config.DB_ENGINE == 'sqlite':
+        return InstrumentedPooledSqliteDatabase(
+            config.DB_SQLITE_PATH,
+            pragmas={'journal_mode': 'wal', 'busy_timeout': 5000},
+            check_same_thread=False,
+            **pool_options
+        )
+
+    return InstrumentedPooledMySQLDatabase(
+        config.DB_NAME,
+        user=config.DB_USER,
+        password=config.DB_PASSWORD,
+        host=config.DB_HOST,
+        port=config.DB_PORT,
+        charset='utf8mb4',
+        **pool_options
+    )
+
+
+db = create_database()
@@ -15,3 +15,10 @@ class ValidationException(Exception):
     def __init__(self, message: str):
         self.message = message
         super().__init__(self.message)
+
+class TooManyRequestsException(Exception):
+    """Exception raised when a bounded resource is saturated"""
+    def __init__(self, message: str, retry_after: int = 1):
+        self.message = message
+        self.retry_after = retry_after
+        super().__init__(self.message)
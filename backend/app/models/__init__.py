@@ -1,7 +1,10 @@
 from app.models.base import  BaseModel
 from app.models.user import User
 from app.models.role import Role
-from app.models.category import Category
+from app.models.category import Category, CategoryClosure
 from app.models.blob import Blob
-from app.models.material import Material
+from app.models.material import Material, MaterialCategory
 from app.models.comment import Comment
+from app.models.cache_generation import CacheGeneration
+from app.models.upload_session import UploadSession, UploadPart
+from app.models.blob_job import BlobJob
@@ -7,7 +7,8 @@ class Blob(BaseModel):
     file_path = CharField()
     mime_type = CharField()
     file_size = BigIntegerField()  # 使用BigIntegerField存储文件大小
-    sha256 = CharField()
+    sha256 = CharField(unique=True)
+    ref_count = IntegerField(default=0)  # 引用该文件的教材数量
     created_by = ForeignKeyField(User, null=True, on_delete='SET NULL', column_name='created_by')
     updated_by = ForeignKeyField(User, null=True, on_delete='SET NULL', column_name='updated_by')
     class Meta:
@@ -0,0 +1,29 @@
+from datetime import datetime
+from peewee import *
+from playhouse.mysql_ext import JSONField
+from app.models.base import BaseModel
+from app.models.blob import Blob
+
+class BlobJob(BaseModel):
+    """
+    上传后的异步处理任务(缩略图/文本提取/元数据)
+    以 (sha256, kind) 唯一，相同内容的文件只处理一次，源 blob 删除后结果仍可复用
+    """
+    sha256 = CharField()
+    kind = CharField()  # thumbnail / text / metadata
+    blob = ForeignKeyField(Blob, null=True, backref='jobs', on_delete='SET NULL', column_name='blob_id')
+    status = CharField(default='pending')  # pending / running / succeeded / failed / skipped
+    attempts = IntegerField(default=0)
+    max_attempts = IntegerField(default=5)
+    run_after = DateTimeField(default=datetime.now)  # 重试时推迟到该时间之后再执行
+    locked_by = CharField(null=True)  # 正在执行该任务的 worker
+    locked_at = DateTimeField(null=True)
+    last_error = TextField(null=True)
+    result = JSONField(null=True)  # 元数据等结构化结果
+    result_blob = ForeignKeyField(Blob, null=True, backref='+', on_delete='SET NULL', column_name='result_blob_id')  # 缩略图/文本等生成的文件
+    class Meta:
+        table_name = 'blob_jobs'
+        indexes = (
+            (('sha256', 'kind'), True),
+            (('status', 'run_after'), False),
+        )
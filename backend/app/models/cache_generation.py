@@ -0,0 +1,10 @@
+from peewee import *
+from app.database import db
+
+class CacheGeneration(Model):
+    """进程间共享的缓存版本号，写操作递增，各进程据此判断本地缓存是否过期"""
+    name = CharField(primary_key=True)
+    generation = BigIntegerField(default=0)
+    class Meta:
+        database = db
+        table_name = 'cache_generations'
@@ -1,4 +1,5 @@
 from peewee import *
+from app.database import db
 from app.models.base import BaseModel
 from app.models.user import User
 
@@ -8,4 +9,17 @@ class Category(BaseModel):
     created_by = ForeignKeyField(User, null=True, on_delete='SET NULL', column_name='created_by')
     updated_by = ForeignKeyField(User, null=True, on_delete='SET NULL', column_name='updated_by')
     class Meta:
-        table_name = 'categories' 
\ No newline at end of file
+        table_name = 'categories'
+
+class CategoryClosure(Model):
+    """分类闭包表: 每个分类与其所有祖先(包括自身, depth=0)各占一行"""
+    ancestor = IntegerField()
+    descendant = IntegerField()
+    depth = IntegerField()
+    class Meta:
+        database = db
+        table_name = 'category_closure'
+        primary_key = CompositeKey('ancestor', 'descendant')
+        indexes = (
+            (('descendant', 'ancestor'), True),
+        )
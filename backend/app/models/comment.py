@@ -12,4 +12,8 @@ class Comment(BaseModel):
     updated_by = ForeignKeyField(User, null=True, on_delete='SET NULL', column_name='updated_by')
 
     class Meta:
-        table_name = 'comments' 
\ No newline at end of file
+        table_name = 'comments'
+        indexes = (
+            # 按教材读取评论并按时间游标翻页(InnoDB 二级索引隐含主键 id)
+            (('material', 'created_at'), False),
+        ) 
\ No newline at end of file
@@ -1,16 +1,18 @@
 from peewee import *
+from app.database import db
 from app.models.base import BaseModel
 from app.models.blob import Blob
 from app.models.user import User
 
 class Material(BaseModel):
     display_name = CharField()
-    category_ids = CharField()  # 存储为逗号分隔的ID字符串
+    category_ids = CharField()  # 存储为逗号分隔的ID字符串，保存时同步到 material_categories
     blob_id = ForeignKeyField(Blob, backref='materials')
     description = TextField(null=True)
-    cover = TextField(null=True)  # 封面图片路径
+    cover_blob_id = ForeignKeyField(Blob, null=True, backref='+', on_delete='SET NULL', column_name='cover_blob_id')  # 封面图片
     material_type = CharField(null=True)
     publish_status = CharField(null=True, default='private')
+    comment_count = IntegerField(default=0)  # 评论数，随评论增删原子更新
     created_by = ForeignKeyField(User, null=True, on_delete='SET NULL', column_name='created_by')
     updated_by = ForeignKeyField(User, null=True, on_delete='SET NULL', column_name='updated_by')
     class Meta:
@@ -18,8 +20,47 @@ class Material(BaseModel):
 
     def get_category_ids(self):
         """将category_ids字符串转换为列表"""
-        return [int(id_) for id_ in self.category_ids.split(',') if id_]
+        return parse_category_ids(self.category_ids)
 
     def set_category_ids(self, ids):
         """将分类ID列表转换为字符串存储"""
-        self.category_ids = ','.join(str(id_) for id_ in ids) 
\ No newline at end of file
+        self.category_ids = ','.join(str(id_) for id_ in ids)
+
+    def save(self, *args, **kwargs):
+        sync_categories = 'category_ids' in self._dirty
+        with self._meta.database.atomic():
+            result = super().save(*args, **kwargs)
+            if sync_categories:
+                MaterialCategory.replace_for(self.id, self.get_category_ids())
+        return result
+
+class MaterialCategory(Model):
+    """教材与分类的多对多关联"""
+    material_id = IntegerField()
+    category_id = IntegerField()
+    class Meta:
+        database = db
+        table_name = 'material_categories'
+        primary_key = CompositeKey('material_id', 'category_id')
+        indexes = (
+            (('category_id', 'material_id'), True),
+        )
+
+    @classmethod
+    def replace_for(cls, material_id, category_ids):
+        """用给定的分类ID替换某个教材的全部关联"""
+        cls.delete().where(cls.material_id == material_id).execute()
+        if category_ids:
+            cls.insert_many(
+                [{'material_id': material_id, 'category_id': category_id} for category_id in set(category_ids)]
+            ).execute()
+
+def parse_category_ids(value, skip_invalid=False):
+    """
+    解析逗号分隔的分类ID字符串，含非数字内容时抛出 ValueError
+    :param skip_invalid: 忽略非数字的片段，用于读取历史数据中可能存在的脏值
+    """
+    tokens = [id_.strip() for id_ in (value or '').split(',') if id_.strip()]
+    if skip_invalid:
+        return [int(id_) for id_ in tokens if id_.isdigit()]
+    return [int(id_) for id_ in tokens]
@@ -0,0 +1,31 @@
+from peewee import *
+from app.models.base import BaseModel
+from app.models.blob import Blob
+from app.models.user import User
+
+class UploadSession(BaseModel):
+    """分片上传会话，保存在数据库中以便进程重启后继续上传"""
+    upload_id = CharField(unique=True)
+    file_name = CharField()
+    mime_type = CharField()
+    total_size = BigIntegerField(null=True)  # 客户端声明的文件总大小，可为空
+    part_size = IntegerField()
+    status = CharField(default='uploading')  # uploading / completed
+    blob = ForeignKeyField(Blob, null=True, on_delete='SET NULL', column_name='blob_id')
+    expires_at = DateTimeField(index=True)
+    created_by = ForeignKeyField(User, null=True, on_delete='SET NULL', column_name='created_by')
+    updated_by = ForeignKeyField(User, null=True, on_delete='SET NULL', column_name='updated_by')
+    class Meta:
+        table_name = 'upload_sessions'
+
+class UploadPart(BaseModel):
+    """已接收的分片，分片内容直接写在磁盘上"""
+    session = ForeignKeyField(UploadSession, backref='parts', on_delete='CASCADE', column_name='session_id')
+    part_number = IntegerField()
+    size = BigIntegerField()
+    sha256 = CharField()
+    class Meta:
+        table_name = 'upload_parts'
+        indexes = (
+            (('session', 'part_number'), True),
+        )
@@ -7,6 +7,17 @@ class User(BaseModel):
     password = CharField()
     role_id = IntegerField()
     avatar = CharField(null=True)
+    # 修改角色/密码或吊销登录时递增，旧版本号签发的 token 随即失效
+    token_version = IntegerField(default=0)
+    created_by = ForeignKeyField('self', null=True, backref='+', on_delete='SET NULL', column_name='created_by')
+    updated_by = ForeignKeyField('self', null=True, backref='+', on_delete='SET NULL', column_name='updated_by')
+
+    # 序列化时不输出的字段
+    hidden_fields = ('password',)
     
     class Meta:
-        table_name = 'users' 
\ No newline at end of file
+        table_name = 'users'
+        indexes = (
+            # 按角色筛选并按ID游标翻页
+            (('role_id', 'id'), False),
+        ) 
\ No newline at end of file
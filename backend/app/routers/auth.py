@@ -1,7 +1,9 @@
-from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Blueprint, request
+from app.utils.json_provider import jsonify
 from app.models.user import User
 from app.utils.jwt import create_access_token
+from app.services.password_service import password_hasher, password_too_long
+from app.exceptions.customer_exceptions import TooManyRequestsException
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -12,8 +14,14 @@ def login():
     password = data.get('password')
     
     user = User.get_or_none(User.username == username)
-    if user and check_password_hash(user.password, password):
-        access_token = create_access_token(identity=user.id)
+    try:
+        verified = user is not None and password_hasher.verify(password, user.password)
+    except TooManyRequestsException as e:
+        return jsonify({'message': str(e)}), 429, {'Retry-After': str(e.retry_after)}
+
+    if verified:
+        _rehash_if_needed(user, password)
+        access_token = create_access_token(identity=user.id, role_id=user.role_id, token_version=user.token_version)
         return jsonify({
             'access_token': access_token,
             'user': {
@@ -22,4 +30,19 @@ def login():
                 'role_id': user.role_id
             }
         }), 200
-    return jsonify({'message': '用户名或密码错误'}), 401 
\ No newline at end of file
+    return jsonify({'message': '用户名或密码错误'}), 401
+
+def _rehash_if_needed(user: User, password: str) -> None:
+    """哈希算法或成本配置变更后，登录成功时按新参数重新哈希"""
+    if not password_hasher.needs_rehash(user.password) or password_too_long(password):
+        # 超长密码只能保留旧哈希，无法按 bcrypt 重新哈希
+        return
+    try:
+        password_hash = password_hasher.hash(password)
+    except TooManyRequestsException:
+        # 繁忙时跳过，下次登录再处理
+        return
+    # 仅在密码未被并发修改时更新
+    User.update(password=password_hash).where(
+        (User.id == user.id) & (User.password == user.password)
+    ).execute()
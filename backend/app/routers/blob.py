@@ -1,8 +1,12 @@
-from flask import Blueprint, request, jsonify, send_file, current_app
+from flask import Blueprint, request
+from app.utils.json_provider import jsonify
 from app.utils.jwt import jwt_required
 from app.services.blob_service import BlobService
+from app.services.upload_service import UploadService
+from app.services.blob_job_service import BlobJobService
+from app.utils.blob_response import send_blob
+from app.exceptions.customer_exceptions import NotFoundException, ValidationException, BadRequestException
 from werkzeug.utils import secure_filename
-import os
 import mimetypes
 
 blob_bp = Blueprint('blob', __name__)
@@ -13,34 +17,27 @@ MAX_FILE_SIZE = 2 * 1024 * 1024  # 2MB in bytes
 @blob_bp.route('/upload', methods=['POST'])
 @jwt_required()
 def upload_file():
-    """上传文件"""
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file part'}), 400
-    
-    file = request.files['file']
-    if file.filename == '':
+    """
+    上传文件: multipart 表单中的 file，或原始请求体(文件名由 file_name 参数给出)
+    表单文件会先被 werkzeug 缓存一遍；原始请求体直接边读边写入，只经过一次
+    """
+    if request.mimetype == 'multipart/form-data':
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file part'}), 400
+        file = request.files['file']
+        filename, stream, content_type = file.filename, file.stream, file.content_type
+    else:
+        filename, stream, content_type = request.args.get('file_name', ''), request.stream, request.mimetype
+    if not filename:
         return jsonify({'error': 'No selected file'}), 400
 
-    # 检查文件大小
-    file.seek(0, os.SEEK_END)
-    file_size = file.tell()
-    file.seek(0)
-    
-    if file_size > MAX_FILE_SIZE:
-        return jsonify({'error': 'File size exceeds 2MB limit'}), 400
-
     try:
         # 获取文件信息
-        filename = secure_filename(file.filename)
-        mime_type = file.content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
-
-        # 创建临时文件
-        temp_path = os.path.join(current_app.config['UPLOAD_FOLDER'], 'temp', filename)
-        os.makedirs(os.path.dirname(temp_path), exist_ok=True)
-        file.save(temp_path)
+        filename = secure_filename(filename)
+        mime_type = content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
 
-        # 创建blob记录
-        blob = BlobService.create_blob(temp_path, filename, mime_type)
+        # 边读边写入临时文件并计算哈希，超过大小限制时中止
+        blob = BlobService.ingest_stream(stream, filename, mime_type, max_size=MAX_FILE_SIZE)
         
         return jsonify({
             'id': blob.id,
@@ -50,24 +47,16 @@ def upload_file():
         }), 201
 
     except Exception as e:
-        # 清理临时文件
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
         return jsonify({'error': str(e)}), 400
 
 @blob_bp.route('/preview/<int:blob_id>', methods=['GET'])
 def get_file(blob_id):
-    """获取文件内容"""
+    """获取文件内容，支持条件请求和 Range 请求"""
     try:
         blob = BlobService.get_blob(blob_id)
-        if not blob:
-            return jsonify({'error': 'File not found'}), 404
-
-        return send_file(
-            blob.file_path,
-            mimetype=blob.mime_type,
-            as_attachment=False
-        )
+        return send_blob(blob)
+    except NotFoundException as e:
+        return jsonify({'error': 'File not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
@@ -79,4 +68,81 @@ def delete_file(blob_id):
         BlobService.delete_blob(blob_id)
         return '', 204
     except Exception as e:
-        return jsonify({'error': str(e)}), 400 
\ No newline at end of file
+        return jsonify({'error': str(e)}), 400 
+
+@blob_bp.route('/<int:blob_id>/jobs', methods=['GET'])
+@jwt_required()
+def get_blob_jobs(blob_id):
+    """查询文件的后台处理任务(缩略图/文本提取/元数据)状态，生成的文件可通过 /preview/<result_blob_id> 访问"""
+    try:
+        return jsonify(BlobJobService.get_jobs(blob_id)), 200
+    except NotFoundException as e:
+        return jsonify({'error': str(e)}), 404
+
+@blob_bp.route('/<int:blob_id>/jobs/retry', methods=['POST'])
+@jwt_required(allowed_roles=[1, 2])
+def retry_blob_jobs(blob_id):
+    """重新执行失败或跳过的处理任务"""
+    try:
+        return jsonify(BlobJobService.retry(blob_id)), 200
+    except NotFoundException as e:
+        return jsonify({'error': str(e)}), 404
+
+@blob_bp.route('/uploads', methods=['POST'])
+@jwt_required()
+def initiate_upload():
+    """创建分片上传会话"""
+    try:
+        data = request.get_json() or {}
+        total_size = data.get('total_size')
+        session = UploadService.initiate(
+            file_name=data.get('file_name'),
+            mime_type=data.get('mime_type'),
+            total_size=int(total_size) if total_size is not None else None,
+            current_user_id=request.user_id
+        )
+        return jsonify(session), 201
+    except (ValidationException, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+@blob_bp.route('/uploads/<upload_id>/parts/<int:part_number>', methods=['PUT'])
+@jwt_required()
+def upload_part(upload_id, part_number):
+    """上传一个分片，请求体为分片的原始字节"""
+    try:
+        part = UploadService.put_part(upload_id, part_number, request.stream, request.user_id)
+        return jsonify(part), 200
+    except NotFoundException as e:
+        return jsonify({'error': str(e)}), 404
+    except (ValidationException, BadRequestException) as e:
+        return jsonify({'error': str(e)}), 400
+
+@blob_bp.route('/uploads/<upload_id>', methods=['GET'])
+@jwt_required()
+def get_upload(upload_id):
+    """查询上传会话及已接收的分片"""
+    try:
+        return jsonify(UploadService.describe(upload_id, request.user_id)), 200
+    except NotFoundException as e:
+        return jsonify({'error': str(e)}), 404
+
+@blob_bp.route('/uploads/<upload_id>/complete', methods=['POST'])
+@jwt_required()
+def complete_upload(upload_id):
+    """合并分片并生成blob"""
+    try:
+        return jsonify(UploadService.complete(upload_id, request.user_id)), 200
+    except NotFoundException as e:
+        return jsonify({'error': str(e)}), 404
+    except (ValidationException, BadRequestException) as e:
+        return jsonify({'error': str(e)}), 400
+
+@blob_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+@jwt_required()
+def abort_upload(upload_id):
+    """放弃上传"""
+    try:
+        UploadService.abort(upload_id, request.user_id)
+        return '', 204
+    except NotFoundException as e:
+        return jsonify({'error': str(e)}), 404
@@ -1,20 +1,27 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, current_app
+from app.utils.json_provider import JSON_MIMETYPE, jsonify
 from app.services.category_service import CategoryService
+from app.services.category_cache import category_tree_cache
 from app.utils.jwt import jwt_required
+from app.utils.streaming import stream_json
 from app.exceptions.customer_exceptions import NotFoundException, BadRequestException
 
 category_bp = Blueprint('category', __name__)
 
+def _cached_json(body: bytes, etag: str):
+    """Serve pre-serialized JSON, answering 304 when If-None-Match matches"""
+    response = current_app.response_class(body, mimetype=JSON_MIMETYPE)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
 @category_bp.route('/categories', methods=['GET'])
 @jwt_required()
 def get_categories():
     """Get all categories"""
     try:
-        categories = CategoryService.get_all_categories()
-        return jsonify({
-            "data": categories,
-            "message": "Categories retrieved successfully"
-        }), 200
+        snapshot = category_tree_cache.get()
+        return _cached_json(snapshot.list_body, snapshot.list_etag)
     except Exception as e:
         return jsonify({"message": str(e)}), 500
 
@@ -23,11 +30,8 @@ def get_categories():
 def get_category_tree():
     """Get categories in tree structure"""
     try:
-        tree = CategoryService.get_category_tree()
-        return jsonify({
-            "data": tree,
-            "message": "Category tree retrieved successfully"
-        }), 200
+        snapshot = category_tree_cache.get()
+        return _cached_json(snapshot.tree_body, snapshot.tree_etag)
     except Exception as e:
         return jsonify({"message": str(e)}), 500
 
@@ -51,11 +55,8 @@ def get_category_by_id(category_id):
 def get_category_children(category_id):
     """Get direct children of a category"""
     try:
-        children = CategoryService.get_children(category_id)
-        return jsonify({
-            "data": children,
-            "message": "Category children retrieved successfully"
-        }), 200
+        children = CategoryService.iter_children(category_id)
+        return stream_json(children, envelope={"message": "Category children retrieved successfully"})
     except NotFoundException as e:
         return jsonify({"message": str(e)}), 404
     except Exception as e:
@@ -66,11 +67,8 @@ def get_category_children(category_id):
 def get_category_descendants(category_id):
     """Get all descendants of a category"""
     try:
-        descendants = CategoryService.get_descendants(category_id)
-        return jsonify({
-            "data": descendants,
-            "message": "Category descendants retrieved successfully"
-        }), 200
+        descendants = CategoryService.iter_descendants(category_id)
+        return stream_json(descendants, envelope={"message": "Category descendants retrieved successfully"})
     except NotFoundException as e:
         return jsonify({"message": str(e)}), 404
     except Exception as e:
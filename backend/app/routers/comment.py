@@ -0,0 +1,74 @@
+from flask import Blueprint, request
+from werkzeug.exceptions import HTTPException
+from app.utils.json_provider import jsonify
+from app.services.comment_service import CommentService
+from app.utils.jwt import jwt_required
+from app.exceptions.customer_exceptions import BadRequestException, NotFoundException, ValidationException
+
+comment_bp = Blueprint('comment', __name__)
+
+@comment_bp.route('/materials/<int:material_id>/comments', methods=['GET'])
+@jwt_required()
+def get_comments(material_id):
+    """获取教材的评论，按时间倒序游标分页"""
+    try:
+        result = CommentService.get_comments(
+            material_id,
+            cursor=request.args.get('cursor'),
+            page_size=request.args.get('page_size', 20, type=int)
+        )
+        return jsonify(result), 200
+    except NotFoundException as e:
+        return jsonify({'message': str(e)}), 404
+    except BadRequestException as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@comment_bp.route('/materials/<int:material_id>/comments', methods=['POST'])
+@jwt_required()
+def create_comment(material_id):
+    """发表评论"""
+    try:
+        data = request.get_json() or {}
+        comment = CommentService.create_comment(material_id, data.get('content'), request.user_id)
+        return jsonify(comment), 201
+    except NotFoundException as e:
+        return jsonify({'message': str(e)}), 404
+    except ValidationException as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@comment_bp.route('/comments/<int:comment_id>', methods=['PUT'])
+@jwt_required()
+def update_comment(comment_id):
+    """修改评论(仅作者)"""
+    try:
+        data = request.get_json() or {}
+        comment = CommentService.update_comment(comment_id, data.get('content'), request.user_id)
+        return jsonify(comment), 200
+    except NotFoundException as e:
+        return jsonify({'message': str(e)}), 404
+    except ValidationException as e:
+        return jsonify({'message': str(e)}), 400
+    except HTTPException as e:
+        return jsonify({'message': e.description}), e.code
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@comment_bp.route('/comments/<int:comment_id>', methods=['DELETE'])
+@jwt_required()
+def delete_comment(comment_id):
+    """删除评论(作者本人、管理员或教师)"""
+    try:
+        CommentService.delete_comment(comment_id, request.user_id, request.role_id)
+        return jsonify({'message': '评论删除成功'}), 200
+    except NotFoundException as e:
+        return jsonify({'message': str(e)}), 404
+    except ValidationException as e:
+        return jsonify({'message': str(e)}), 400
+    except HTTPException as e:
+        return jsonify({'message': e.description}), e.code
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
@@ -1,15 +1,16 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request
+from app.utils.json_provider import jsonify
 from app.services.material import MaterialService
 from app.utils.jwt import jwt_required
-from app.exceptions.customer_exceptions import ValidationException, NotFoundException
-import orjson
+from app.utils.streaming import stream_json
+from app.exceptions.customer_exceptions import ValidationException, NotFoundException, BadRequestException
 
 material_bp = Blueprint('material', __name__)
 
 @material_bp.route('/materials', methods=['GET'])
 @jwt_required()
 def get_materials():
-    """获取教材列表，支持分页和过滤"""
+    """获取教材列表，支持分页和过滤；传入 cursor 参数时使用游标分页"""
     try:
         page = int(request.args.get('page', 1))
         page_size = int(request.args.get('page_size', 10))
@@ -17,6 +18,11 @@ def get_materials():
         description = request.args.get('description')
         category_ids = request.args.get('category_ids')
         type = request.args.get('type')
+        cursor = request.args.get('cursor')
+        order_by = request.args.get('order_by', 'id')
+        total_mode = request.args.get('total')
+        include_descendants = request.args.get('include_descendants', 'false').lower() == 'true'
+        include = request.args.get('include')
 
         result = MaterialService.get_materials(
             page=page,
@@ -24,13 +30,37 @@ def get_materials():
             display_name=display_name,
             description=description,
             category_ids=category_ids,
-            type=type
+            type=type,
+            cursor=cursor,
+            order_by=order_by,
+            total_mode=total_mode,
+            include_descendants=include_descendants,
+            include=include
         )
         
-        # 使用 orjson 序列化
-        return orjson.dumps(result), 200, {'Content-Type': 'application/json'}
+        return jsonify(result), 200
+    except BadRequestException as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
-        return orjson.dumps({'message': str(e)}), 500, {'Content-Type': 'application/json'}
+        return jsonify({'message': str(e)}), 500
+
+@material_bp.route('/materials/export', methods=['GET'])
+@jwt_required(allowed_roles=[1, 2])  # 管理员和教师可访问
+def export_materials():
+    """流式导出符合条件的全部教材，format=json(默认)/ndjson"""
+    try:
+        rows = MaterialService.export_materials(
+            display_name=request.args.get('display_name'),
+            description=request.args.get('description'),
+            category_ids=request.args.get('category_ids'),
+            type=request.args.get('type'),
+            include_descendants=request.args.get('include_descendants', 'false').lower() == 'true'
+        )
+        return stream_json(rows, request.args.get('format', 'json'), filename='materials')
+    except BadRequestException as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
 
 @material_bp.route('/materials', methods=['POST'])
 @jwt_required(allowed_roles=[1, 2])  # 管理员和教师可访问
@@ -45,10 +75,16 @@ def create_material():
             'cover': request.form.get('cover'),
             'material_type': request.form.get('material_type'),
         }
+        # 大文件可以先通过分片上传接口上传，再传入其 blob ID 代替 file
+        if 'blob_id' in request.form:
+            data['blob_id'] = request.form.get('blob_id')
+        # 封面可以先通过 /api/blob/upload 上传，再传入其 blob ID
+        if 'cover_blob_id' in request.form:
+            data['cover_blob_id'] = request.form.get('cover_blob_id')
         
         # 验证必填字段
         if not all([data['display_name'], data['category_ids'], data['material_type']]):
-            return orjson.dumps({'message': 'Missing required fields'}), 400, {'Content-Type': 'application/json'}
+            return jsonify({'message': 'Missing required fields'}), 400
             
         material = MaterialService.create_material(data, request.user_id)
         response = {
@@ -56,13 +92,66 @@ def create_material():
             'display_name': material.display_name,
             'category_ids': material.category_ids,
             'material_type': material.material_type,
-            'created_at': material.created_at.isoformat()
+            'created_at': material.created_at
         }
-        return orjson.dumps(response), 201, {'Content-Type': 'application/json'}
+        return jsonify(response), 201
+    except ValidationException as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+def _batch_ids(data):
+    """批量接口的目标: ids(ID列表) 或 filter(与列表接口相同的筛选条件) 二选一"""
+    return MaterialService.resolve_batch_ids(data.get('ids'), data.get('filter'))
+
+@material_bp.route('/materials/batch/publish', methods=['POST'])
+@jwt_required(allowed_roles=[1, 2])  # 管理员和教师可访问
+def batch_publish():
+    """批量发布/取消发布教材"""
+    try:
+        data = request.get_json() or {}
+        is_publish = data.get('is_publish')
+        if is_publish is None:
+            return jsonify({'message': 'is_publish field is required'}), 400
+        result = MaterialService.batch_publish(_batch_ids(data), bool(is_publish), request.user_id)
+        return jsonify(result), 200
+    except ValidationException as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@material_bp.route('/materials/batch/delete', methods=['POST'])
+@jwt_required(allowed_roles=[1, 2])  # 管理员和教师可访问
+def batch_delete():
+    """批量删除教材"""
+    try:
+        data = request.get_json() or {}
+        result = MaterialService.batch_delete(_batch_ids(data))
+        return jsonify(result), 200
+    except ValidationException as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@material_bp.route('/materials/batch/categories', methods=['POST'])
+@jwt_required(allowed_roles=[1, 2])  # 管理员和教师可访问
+def batch_set_categories():
+    """批量修改教材分类，mode 为 replace(默认)/add/remove"""
+    try:
+        data = request.get_json() or {}
+        if 'category_ids' not in data:
+            return jsonify({'message': 'category_ids field is required'}), 400
+        result = MaterialService.batch_set_categories(
+            _batch_ids(data),
+            data['category_ids'],
+            data.get('mode', 'replace'),
+            request.user_id
+        )
+        return jsonify(result), 200
     except ValidationException as e:
-        return orjson.dumps({'message': str(e)}), 400, {'Content-Type': 'application/json'}
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
-        return orjson.dumps({'message': str(e)}), 500, {'Content-Type': 'application/json'}
+        return jsonify({'message': str(e)}), 500
 
 @material_bp.route('/materials/<int:material_id>', methods=['PUT'])
 @jwt_required(allowed_roles=[1, 2])  # 管理员和教师可访问
@@ -75,12 +164,12 @@ def update_material(material_id):
             'id': material.id,
             'display_name': material.display_name,
             'category_ids': material.category_ids,
-            'type': material.type,
-            'updated_at': material.updated_at.isoformat()
+            'type': material.material_type,
+            'updated_at': material.updated_at
         }
-        return orjson.dumps(response), 200, {'Content-Type': 'application/json'}
+        return jsonify(response), 200
     except Exception as e:
-        return orjson.dumps({'message': str(e)}), 400, {'Content-Type': 'application/json'}
+        return jsonify({'message': str(e)}), 400
 
 @material_bp.route('/materials/<int:material_id>', methods=['DELETE'])
 @jwt_required(allowed_roles=[1, 2])  # 管理员和教师可访问
@@ -88,9 +177,9 @@ def delete_material(material_id):
     """删除教材"""
     try:
         MaterialService.delete_material(material_id)
-        return orjson.dumps({'message': '教材删除成功'}), 200, {'Content-Type': 'application/json'}
+        return jsonify({'message': '教材删除成功'}), 200
     except Exception as e:
-        return orjson.dumps({'message': str(e)}), 400, {'Content-Type': 'application/json'}
+        return jsonify({'message': str(e)}), 400
 
 @material_bp.route('/materials/<int:material_id>/publish', methods=['PUT'])
 @jwt_required(allowed_roles=[1, 2])  # 管理员和教师可访问
@@ -100,18 +189,18 @@ def toggle_publish(material_id):
         data = request.get_json()
         is_publish = data.get('is_publish')
         if is_publish is None:
-            return orjson.dumps({'message': 'is_publish field is required'}), 400, {'Content-Type': 'application/json'}
+            return jsonify({'message': 'is_publish field is required'}), 400
 
         material = MaterialService.toggle_publish(material_id, is_publish, request.user_id)
         response = {
             'id': material.id,
             'display_name': material.display_name,
             'publish_status': material.publish_status,
-            'updated_at': material.updated_at.isoformat()
+            'updated_at': material.updated_at
         }
-        return orjson.dumps(response), 200, {'Content-Type': 'application/json'}
+        return jsonify(response), 200
     except Exception as e:
-        return orjson.dumps({'message': str(e)}), 400, {'Content-Type': 'application/json'}
+        return jsonify({'message': str(e)}), 400
 
 @material_bp.route('/materials/<int:material_id>/content', methods=['GET'])
 @jwt_required()  # 所有角色可访问
@@ -119,9 +208,9 @@ def get_material_content(material_id):
     """获取教材内容"""
     try:
         content = MaterialService.get_material_content(material_id)
-        return orjson.dumps({'content': content}), 200, {'Content-Type': 'application/json'}
+        return jsonify({'content': content}), 200
     except Exception as e:
-        return orjson.dumps({'message': str(e)}), 400, {'Content-Type': 'application/json'}
+        return jsonify({'message': str(e)}), 400
 
 @material_bp.route('/materials/<int:material_id>/content', methods=['PUT'])
 @jwt_required(allowed_roles=[1, 2])  # 管理员和教师可访问
@@ -131,14 +220,14 @@ def save_material_content(material_id):
         data = request.get_json()
         content = data.get('content')
         if content is None:
-            return orjson.dumps({'message': 'content field is required'}), 400, {'Content-Type': 'application/json'}
+            return jsonify({'message': 'content field is required'}), 400
 
         material = MaterialService.save_material_content(material_id, content, request.user_id)
         response = {
             'id': material.id,
             'display_name': material.display_name,
-            'updated_at': material.updated_at.isoformat()
+            'updated_at': material.updated_at
         }
-        return orjson.dumps(response), 200, {'Content-Type': 'application/json'}
+        return jsonify(response), 200
     except Exception as e:
-        return orjson.dumps({'message': str(e)}), 400, {'Content-Type': 'application/json'} 
\ No newline at end of file
+        return jsonify({'message': str(e)}), 400 
\ No newline at end of file
@@ -1,4 +1,5 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint
+from app.utils.json_provider import jsonify
 from app.services.role_service import RoleService
 from app.utils.jwt import jwt_required
 
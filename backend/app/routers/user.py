@@ -1,21 +1,46 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request
+from app.utils.json_provider import jsonify
 from app.services.user_service import UserService
 from app.services.role_service import RoleService
 from app.utils.jwt import jwt_required
+from app.utils.streaming import stream_json
+from app.exceptions.customer_exceptions import BadRequestException, TooManyRequestsException, ValidationException
 
 user_bp = Blueprint('user', __name__)
 
+# Query parameters that switch GET /users from the legacy full list to cursor pagination
+USER_LIST_PARAMS = ('cursor', 'page_size', 'role_id', 'username', 'total')
+
 @user_bp.route('/users', methods=['GET'])
 @jwt_required(allowed_roles=[1, 2])  # Admins and teachers can view
 def get_users():
-    users = UserService.get_all_users()
-    return jsonify([{
-        'id': user.id,
-        'username': user.username,
-        'role_id': user.role_id,
-        'avatar': user.avatar,
-        'created_at': user.created_at.isoformat(),
-    } for user in users]), 200
+    if not any(name in request.args for name in USER_LIST_PARAMS):
+        return jsonify(UserService.get_all_users()), 200
+
+    try:
+        result = UserService.get_users(
+            cursor=request.args.get('cursor'),
+            page_size=request.args.get('page_size', 20, type=int),
+            role_id=request.args.get('role_id', type=int),
+            username=request.args.get('username'),
+            total_mode=request.args.get('total', 'none')
+        )
+        return jsonify(result), 200
+    except BadRequestException as e:
+        return jsonify({'message': str(e)}), 400
+
+@user_bp.route('/users/export', methods=['GET'])
+@jwt_required(allowed_roles=[1])  # Admins only
+def export_users():
+    """Stream every matching user as a JSON array (or NDJSON with format=ndjson)"""
+    try:
+        rows = UserService.export_users(
+            role_id=request.args.get('role_id', type=int),
+            username=request.args.get('username')
+        )
+        return stream_json(rows, request.args.get('format', 'json'), filename='users')
+    except BadRequestException as e:
+        return jsonify({'message': str(e)}), 400
 
 @user_bp.route('/users', methods=['POST'])
 @jwt_required(allowed_roles=[1, 2])  # Admins and teachers can create
@@ -36,11 +61,45 @@ def create_user():
             'id': user.id,
             'username': user.username,
             'role_id': user.role_id,
-            'created_at': user.created_at.isoformat()
+            'created_at': user.created_at
         }), 201
+    except TooManyRequestsException as e:
+        return jsonify({'message': str(e)}), 429, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         return jsonify({'message': str(e)}), 400
 
+@user_bp.route('/users/import', methods=['POST'])
+@jwt_required(allowed_roles=[1, 2])  # Admins and teachers can import
+def import_users():
+    """
+    Bulk create users from a CSV (username,password[,role_id]) or JSON array.
+    The data is either an uploaded "file" or the raw request body; role_id
+    defaults to the "role_id" query parameter.
+    """
+    try:
+        if 'file' in request.files:
+            upload = request.files['file']
+            stream = upload.stream
+            is_json = upload.filename.lower().endswith('.json') or upload.mimetype == 'application/json'
+        else:
+            stream = request.stream
+            is_json = request.mimetype == 'application/json'
+
+        rows = UserService.parse_import(stream, 'json' if is_json else 'csv')
+        report = UserService.import_users(
+            rows,
+            current_user_role_id=request.role_id,
+            current_user_id=request.user_id,
+            default_role_id=request.args.get('role_id', type=int)
+        )
+        return jsonify(report), 200
+    except TooManyRequestsException as e:
+        return jsonify({'message': str(e)}), 429, {'Retry-After': str(e.retry_after)}
+    except ValidationException as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
 @user_bp.route('/users/<int:user_id>', methods=['DELETE'])
 @jwt_required(allowed_roles=[1, 2])  # Admins and teachers can delete
 def delete_user(user_id):
@@ -52,6 +111,16 @@ def delete_user(user_id):
     except Exception as e:
         return jsonify({'message': str(e)}), 400
 
+@user_bp.route('/users/<int:user_id>/revoke-tokens', methods=['POST'])
+@jwt_required(allowed_roles=[1, 2])  # Admins and teachers can revoke logins
+def revoke_tokens(user_id):
+    try:
+        if UserService.revoke_tokens(user_id, request.role_id):
+            return jsonify({'message': 'User tokens revoked successfully'}), 200
+        return jsonify({'message': 'User does not exist'}), 404
+    except Exception as e:
+        return jsonify({'message': str(e)}), 400
+
 @user_bp.route('/users/<int:user_id>', methods=['PUT'])
 @jwt_required(allowed_roles=[1, 2])  # Admins and teachers can update user
 def update_user(user_id):
@@ -71,8 +140,10 @@ def update_user(user_id):
             'username': user.username,
             'role_id': user.role_id,
             'avatar': user.avatar,
-            'created_at': user.created_at.isoformat(),
-            'updated_at': user.updated_at.isoformat()
+            'created_at': user.created_at,
+            'updated_at': user.updated_at
         }), 200
+    except TooManyRequestsException as e:
+        return jsonify({'message': str(e)}), 429, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         return jsonify({'message': str(e)}), 400
\ No newline at end of file
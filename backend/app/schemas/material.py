@@ -7,7 +7,8 @@ class MaterialBase(BaseModel):
     display_name: str = Field(..., description="教材名称")
     category_ids: str = Field(..., description="分类ID列表，逗号分隔")
     description: Optional[str] = Field(None, description="教材描述")
-    cover: Optional[str] = Field(None, description="封面图片(base64)")
+    cover: Optional[str] = Field(None, description="封面图片(base64 / data URL)，保存为 blob；响应中为预览地址")
+    cover_blob_id: Optional[int] = Field(None, description="封面图片的 blob ID")
     type: str = Field(..., description="教材类型(upload/create)")
 
 class MaterialCreate(MaterialBase):
@@ -0,0 +1,333 @@
+import contextlib
+import hashlib
+import logging
+import os
+import shutil
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+from flask import current_app
+from peewee import fn
+from app.database import db
+from app.models.blob import Blob
+from app.models.blob_job import BlobJob
+from app.services.blob_service import BlobService, CHUNK_SIZE
+from app.services.blob_store import get_blob_store
+from app.services.blob_processors import ProcessingSkipped, get_processor, kinds_for
+from app.exceptions.customer_exceptions import NotFoundException
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ('pending', 'running', 'succeeded', 'failed', 'skipped')
+# 可通过重试接口重新执行的状态
+RETRYABLE_STATUSES = ('failed', 'skipped')
+# 错误信息最大保存长度
+MAX_ERROR_LENGTH = 2000
+
+# 同一进程内新任务入队时唤醒 worker，无需等待下一个轮询周期
+_wakeup = threading.Event()
+
+
+class BlobJobService:
+    @staticmethod
+    def enqueue(blob: Blob) -> List[str]:
+        """
+        为新上传的 blob 创建处理任务，(sha256, kind) 已存在时忽略，保证幂等
+        已有任务的源 blob 被删除后重新上传相同内容时，仅重新关联源 blob
+        :return: 创建或关联的任务类型
+        """
+        kinds = kinds_for(blob.mime_type)
+        if not kinds:
+            return []
+        max_attempts = current_app.config['BLOB_JOB_MAX_ATTEMPTS']
+        rows = [{
+            'sha256': blob.sha256,
+            'kind': kind,
+            'blob': blob.id,
+            'max_attempts': max_attempts,
+            'run_after': datetime.now(),
+        } for kind in kinds]
+        BlobJob.insert_many(rows).on_conflict_ignore().execute()
+        (BlobJob
+         .update(blob=blob.id, updated_at=datetime.now())
+         .where((BlobJob.sha256 == blob.sha256) & BlobJob.blob.is_null())
+         .execute())
+        _wakeup.set()
+        return kinds
+
+    @staticmethod
+    def claim(worker_id: str, batch_size: int = 10) -> Optional[BlobJob]:
+        """
+        领取一个到期的任务: 先读出候选任务，再用带状态条件的 UPDATE 抢占，
+        多个线程/进程同时领取时只有一个能更新成功，不依赖 SELECT ... FOR UPDATE
+        """
+        now = datetime.now()
+        candidates = (BlobJob
+                      .select(BlobJob.id)
+                      .where((BlobJob.status == 'pending') & (BlobJob.run_after <= now))
+                      .order_by(BlobJob.run_after, BlobJob.id)
+                      .limit(batch_size)
+                      .tuples())
+        for (job_id,) in candidates:
+            claimed = (BlobJob
+                       .update(status='running', locked_by=worker_id, locked_at=now,
+                               attempts=BlobJob.attempts + 1, updated_at=now)
+                       .where((BlobJob.id == job_id) & (BlobJob.status == 'pending'))
+                       .execute())
+            if claimed:
+                return BlobJob.get_by_id(job_id)
+        return None
+
+    @staticmethod
+    def requeue_stale(lock_timeout: int) -> int:
+        """
+        worker 崩溃或进程退出时任务会停留在 running 状态，超过锁定时间后放回队列，
+        已用完重试次数的任务直接标记为失败
+        """
+        now = datetime.now()
+        stale = (BlobJob.status == 'running') & (BlobJob.locked_at < now - timedelta(seconds=lock_timeout))
+        failed = (BlobJob
+                  .update(status='failed', locked_by=None, locked_at=None,
+                          last_error='Worker lock expired', updated_at=now)
+                  .where(stale & (BlobJob.attempts >= BlobJob.max_attempts))
+                  .execute())
+        requeued = (BlobJob
+                    .update(status='pending', locked_by=None, locked_at=None, run_after=now, updated_at=now)
+                    .where(stale)
+                    .execute())
+        return failed + requeued
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _local_copy(blob: Blob) -> Iterator[str]:
+        """返回源文件的本地路径，对象存储中的文件先下载到临时文件"""
+        store = get_blob_store()
+        local_path = store.local_path(blob.file_path)
+        if local_path is not None:
+            yield local_path
+            return
+        fd, temp_path = BlobService.create_temp_file()
+        try:
+            with os.fdopen(fd, 'wb') as temp_file, store.open(blob.file_path) as source:
+                shutil.copyfileobj(source, temp_file, CHUNK_SIZE)
+            yield temp_path
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @staticmethod
+    def run(job: BlobJob) -> str:
+        """
+        执行一个已领取的任务并记录结果
+        :return: 任务的最终状态
+        """
+        blob = Blob.get_or_none(Blob.sha256 == job.sha256)
+        if blob is None:
+            return BlobJobService._finish(job, 'skipped', error='Source blob has been deleted')
+
+        # 处理器按路径写入输出文件，这里只需要一个唯一的文件名
+        fd, output_path = BlobService.create_temp_file()
+        os.close(fd)
+        try:
+            with BlobJobService._local_copy(blob) as source_path:
+                output = get_processor(job.kind)(
+                    source_path, blob.file_name, blob.mime_type, output_path, current_app.config
+                )
+            if output.file_path is None:
+                return BlobJobService._finish(job, 'succeeded', result=output.result)
+            return BlobJobService._store_output(job, output)
+        except ProcessingSkipped as e:
+            return BlobJobService._finish(job, 'skipped', error=e.message)
+        except Exception as e:
+            logger.exception('Blob job %s (%s) failed', job.id, job.kind)
+            return BlobJobService._fail(job, f"{type(e).__name__}: {e}")
+        finally:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+
+    @staticmethod
+    def _store_output(job: BlobJob, output) -> str:
+        """将生成的文件登记为独立的 blob，任务记录持有它的一个引用"""
+        sha256_hash = hashlib.sha256()
+        with open(output.file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                sha256_hash.update(chunk)
+        sha256 = sha256_hash.hexdigest()
+        if sha256 == job.sha256:
+            # 生成的文件与源文件相同(如 UTF-8 纯文本的文本提取)，直接指向源 blob，不额外持有引用
+            return BlobJobService._finish(job, 'succeeded', result=output.result,
+                                          result_blob_id=Blob.get(Blob.sha256 == sha256).id)
+        file_size = os.path.getsize(output.file_path)
+        # 生成的文件不再触发处理任务；登记时取得的引用在任务成功写入后由任务记录持有
+        result_blob = BlobService.store_file(
+            output.file_path, output.file_name, output.mime_type, file_size, sha256, process=False, acquire=True
+        )
+        status = BlobJobService._finish(job, 'succeeded', result=output.result, result_blob_id=result_blob.id)
+        if status != 'succeeded':
+            BlobService.release_pins([result_blob.id])
+        return status
+
+    @staticmethod
+    def _finish(job: BlobJob, status: str, result: Optional[Dict] = None, error: Optional[str] = None,
+                result_blob_id: Optional[int] = None) -> str:
+        """
+        写入最终状态，条件更新保证锁过期后被其他 worker 重新领取的任务不会被重复写入
+        :return: 实际写入的状态，任务已不属于当前 worker 时返回 'lost'
+        """
+        updated = (BlobJob
+                   .update(status=status, result=result, result_blob=result_blob_id,
+                           last_error=error[:MAX_ERROR_LENGTH] if error else None,
+                           locked_by=None, locked_at=None, updated_at=datetime.now())
+                   .where((BlobJob.id == job.id) & (BlobJob.status == 'running') & (BlobJob.locked_by == job.locked_by))
+                   .execute())
+        return status if updated else 'lost'
+
+    @staticmethod
+    def _fail(job: BlobJob, error: str) -> str:
+        """失败后按指数退避重新排队，重试次数用完时标记为失败"""
+        if job.attempts >= job.max_attempts:
+            return BlobJobService._finish(job, 'failed', error=error)
+        delay = current_app.config['BLOB_JOB_RETRY_DELAY'] * (2 ** (job.attempts - 1))
+        updated = (BlobJob
+                   .update(status='pending', run_after=datetime.now() + timedelta(seconds=delay),
+                           last_error=error[:MAX_ERROR_LENGTH], locked_by=None, locked_at=None,
+                           updated_at=datetime.now())
+                   .where((BlobJob.id == job.id) & (BlobJob.status == 'running') & (BlobJob.locked_by == job.locked_by))
+                   .execute())
+        return 'pending' if updated else 'lost'
+
+    @staticmethod
+    def _derived_jobs():
+        """生成了独立文件的任务(结果不是源文件本身)，这些任务各持有结果 blob 的一个引用"""
+        return (BlobJob
+                .select(BlobJob.result_blob)
+                .join(Blob, on=(BlobJob.result_blob == Blob.id))
+                .where(Blob.sha256 != BlobJob.sha256))
+
+    @staticmethod
+    def purge(sha256s: List[str]) -> None:
+        """源文件删除后清理其处理任务，并释放生成的文件"""
+        if not sha256s:
+            return
+        references: Dict[int, int] = {}
+        for (result_blob_id,) in BlobJobService._derived_jobs().where(BlobJob.sha256.in_(sha256s)).tuples():
+            references[result_blob_id] = references.get(result_blob_id, 0) + 1
+        with db.atomic():
+            BlobJob.delete().where(BlobJob.sha256.in_(sha256s)).execute()
+            BlobService.release_many(references)
+        BlobService.delete_unreferenced(references)
+
+    @staticmethod
+    def process_pending(worker_id: str, limit: Optional[int] = None) -> int:
+        """依次领取并执行到期的任务，没有可执行的任务或达到 limit 时返回已处理的数量"""
+        processed = 0
+        while limit is None or processed < limit:
+            job = BlobJobService.claim(worker_id)
+            if job is None:
+                break
+            BlobJobService.run(job)
+            processed += 1
+        return processed
+
+    @staticmethod
+    def _job_to_json(job: BlobJob) -> Dict:
+        return {
+            'id': job.id,
+            'kind': job.kind,
+            'status': job.status,
+            'attempts': job.attempts,
+            'max_attempts': job.max_attempts,
+            'run_after': job.run_after,
+            'last_error': job.last_error,
+            'result': job.result,
+            'result_blob_id': job.result_blob_id,
+            'updated_at': job.updated_at,
+        }
+
+    @staticmethod
+    def get_jobs(blob_id: int) -> Dict:
+        """查询某个 blob 的处理任务状态"""
+        blob = BlobService.get_blob(blob_id)
+        jobs = BlobJob.select().where(BlobJob.sha256 == blob.sha256).order_by(BlobJob.id)
+        return {
+            'blob_id': blob.id,
+            'sha256': blob.sha256,
+            'jobs': [BlobJobService._job_to_json(job) for job in jobs],
+        }
+
+    @staticmethod
+    def retry(blob_id: int) -> Dict:
+        """将失败或跳过的任务重新放回队列(例如安装了可选依赖之后)，没有任务时补建"""
+        blob = BlobService.get_blob(blob_id)
+        BlobJobService.enqueue(blob)
+        (BlobJob
+         .update(status='pending', attempts=0, run_after=datetime.now(), last_error=None,
+                 locked_by=None, locked_at=None, updated_at=datetime.now())
+         .where((BlobJob.sha256 == blob.sha256) & BlobJob.status.in_(RETRYABLE_STATUSES))
+         .execute())
+        _wakeup.set()
+        return BlobJobService.get_jobs(blob_id)
+
+    @staticmethod
+    def backfill(batch_size: int = 500) -> int:
+        """为功能上线前已存在的 blob 补建任务，返回处理的 blob 数量"""
+        derived = BlobJobService._derived_jobs()
+        count = 0
+        last_id = 0
+        while True:
+            blobs = list(Blob
+                         .select()
+                         .where((Blob.id > last_id) & Blob.id.not_in(derived))
+                         .order_by(Blob.id)
+                         .limit(batch_size))
+            if not blobs:
+                return count
+            for blob in blobs:
+                BlobJobService.enqueue(blob)
+            count += len(blobs)
+            last_id = blobs[-1].id
+
+    @staticmethod
+    def stats() -> Dict[str, int]:
+        """各状态的任务数量"""
+        counts = dict(BlobJob
+                      .select(BlobJob.status, fn.COUNT(BlobJob.id))
+                      .group_by(BlobJob.status)
+                      .tuples())
+        return {status: counts.get(status, 0) for status in JOB_STATUSES}
+
+
+def make_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class BlobJobWorker(threading.Thread):
+    """后台执行上传后处理任务，队列为空时按 interval 轮询"""
+
+    def __init__(self, app, interval: int, lock_timeout: int):
+        super().__init__(name='blob-job-worker', daemon=True)
+        self.app = app
+        self.interval = interval
+        self.lock_timeout = lock_timeout
+        self.worker_id = make_worker_id()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while True:
+            # 新任务入队时被唤醒，否则等待一个轮询周期(其他进程入队的任务)
+            _wakeup.wait(self.interval)
+            _wakeup.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                with self.app.app_context(), db.connection_context():
+                    BlobJobService.requeue_stale(self.lock_timeout)
+                    BlobJobService.process_pending(self.worker_id)
+            except Exception:
+                logger.exception('Failed to process blob jobs')
+
+    def stop(self):
+        self._stopped.set()
+        _wakeup.set()
@@ -0,0 +1,242 @@
+"""
+上传文件的后台处理器: 缩略图、文本提取、元数据
+
+每个处理器接收源文件的本地路径，返回 ProcessorOutput:
+- result: 写入任务记录的结构化结果
+- file_path / file_name / mime_type: 生成的文件(位于临时目录)，由任务服务登记为独立的 blob
+
+图片处理依赖 Pillow，PDF 渲染依赖 PyMuPDF，PDF 文本提取依赖 pypdf，均为可选依赖，
+未安装时对应任务标记为 skipped，安装后可通过重试接口重新执行。
+"""
+import os
+import re
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+# 文本类文件按以下编码依次尝试解码
+TEXT_ENCODINGS = ('utf-8', 'gb18030')
+TEXT_MIME_TYPES = frozenset(['application/json', 'application/xml', 'application/javascript'])
+PDF_MIME_TYPE = 'application/pdf'
+# PDF 页数的兜底统计: 匹配页面对象 /Type /Page (排除 /Pages)
+PDF_PAGE_PATTERN = re.compile(rb'/Type\s*/Page(?![a-zA-Z])')
+PDF_SCAN_CHUNK = 1024 * 1024
+
+
+class ProcessingSkipped(Exception):
+    """文件类型不支持或缺少可选依赖，任务无需重试"""
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(self.message)
+
+
+class ProcessorOutput(NamedTuple):
+    result: Optional[Dict] = None
+    file_path: Optional[str] = None
+    file_name: Optional[str] = None
+    mime_type: Optional[str] = None
+
+
+def _base_mime(mime_type: str) -> str:
+    return (mime_type or '').split(';', 1)[0].strip().lower()
+
+
+def _is_text(mime_type: str) -> bool:
+    mime_type = _base_mime(mime_type)
+    return mime_type.startswith('text/') or mime_type in TEXT_MIME_TYPES
+
+
+def _is_image(mime_type: str) -> bool:
+    return _base_mime(mime_type).startswith('image/')
+
+
+def _is_pdf(mime_type: str) -> bool:
+    return _base_mime(mime_type) == PDF_MIME_TYPE
+
+
+def _stem(file_name: str) -> str:
+    return os.path.splitext(file_name)[0] or 'file'
+
+
+def _import_pillow():
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        raise ProcessingSkipped("Image processing requires Pillow (pip install Pillow)")
+    return Image, ImageOps
+
+
+def _read_text(path: str) -> str:
+    with open(path, 'rb') as f:
+        data = f.read()
+    for encoding in TEXT_ENCODINGS:
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return data.decode('utf-8', errors='replace')
+
+
+class _HTMLTextExtractor(HTMLParser):
+    """提取 HTML 中的可见文本，忽略 script/style"""
+    SKIP_TAGS = frozenset(['script', 'style', 'noscript', 'template'])
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth and data.strip():
+            self.parts.append(data.strip())
+
+
+def _html_to_text(html: str) -> str:
+    parser = _HTMLTextExtractor()
+    parser.feed(html)
+    parser.close()
+    return '\n'.join(parser.parts)
+
+
+def _pdf_text(path: str) -> str:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise ProcessingSkipped("PDF text extraction requires pypdf (pip install pypdf)")
+    reader = PdfReader(path)
+    return '\n'.join((page.extract_text() or '') for page in reader.pages)
+
+
+def _pdf_page_count(path: str) -> int:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        PdfReader = None
+    if PdfReader is not None:
+        return len(PdfReader(path).pages)
+
+    # 未安装 pypdf 时分块扫描页面对象，块之间保留少量重叠以免匹配被截断
+    count = 0
+    tail = b''
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(PDF_SCAN_CHUNK), b''):
+            data = tail + chunk
+            matches = list(PDF_PAGE_PATTERN.finditer(data))
+            keep_from = max(len(data) - 16, 0)
+            # 重叠部分中的匹配留到下一块统计
+            count += sum(1 for m in matches if m.start() < keep_from)
+            tail = data[keep_from:]
+    count += len(PDF_PAGE_PATTERN.findall(tail))
+    return count
+
+
+def make_thumbnail(path: str, file_name: str, mime_type: str, output_path: str, config) -> ProcessorOutput:
+    """生成不超过 THUMBNAIL_SIZE 见方的 JPEG 缩略图，PDF 取第一页"""
+    size = config['THUMBNAIL_SIZE']
+    Image, ImageOps = _import_pillow()
+
+    if _is_pdf(mime_type):
+        try:
+            import fitz
+        except ImportError:
+            raise ProcessingSkipped("PDF thumbnails require PyMuPDF (pip install PyMuPDF)")
+        with fitz.open(path) as document:
+            if document.page_count == 0:
+                raise ProcessingSkipped("PDF has no pages")
+            page = document.load_page(0)
+            zoom = size / max(page.rect.width, page.rect.height, 1)
+            pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            image = Image.frombytes('RGB', (pixmap.width, pixmap.height), pixmap.samples)
+    elif _is_image(mime_type):
+        image = Image.open(path)
+        image = ImageOps.exif_transpose(image)
+    else:
+        raise ProcessingSkipped(f"No thumbnail for {mime_type}")
+
+    image.thumbnail((size, size))
+    if image.mode in ('RGBA', 'LA', 'P'):
+        # 透明背景填充为白色后再转为 JPEG
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+    image.save(output_path, 'JPEG', quality=config['THUMBNAIL_QUALITY'], optimize=True)
+    return ProcessorOutput(
+        result={'width': image.width, 'height': image.height},
+        file_path=output_path,
+        file_name=f"{_stem(file_name)}.thumb.jpg",
+        mime_type='image/jpeg'
+    )
+
+
+def extract_text(path: str, file_name: str, mime_type: str, output_path: str, config) -> ProcessorOutput:
+    """提取纯文本供搜索使用，超过 TEXT_EXTRACT_MAX_CHARS 的部分截断"""
+    if _is_pdf(mime_type):
+        text = _pdf_text(path)
+    elif _base_mime(mime_type) in ('text/html', 'application/xhtml+xml'):
+        text = _html_to_text(_read_text(path))
+    elif _is_text(mime_type):
+        text = _read_text(path)
+    else:
+        raise ProcessingSkipped(f"No text extraction for {mime_type}")
+
+    max_chars = config['TEXT_EXTRACT_MAX_CHARS']
+    truncated = len(text) > max_chars
+    text = text[:max_chars]
+    result = {'characters': len(text), 'truncated': truncated}
+    if not text.strip():
+        return ProcessorOutput(result=result)
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return ProcessorOutput(
+        result=result,
+        file_path=output_path,
+        file_name=f"{_stem(file_name)}.txt",
+        mime_type='text/plain; charset=utf-8'
+    )
+
+
+def extract_metadata(path: str, file_name: str, mime_type: str, output_path: str, config) -> ProcessorOutput:
+    """统计文件元数据: 图片尺寸、PDF 页数、文本字符数和行数"""
+    result: Dict = {'mime_type': mime_type, 'file_size': os.path.getsize(path)}
+    if _is_image(mime_type):
+        try:
+            Image, _ = _import_pillow()
+        except ProcessingSkipped:
+            # 未安装 Pillow 时只记录基础信息
+            return ProcessorOutput(result=result)
+        with Image.open(path) as image:
+            result.update(width=image.width, height=image.height, format=image.format, mode=image.mode)
+    elif _is_pdf(mime_type):
+        result['page_count'] = _pdf_page_count(path)
+    elif _is_text(mime_type):
+        text = _read_text(path)
+        result.update(characters=len(text), lines=text.count('\n') + (1 if text and not text.endswith('\n') else 0))
+    return ProcessorOutput(result=result)
+
+
+# 任务类型 -> (是否适用于该 MIME 类型, 处理函数)
+PROCESSORS: Dict[str, tuple] = {
+    'thumbnail': (lambda mime: _is_image(mime) or _is_pdf(mime), make_thumbnail),
+    'text': (lambda mime: _is_text(mime) or _is_pdf(mime), extract_text),
+    'metadata': (lambda mime: True, extract_metadata),
+}
+
+
+def kinds_for(mime_type: str) -> List[str]:
+    """返回适用于该 MIME 类型的任务类型"""
+    return [kind for kind, (applies, _) in PROCESSORS.items() if applies(mime_type)]
+
+
+def get_processor(kind: str) -> Callable[..., ProcessorOutput]:
+    return PROCESSORS[kind][1]
@@ -1,73 +1,214 @@
 import os
 import hashlib
-import shutil
-from werkzeug.utils import secure_filename
-from flask import current_app, send_file
+import tempfile
+from collections import Counter
+from flask import current_app, send_file, redirect
 from app.models.blob import Blob
-from typing import Optional, Tuple
+from app.services.blob_store import get_blob_store
+from peewee import Case, MySQLDatabase
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple
 import mimetypes
 from app.exceptions.customer_exceptions import NotFoundException, ValidationException
 
+# 流式写入/读取文件时的块大小
+CHUNK_SIZE = 1024 * 1024
+
 class BlobService:
     @staticmethod
     def _calculate_sha256(file_path: str) -> str:
         """计算文件的SHA256哈希值"""
         sha256_hash = hashlib.sha256()
         with open(file_path, 'rb') as f:
-            for chunk in iter(lambda: f.read(4096), b''):
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
                 sha256_hash.update(chunk)
         return sha256_hash.hexdigest()
 
     @staticmethod
-    def _get_file_path(filename: str, sha256: str) -> str:
-        """生成文件存储路径"""
-        # 使用sha256的前两位作为子目录，防止单个目录文件过多
-        sub_dir = sha256[:2]
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        directory = os.path.join(upload_folder, sub_dir)
-        
-        # 确保目录存在
-        os.makedirs(directory, exist_ok=True)
-        
-        # 返回完整的文件路径
-        return os.path.join(directory, f"{sha256}_{secure_filename(filename)}")
+    def create_temp_file() -> Tuple[int, str]:
+        """在上传目录下创建唯一的临时文件，保证与最终路径在同一文件系统以便原子重命名"""
+        temp_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'temp')
+        os.makedirs(temp_dir, exist_ok=True)
+        return tempfile.mkstemp(dir=temp_dir, suffix='.part')
+
+    @staticmethod
+    def ingest_stream(stream: BinaryIO, filename: str, mime_type: str, max_size: Optional[int] = None,
+                      acquire: bool = False) -> Blob:
+        """
+        单次读取上传流: 分块写入唯一的临时文件，同时计算大小和SHA256，
+        然后原子地移动到按内容寻址的存储路径
+        :param max_size: 允许的最大字节数，超过时中止并抛出 ValidationException
+        :param acquire: 是否为调用方持有一个引用，见 store_file
+        """
+        fd, temp_path = BlobService.create_temp_file()
+        try:
+            sha256_hash = hashlib.sha256()
+            file_size = 0
+            with os.fdopen(fd, 'wb') as temp_file:
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                    file_size += len(chunk)
+                    if max_size is not None and file_size > max_size:
+                        raise ValidationException(f"File size exceeds {max_size // (1024 * 1024)}MB limit")
+                    sha256_hash.update(chunk)
+                    temp_file.write(chunk)
+            return BlobService.store_file(temp_path, filename, mime_type, file_size, sha256_hash.hexdigest(),
+                                          acquire=acquire)
+        except ValidationException:
+            raise
+        except Exception as e:
+            raise ValidationException(f"Failed to create blob: {str(e)}")
+        finally:
+            # 成功时临时文件已被移走或删除
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
 
     @staticmethod
     def create_blob(temp_path: str, filename: str, mime_type: str) -> Blob:
-        """创建blob记录"""
+        """根据已写入磁盘的临时文件创建blob记录"""
         try:
             # 计算文件大小和SHA256
             file_size = os.path.getsize(temp_path)
             sha256 = BlobService._calculate_sha256(temp_path)
-
-            # 检查是否已存在相同的文件
-            existing_blob = Blob.get_or_none(Blob.sha256 == sha256)
-            if existing_blob:
-                # 删除临时文件
-                os.remove(temp_path)
-                return existing_blob
-
-            # 生成最终存储路径
-            file_path = BlobService._get_file_path(filename, sha256)
-            
-            # 移动文件到最终位置
-            shutil.move(temp_path, file_path)
-
-            # 创建数据库记录
-            blob = Blob.create(
-                file_name=filename,
-                file_path=file_path,
-                mime_type=mime_type,
-                file_size=file_size,
-                sha256=sha256
-            )
-            return blob
-
+            return BlobService.store_file(temp_path, filename, mime_type, file_size, sha256)
         except Exception as e:
+            raise ValidationException(f"Failed to create blob: {str(e)}")
+        finally:
             # 清理临时文件
             if os.path.exists(temp_path):
                 os.remove(temp_path)
-            raise ValidationException(f"Failed to create blob: {str(e)}")
+
+    @staticmethod
+    def store_file(temp_path: str, filename: str, mime_type: str, file_size: int, sha256: str,
+                   process: bool = True, acquire: bool = False) -> Blob:
+        """
+        将已计算好哈希的临时文件登记为blob，内容相同的文件只保存一份
+        :param process: 是否为新文件创建后台处理任务(缩略图/文本提取/元数据)，处理任务生成的文件传入 False
+        :param acquire: 是否为调用方持有一个引用。复用的 blob 可能引用计数为 0 并正被并发删除，
+                        在登记时原子地取得引用可保证返回的记录和文件在调用方释放前一直存在
+        """
+        # 检查是否已存在相同的文件(sha256 上有唯一索引)
+        existing_blob = Blob.get_or_none(Blob.sha256 == sha256)
+        if existing_blob and acquire:
+            # 条件更新失败说明记录已被并发删除，按新文件重新保存
+            if Blob.update(ref_count=Blob.ref_count + 1).where(Blob.id == existing_blob.id).execute():
+                existing_blob.ref_count += 1
+            else:
+                existing_blob = None
+        if existing_blob:
+            os.remove(temp_path)
+            return existing_blob
+
+        # 存入按内容寻址的存储位置，file_path 中保存存储 key
+        store = get_blob_store()
+        file_path = store.key_for(sha256, filename)
+        store.put_file(temp_path, file_path, mime_type)
+
+        # 插入记录，若并发上传已插入相同 sha256 则保留已有记录
+        BlobService._insert_ignore_duplicate(Blob.insert(
+            file_name=filename,
+            file_path=file_path,
+            mime_type=mime_type,
+            file_size=file_size,
+            sha256=sha256
+        ))
+        blob = Blob.get(Blob.sha256 == sha256)
+        if acquire:
+            BlobService.acquire(blob.id)
+            blob.ref_count += 1
+        if blob.file_path != file_path:
+            # 并发上传中落败的一方，文件名不同时删除自己多写的一份
+            store.delete(file_path)
+        elif process:
+            # 处理任务服务依赖 BlobService，在函数内导入以避免循环导入
+            from app.services.blob_job_service import BlobJobService
+            BlobJobService.enqueue(blob)
+        return blob
+
+    @staticmethod
+    def _insert_ignore_duplicate(query) -> None:
+        """执行 INSERT，唯一键冲突时不做任何修改 (MySQL: ON DUPLICATE KEY UPDATE / SQLite: ON CONFLICT)"""
+        if isinstance(Blob._meta.database, MySQLDatabase):
+            query = query.on_conflict(preserve=[Blob.sha256])
+        else:
+            query = query.on_conflict(conflict_target=[Blob.sha256], preserve=[Blob.sha256])
+        query.execute()
+
+    @staticmethod
+    def acquire(blob_id: int) -> None:
+        """增加blob的引用计数"""
+        updated = Blob.update(ref_count=Blob.ref_count + 1).where(Blob.id == blob_id).execute()
+        if not updated:
+            raise NotFoundException(f"Blob with id {blob_id} not found")
+
+    @staticmethod
+    def release_pins(blob_ids: Iterable[int]) -> List[int]:
+        """
+        释放 store_file(acquire=True) 为调用方持有的引用，需在调用方的事务提交后执行。
+        引用已由事务中创建的记录另行取得时只减少计数，事务失败时新保存的文件随之删除
+        :return: 实际删除的 blob ID
+        """
+        references = Counter(blob_ids)
+        BlobService.release_many(references)
+        return BlobService.delete_unreferenced(references)
+
+    @staticmethod
+    def release_many(references: Dict[int, int]) -> None:
+        """
+        批量减少引用计数 {blob_id: 减少的次数}，相同次数的 blob 合并为一条 UPDATE
+        计数归零的 blob 需在事务提交后调用 delete_unreferenced 清理
+        """
+        by_count: Dict[int, List[int]] = {}
+        for blob_id, count in references.items():
+            by_count.setdefault(count, []).append(blob_id)
+        for count, blob_ids in by_count.items():
+            (Blob
+             .update(ref_count=Case(None, [(Blob.ref_count > count, Blob.ref_count - count)], 0))
+             .where(Blob.id.in_(blob_ids))
+             .execute())
+
+    @staticmethod
+    def delete_unreferenced(blob_ids: Iterable[int]) -> List[int]:
+        """删除一批 blob 中引用计数为 0 的记录和文件，返回实际删除的 ID"""
+        blob_ids = list(blob_ids)
+        if not blob_ids:
+            return []
+        candidates = {blob_id: (file_path, sha256) for blob_id, file_path, sha256 in (Blob
+                      .select(Blob.id, Blob.file_path, Blob.sha256)
+                      .where(Blob.id.in_(blob_ids) & (Blob.ref_count == 0))
+                      .tuples())}
+        if not candidates:
+            return []
+        # 条件删除，避免与并发的 acquire 竞争；被重新引用而未删除的记录保留文件
+        Blob.delete().where(Blob.id.in_(list(candidates)) & (Blob.ref_count == 0)).execute()
+        remaining = {blob_id for (blob_id,) in Blob.select(Blob.id).where(Blob.id.in_(list(candidates))).tuples()}
+        store = get_blob_store()
+        deleted = []
+        purged = []
+        for blob_id, (file_path, sha256) in candidates.items():
+            if blob_id not in remaining:
+                store.delete(file_path)
+                deleted.append(blob_id)
+                purged.append(sha256)
+        BlobService._purge_jobs(purged)
+        return deleted
+
+    @staticmethod
+    def _delete_if_unreferenced(blob_id: int) -> bool:
+        blob = Blob.get_or_none(Blob.id == blob_id)
+        if not blob:
+            return False
+        # 条件删除，避免与并发的 acquire 竞争
+        deleted = Blob.delete().where((Blob.id == blob_id) & (Blob.ref_count == 0)).execute()
+        if deleted:
+            get_blob_store().delete(blob.file_path)
+            BlobService._purge_jobs([blob.sha256])
+        return bool(deleted)
+
+    @staticmethod
+    def _purge_jobs(sha256s: List[str]) -> None:
+        """删除已删除文件的处理任务并释放其生成的文件"""
+        if sha256s:
+            from app.services.blob_job_service import BlobJobService
+            BlobJobService.purge(sha256s)
 
     @staticmethod
     def get_blob(blob_id: int) -> Blob:
@@ -79,15 +220,10 @@ class BlobService:
 
     @staticmethod
     def delete_blob(blob_id: int) -> None:
-        """删除blob记录和文件"""
+        """删除blob记录和文件，仍被教材引用时拒绝删除"""
         blob = BlobService.get_blob(blob_id)
-        
-        # 删除文件
-        if os.path.exists(blob.file_path):
-            os.remove(blob.file_path)
-        
-        # 删除数据库记录
-        blob.delete_instance()
+        if blob.ref_count > 0 or not BlobService._delete_if_unreferenced(blob_id):
+            raise ValidationException(f"Blob with id {blob_id} is still referenced by materials")
 
     @staticmethod
     def get_file_content(blob_id: int):
@@ -96,11 +232,15 @@ class BlobService:
         if not blob:
             raise FileNotFoundError(f"找不到ID为{blob_id}的文件")
 
-        if not os.path.exists(blob.file_path):
+        store = get_blob_store()
+        if not store.exists(blob.file_path):
             raise FileNotFoundError(f"文件{blob.file_path}不存在")
 
+        local_path = store.local_path(blob.file_path)
+        if local_path is None:
+            return redirect(store.presigned_url(blob.file_path, blob.file_name, blob.mime_type))
         return send_file(
-            blob.file_path,
+            local_path,
             mimetype=blob.mime_type,
             as_attachment=True,
             download_name=blob.file_name
@@ -0,0 +1,205 @@
+import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Optional
+from flask import current_app
+from werkzeug.utils import secure_filename
+
+
+class BlobStore(ABC):
+    """
+    blob 文件存储接口
+    key 为按内容寻址的相对路径: <sha[0:2]>/.../<sha256>_<文件名>，目录层数由 fanout_depth 决定
+    """
+
+    def __init__(self, fanout_depth: int = 1):
+        self.fanout_depth = fanout_depth
+
+    def key_for(self, sha256: str, filename: str) -> str:
+        # 使用sha256的前几位作为子目录，防止单个目录文件过多
+        directories = [sha256[i * 2:i * 2 + 2] for i in range(self.fanout_depth)]
+        return '/'.join(directories + [f"{sha256}_{secure_filename(filename)}"])
+
+    @abstractmethod
+    def put_file(self, local_path: str, key: str, content_type: Optional[str] = None) -> None:
+        """将本地临时文件存入存储，成功后本地文件不再存在"""
+
+    @abstractmethod
+    def put_stream(self, stream: BinaryIO, key: str, content_type: Optional[str] = None) -> None:
+        """将数据流写入存储"""
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        """以流的方式读取文件，调用方负责关闭"""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """文件是否存在"""
+
+    @abstractmethod
+    def size(self, key: str) -> int:
+        """文件字节数，不存在时抛出 FileNotFoundError"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """删除文件，不存在时忽略"""
+
+    def local_path(self, key: str) -> Optional[str]:
+        """文件在本机磁盘上的路径，不在本地时返回 None"""
+        return None
+
+    def presigned_url(self, key: str, filename: str, mime_type: str) -> Optional[str]:
+        """可直接下载文件的临时 URL，不支持时返回 None"""
+        return None
+
+
+class LocalBlobStore(BlobStore):
+    """本地文件系统存储"""
+
+    def __init__(self, root: str, fanout_depth: int = 1):
+        super().__init__(fanout_depth)
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        # 兼容旧记录中保存的完整文件路径
+        if os.path.isabs(key) or key.startswith(self.root.rstrip('/\\') + os.sep):
+            return key
+        return os.path.join(self.root, *key.split('/'))
+
+    def put_file(self, local_path: str, key: str, content_type: Optional[str] = None) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(local_path, path)
+
+    def put_stream(self, stream: BinaryIO, key: str, content_type: Optional[str] = None) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 临时文件与目标在同一目录下，保证 os.replace 是原子的；每次调用使用独立的文件名
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                shutil.copyfileobj(stream, f, 1024 * 1024)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self._path(key), 'rb')
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def size(self, key: str) -> int:
+        return os.path.getsize(self._path(key))
+
+    def delete(self, key: str) -> None:
+        path = self._path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def local_path(self, key: str) -> Optional[str]:
+        return self._path(key)
+
+
+class S3BlobStore(BlobStore):
+    """
+    S3 兼容的对象存储 (AWS S3 / MinIO 等，endpoint_url 指向本地服务即可)
+    依赖 boto3，仅在使用该后端时需要安装
+    """
+
+    def __init__(self, bucket: str, prefix: str = '', endpoint_url: Optional[str] = None,
+                 region_name: Optional[str] = None, access_key: Optional[str] = None,
+                 secret_key: Optional[str] = None, presign_expires: int = 3600,
+                 fanout_depth: int = 1, client=None):
+        super().__init__(fanout_depth)
+        if client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise RuntimeError("S3 blob store requires boto3 (pip install boto3)")
+            client = boto3.client(
+                's3',
+                endpoint_url=endpoint_url or None,
+                region_name=region_name or None,
+                aws_access_key_id=access_key or None,
+                aws_secret_access_key=secret_key or None
+            )
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.presign_expires = presign_expires
+
+    def _object_key(self, key: str) -> str:
+        return f'{self.prefix}/{key}' if self.prefix else key
+
+    def _extra_args(self, content_type: Optional[str]) -> dict:
+        return {'ContentType': content_type} if content_type else {}
+
+    def put_file(self, local_path: str, key: str, content_type: Optional[str] = None) -> None:
+        # upload_file 会自动分片上传大文件
+        self.client.upload_file(local_path, self.bucket, self._object_key(key), ExtraArgs=self._extra_args(content_type))
+        os.remove(local_path)
+
+    def put_stream(self, stream: BinaryIO, key: str, content_type: Optional[str] = None) -> None:
+        self.client.upload_fileobj(stream, self.bucket, self._object_key(key), ExtraArgs=self._extra_args(content_type))
+
+    def open(self, key: str) -> BinaryIO:
+        return self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))['Body']
+
+    def _head(self, key: str) -> Optional[dict]:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except self.client.exceptions.ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def exists(self, key: str) -> bool:
+        return self._head(key) is not None
+
+    def size(self, key: str) -> int:
+        head = self._head(key)
+        if head is None:
+            raise FileNotFoundError(key)
+        return head['ContentLength']
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    def presigned_url(self, key: str, filename: str, mime_type: str) -> Optional[str]:
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params={
+                'Bucket': self.bucket,
+                'Key': self._object_key(key),
+                'ResponseContentType': mime_type,
+                'ResponseContentDisposition': f'inline; filename="{secure_filename(filename)}"',
+            },
+            ExpiresIn=self.presign_expires
+        )
+
+
+def create_blob_store(config) -> BlobStore:
+    """根据配置创建存储后端"""
+    if config['BLOB_STORE'] == 's3':
+        return S3BlobStore(
+            bucket=config['BLOB_S3_BUCKET'],
+            prefix=config['BLOB_S3_PREFIX'],
+            endpoint_url=config['BLOB_S3_ENDPOINT_URL'],
+            region_name=config['BLOB_S3_REGION'],
+            access_key=config['BLOB_S3_ACCESS_KEY'],
+            secret_key=config['BLOB_S3_SECRET_KEY'],
+            presign_expires=config['BLOB_PRESIGN_EXPIRES'],
+            fanout_depth=config['BLOB_FANOUT_DEPTH']
+        )
+    return LocalBlobStore(config['UPLOAD_FOLDER'], fanout_depth=config['BLOB_FANOUT_DEPTH'])
+
+
+def get_blob_store() -> BlobStore:
+    """获取当前应用的存储后端，首次调用时创建"""
+    store = current_app.extensions.get('blob_store')
+    if store is None:
+        store = current_app.extensions['blob_store'] = create_blob_store(current_app.config)
+    return store
@@ -0,0 +1,93 @@
+import hashlib
+import threading
+import time
+from typing import NamedTuple, Optional
+import orjson
+from app.config import Config
+from app.models.cache_generation import CacheGeneration
+
+
+class CategorySnapshot(NamedTuple):
+    """某一版本分类数据的预序列化结果"""
+    generation: int
+    list_body: bytes
+    list_etag: str
+    tree_body: bytes
+    tree_etag: str
+
+
+class CategoryTreeCache:
+    """
+    进程内的分类列表/分类树缓存
+    分类写操作调用 invalidate() 递增数据库中的共享版本号，
+    各进程按 check_interval 读取版本号，发现变化时才重新加载并序列化整张表
+    """
+    NAME = 'categories'
+
+    def __init__(self, check_interval: float = Config.CATEGORY_CACHE_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._snapshot: Optional[CategorySnapshot] = None
+        self._checked_at = 0.0
+
+    @classmethod
+    def _shared_generation(cls) -> int:
+        row = CacheGeneration.get_or_none(CacheGeneration.name == cls.NAME)
+        return row.generation if row else 0
+
+    def invalidate(self) -> None:
+        """
+        递增共享版本号并丢弃本进程的快照，应在写事务提交后调用:
+        若在事务内递增，其他进程可能在提交前读到新版本号和旧数据，并以新版本号缓存旧数据
+        """
+        updated = (CacheGeneration
+                   .update(generation=CacheGeneration.generation + 1)
+                   .where(CacheGeneration.name == self.NAME)
+                   .execute())
+        if not updated:
+            CacheGeneration.insert(name=self.NAME, generation=1).on_conflict_ignore().execute()
+        with self._lock:
+            self._snapshot = None
+
+    def get(self) -> CategorySnapshot:
+        """获取当前快照，共享版本号变化时重建"""
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._checked_at < self.check_interval:
+            return snapshot
+
+        generation = self._shared_generation()
+        self._checked_at = now
+        if snapshot is not None and snapshot.generation == generation:
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is None or self._snapshot.generation != generation:
+                self._snapshot = self._build(generation)
+            return self._snapshot
+
+    @staticmethod
+    def _build(generation: int) -> CategorySnapshot:
+        # 在读取版本号之后加载数据，期间发生的写入会在下一次检查时触发重建
+        from app.services.category_service import CategoryService
+
+        categories = CategoryService.get_all_categories()
+        list_body = orjson.dumps({
+            "data": categories,
+            "message": "Categories retrieved successfully"
+        })
+        # 列表已序列化完毕，可以直接复用同一批字典构建树
+        tree_body = orjson.dumps({
+            "data": CategoryService.build_tree(categories),
+            "message": "Category tree retrieved successfully"
+        })
+        return CategorySnapshot(
+            generation=generation,
+            list_body=list_body,
+            list_etag=hashlib.sha1(list_body).hexdigest(),
+            tree_body=tree_body,
+            tree_etag=hashlib.sha1(tree_body).hexdigest(),
+        )
+
+
+category_tree_cache = CategoryTreeCache()
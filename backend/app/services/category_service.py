@@ -1,6 +1,10 @@
-from typing import List, Optional, Dict, Any
-from app.models.category import Category
+from itertools import chain
+from typing import Iterator, List, Optional, Dict, Any
+from app.models.category import Category, CategoryClosure
+from app.database import db
+from app.services.category_cache import category_tree_cache
 from app.exceptions.customer_exceptions import NotFoundException, BadRequestException
+from app.utils.streaming import iterate_query
 from peewee import DoesNotExist, IntegrityError
 from datetime import datetime
 from flask import request
@@ -10,17 +14,19 @@ class CategoryService:
     @staticmethod
     def get_all_categories() -> List[Dict[str, Any]]:
         """Get all categories"""
-        categories = Category.select()
+        categories = Category.select().order_by(Category.id)
         return [category.to_json() for category in categories]
 
     @staticmethod
     def get_category_tree() -> List[Dict[str, Any]]:
         """Get categories in a tree structure"""
-        # Get all categories
-        categories = Category.select().order_by(Category.id)
-        
+        return CategoryService.build_tree(CategoryService.get_all_categories())
+
+    @staticmethod
+    def build_tree(categories: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Nest serialized categories (ordered by ID) under their parents"""
         # Create a dictionary of categories for quick lookup
-        category_dict = {category.id: category.to_json() for category in categories}
+        category_dict = {category['id']: category for category in categories}
         
         # Build the tree
         tree = []
@@ -53,34 +59,69 @@ class CategoryService:
     @staticmethod
     def get_children(category_id: int) -> List[Dict[str, Any]]:
         """Get all direct children of a category"""
-        try:
-            # Check if the parent category exists
-            Category.get_by_id(category_id)
-            
-            children = Category.select().where(Category.parent_id == category_id)
-            return [child.to_json() for child in children]
-        except DoesNotExist:
-            raise NotFoundException(f"Parent category with ID {category_id} not found")
+        return list(CategoryService.iter_children(category_id))
+
+    @staticmethod
+    def iter_children(category_id: int) -> Iterator[Dict[str, Any]]:
+        """Lazily yield the direct children of a category; raises NotFoundException before yielding"""
+        rows = iterate_query(Category.select().where(Category.parent_id == category_id).order_by(Category.id))
+        first = next(rows, None)
+        # Only check that the parent exists when it has no children
+        if first is None:
+            if not Category.select().where(Category.id == category_id).exists():
+                raise NotFoundException(f"Parent category with ID {category_id} not found")
+            return iter(())
+        return (row.to_json() for row in chain((first,), rows))
 
     @staticmethod
     def get_descendants(category_id: int) -> List[Dict[str, Any]]:
-        """Get all descendants of a category (children, grandchildren, etc.)"""
-        try:
-            # Check if the category exists
-            Category.get_by_id(category_id)
-            
-            # Get direct children first
-            children = CategoryService.get_children(category_id)
-            descendants = children.copy()
-            
-            # Recursively get descendants
-            for child in children:
-                child_descendants = CategoryService.get_descendants(child['id'])
-                descendants.extend(child_descendants)
-                
-            return descendants
-        except DoesNotExist:
+        """Get all descendants of a category (children, grandchildren, etc.), nearest first"""
+        return list(CategoryService.iter_descendants(category_id))
+
+    @staticmethod
+    def iter_descendants(category_id: int) -> Iterator[Dict[str, Any]]:
+        """Lazily yield the descendants of a category, nearest first; raises NotFoundException before yielding"""
+        query = (Category
+                 .select()
+                 .join(CategoryClosure, on=(CategoryClosure.descendant == Category.id))
+                 .where(CategoryClosure.ancestor == category_id)
+                 .order_by(CategoryClosure.depth, Category.id))
+        rows = iterate_query(query)
+        # The closure table holds a depth-0 row for the category itself, which sorts first
+        if next(rows, None) is None:
             raise NotFoundException(f"Category with ID {category_id} not found")
+        return (row.to_json() for row in rows)
+
+    @staticmethod
+    def get_subtree_ids(category_id: int) -> List[int]:
+        """Get the IDs of a category and all of its descendants"""
+        query = (CategoryClosure
+                 .select(CategoryClosure.descendant)
+                 .where(CategoryClosure.ancestor == category_id))
+        return [row.descendant for row in query]
+
+    @staticmethod
+    def is_descendant(category_id: int, ancestor_id: int) -> bool:
+        """Check whether category_id lies in the subtree rooted at ancestor_id"""
+        return CategoryClosure.select().where(
+            (CategoryClosure.ancestor == ancestor_id) &
+            (CategoryClosure.descendant == category_id)
+        ).exists()
+
+    @staticmethod
+    def _attach_to_parent(category_id: int, parent_id: Optional[int]) -> None:
+        """Link every node of a subtree to the ancestors of its new parent"""
+        if parent_id is None:
+            return
+        parent_path = CategoryClosure.alias()
+        subtree = CategoryClosure.alias()
+        paths = (parent_path
+                 .select(parent_path.ancestor, subtree.descendant, parent_path.depth + subtree.depth + 1)
+                 .join(subtree, on=(subtree.ancestor == category_id))
+                 .where(parent_path.descendant == parent_id))
+        CategoryClosure.insert_from(
+            paths, [CategoryClosure.ancestor, CategoryClosure.descendant, CategoryClosure.depth]
+        ).execute()
 
     @staticmethod
     def create_category(display_name: str, parent_id: Optional[int] = None) -> Dict[str, Any]:
@@ -93,14 +134,18 @@ class CategoryService:
                 except DoesNotExist:
                     raise NotFoundException(f"Parent category with ID {parent_id} not found")
             
-            category = Category.create(
-                display_name=display_name, 
-                parent_id=parent_id,
-                created_by=request.user_id,
-                updated_by=request.user_id,
-                created_at=datetime.now(),
-                updated_at=datetime.now()
-            )
+            with db.atomic():
+                category = Category.create(
+                    display_name=display_name, 
+                    parent_id=parent_id,
+                    created_by=request.user_id,
+                    updated_by=request.user_id,
+                    created_at=datetime.now(),
+                    updated_at=datetime.now()
+                )
+                CategoryClosure.create(ancestor=category.id, descendant=category.id, depth=0)
+                CategoryService._attach_to_parent(category.id, parent_id)
+            category_tree_cache.invalidate()
             return category.to_json()
         except IntegrityError as e:
             raise BadRequestException(f"Error creating category: {str(e)}")
@@ -125,28 +170,42 @@ class CategoryService:
                 
                 # Check if new parent exists
                 if parent_id is not None:
-                    try:
-                        Category.get_by_id(parent_id)
-                        
-                        # Prevent creating loops in the hierarchy
-                        descendants = CategoryService.get_descendants(category_id)
-                        descendant_ids = [desc['id'] for desc in descendants]
-                        if parent_id in descendant_ids:
-                            raise BadRequestException("Cannot set a descendant as parent")
-                    except DoesNotExist:
+                    if not Category.select().where(Category.id == parent_id).exists():
                         raise NotFoundException(f"Parent category with ID {parent_id} not found")
+
+                    # Prevent creating loops in the hierarchy
+                    if CategoryService.is_descendant(parent_id, category_id):
+                        raise BadRequestException("Cannot set a descendant as parent")
                 
+                parent_changed = parent_id != category.parent_id
                 category.parent_id = parent_id
+            else:
+                parent_changed = False
             
             # Update the updated_by and updated_at fields
             category.updated_by = request.user_id
             category.updated_at = datetime.now()
             
-            category.save()
+            with db.atomic():
+                category.save()
+                if parent_changed:
+                    CategoryService._move_subtree(category_id, category.parent_id)
+            category_tree_cache.invalidate()
             return category.to_json()
         except DoesNotExist:
             raise NotFoundException(f"Category with ID {category_id} not found")
 
+    @staticmethod
+    def _move_subtree(category_id: int, parent_id: Optional[int]) -> None:
+        """Re-link a subtree in the closure table after its root changed parent"""
+        subtree_ids = CategoryService.get_subtree_ids(category_id)
+        # Drop the paths from the old ancestors into the subtree, keep paths inside it
+        CategoryClosure.delete().where(
+            CategoryClosure.descendant.in_(subtree_ids) &
+            CategoryClosure.ancestor.not_in(subtree_ids)
+        ).execute()
+        CategoryService._attach_to_parent(category_id, parent_id)
+
     @staticmethod
     def delete_category(category_id: int, recursive: bool = False) -> Dict[str, str]:
         """Delete a category"""
@@ -161,14 +220,16 @@ class CategoryService:
                     "Cannot delete category with children. Set recursive=True to delete all children as well."
                 )
             
-            if recursive:
-                # Delete all descendants recursively
-                descendants = CategoryService.get_descendants(category_id)
-                for descendant in reversed(descendants):  # Delete from bottom up
-                    Category.delete_by_id(descendant['id'])
-            
-            # Delete the category
-            category.delete_instance()
+            with db.atomic():
+                if recursive:
+                    # Delete the category together with all of its descendants
+                    subtree_ids = CategoryService.get_subtree_ids(category_id)
+                    Category.delete().where(Category.id.in_(subtree_ids)).execute()
+                    CategoryClosure.delete().where(CategoryClosure.descendant.in_(subtree_ids)).execute()
+                else:
+                    category.delete_instance()
+                    CategoryClosure.delete().where(CategoryClosure.descendant == category_id).execute()
+            category_tree_cache.invalidate()
             
             return {"message": f"Category {category_id} deleted successfully"}
         except DoesNotExist:
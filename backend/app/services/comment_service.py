@@ -0,0 +1,123 @@
+from typing import Dict, Iterable, Optional
+from datetime import datetime
+from flask import abort
+from peewee import fn
+from app.models.comment import Comment
+from app.models.material import Material
+from app.models.user import User
+from app.database import db
+from app.utils.pagination import cursor_paginate
+from app.utils.projection import Projection
+from app.exceptions.customer_exceptions import NotFoundException, ValidationException
+
+# 评论列表: 作者信息随评论一起 join 取出
+COMMENT_PROJECTION = Projection(
+    Comment,
+    exclude=('created_by', 'updated_by'),
+    join={'user': Projection(User, fields=['id', 'username', 'avatar'])}
+)
+COMMENT_MAX_LENGTH = 2000
+COMMENT_MAX_PAGE_SIZE = 100
+
+
+class CommentService:
+    @staticmethod
+    def get_comments(material_id: int, cursor: Optional[str] = None, page_size: int = 20) -> Dict:
+        """按时间倒序游标分页获取教材的评论，使用 (material_id, created_at) 索引"""
+        if not Material.select().where(Material.id == material_id).exists():
+            raise NotFoundException("Material not found")
+        query = Comment.select().where(Comment.material == material_id)
+        return cursor_paginate(query, cursor, min(page_size, COMMENT_MAX_PAGE_SIZE), 'created_at', 'none', COMMENT_PROJECTION)
+
+    @staticmethod
+    def _validate_content(content: Optional[str]) -> str:
+        content = (content or '').strip()
+        if not content:
+            raise ValidationException("Comment content is required")
+        if len(content) > COMMENT_MAX_LENGTH:
+            raise ValidationException(f"Comment content must be at most {COMMENT_MAX_LENGTH} characters")
+        return content
+
+    @staticmethod
+    def create_comment(material_id: int, content: str, current_user_id: int) -> Dict:
+        """发表评论，并在同一事务中原子递增教材的评论数"""
+        content = CommentService._validate_content(content)
+        with db.atomic():
+            # UPDATE ... SET comment_count = comment_count + 1，同时确认教材存在
+            updated = (Material
+                       .update(comment_count=Material.comment_count + 1)
+                       .where(Material.id == material_id)
+                       .execute())
+            if not updated:
+                raise NotFoundException("Material not found")
+            comment = Comment.create(
+                material=material_id,
+                user=current_user_id,
+                content=content,
+                created_by=current_user_id,
+                updated_by=current_user_id
+            )
+        return CommentService._get_comment_json(comment.id)
+
+    @staticmethod
+    def update_comment(comment_id: int, content: str, current_user_id: int) -> Dict:
+        """修改评论内容，仅作者本人可修改"""
+        content = CommentService._validate_content(content)
+        comment = Comment.get_or_none(Comment.id == comment_id)
+        if not comment:
+            raise NotFoundException("Comment not found")
+        if comment.user_id != current_user_id:
+            abort(403, description="Only the author can edit this comment")
+        comment.content = content
+        comment.updated_by = current_user_id
+        comment.save()
+        return CommentService._get_comment_json(comment.id)
+
+    @staticmethod
+    def delete_comment(comment_id: int, current_user_id: int, current_user_role_id: int) -> None:
+        """删除评论(作者本人、管理员或教师)，并原子递减教材的评论数"""
+        comment = Comment.get_or_none(Comment.id == comment_id)
+        if not comment:
+            raise NotFoundException("Comment not found")
+        if comment.user_id != current_user_id and current_user_role_id not in (1, 2):
+            abort(403, description="No permission to delete this comment")
+        with db.atomic():
+            deleted = Comment.delete().where(Comment.id == comment_id).execute()
+            # 并发删除同一条评论时只有一方实际删除，只递减一次
+            if deleted:
+                (Material
+                 .update(comment_count=Material.comment_count - 1)
+                 .where((Material.id == comment.material_id) & (Material.comment_count > 0))
+                 .execute())
+
+    @staticmethod
+    def count_comments(material_ids: Iterable[int]) -> Dict[int, int]:
+        """用一次 GROUP BY 统计一批教材的评论数"""
+        material_ids = list(material_ids)
+        if not material_ids:
+            return {}
+        query = (Comment
+                 .select(Comment.material, fn.COUNT(Comment.id))
+                 .where(Comment.material.in_(material_ids))
+                 .group_by(Comment.material)
+                 .tuples())
+        counts = dict.fromkeys(material_ids, 0)
+        counts.update(query)
+        return counts
+
+    @staticmethod
+    def recount_comments(material_ids: Iterable[int]) -> int:
+        """按实际评论数校正一批教材的评论计数，返回被修正的教材数"""
+        fixed = 0
+        with db.atomic():
+            for material_id, count in CommentService.count_comments(material_ids).items():
+                fixed += (Material
+                          .update(comment_count=count)
+                          .where((Material.id == material_id) & (Material.comment_count != count))
+                          .execute())
+        return fixed
+
+    @staticmethod
+    def _get_comment_json(comment_id: int) -> Dict:
+        query = COMMENT_PROJECTION.apply(Comment.select()).where(Comment.id == comment_id)
+        return COMMENT_PROJECTION.serialize(query.get(), {})
@@ -1,34 +1,61 @@
-from typing import List, Optional, Dict
-from app.models.material import Material
+import base64
+import binascii
+import io
+import re
+from collections import Counter
+from typing import Iterator, List, Optional, Dict, Tuple
+from urllib.parse import urlparse
+from app.models.material import Material, MaterialCategory, parse_category_ids
+from app.models.category import Category, CategoryClosure
 from app.models.blob import Blob
-from app.utils.pagination import paginate_query
-from app.exceptions.customer_exceptions import NotFoundException, ValidationException
-from peewee import fn
-import operator
-from functools import reduce
+from app.models.comment import Comment
+from app.services.blob_service import BlobService
+from app.services.blob_store import get_blob_store
+from app.database import db
+from app.config import Config
+from app.utils.cache import create_content_cache
+from app.utils.pagination import paginate_query, cursor_paginate
+from app.utils.projection import Projection
+from app.utils.streaming import iterate_query
+from app.services.search_service import search_engine
+from app.exceptions.customer_exceptions import NotFoundException, ValidationException, BadRequestException
 from datetime import datetime
-from flask import request, current_app
-import os
-import hashlib
+from peewee import JOIN
+from flask import request
 from werkzeug.utils import secure_filename
 import mimetypes
-import shutil
 
-class MaterialService:
-    @staticmethod
-    def _calculate_sha256(file_data: bytes) -> str:
-        sha256_hash = hashlib.sha256()
-        sha256_hash.update(file_data)
-        return sha256_hash.hexdigest()
+# 教材内容缓存，键为文件的 sha256
+content_cache = create_content_cache(Config)
+
+# 批量操作: 单次最多处理的教材数，以及每个事务处理的分块大小
+MATERIAL_BATCH_MAX_SIZE = 5000
+MATERIAL_BATCH_CHUNK_SIZE = 500
+MATERIAL_BATCH_FILTERS = ('display_name', 'description', 'category_ids', 'type', 'include_descendants')
+
+# 封面图片以 blob 保存，通过可缓存的预览接口访问
+MATERIAL_COVER_MAX_SIZE = 2 * 1024 * 1024
+COVER_URL_PREFIX = '/api/blob/preview/'
+DATA_URL_PATTERN = re.compile(r'^data:(?P<mime>[\w.+-]+/[\w.+-]+)?(?:;[^,;]+)*;base64,', re.IGNORECASE)
 
-    @staticmethod
-    def _get_file_path(filename: str, sha256: str) -> str:
-        sub_dir = sha256[:2]
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        directory = os.path.join(upload_folder, sub_dir)
-        os.makedirs(directory, exist_ok=True)
-        return os.path.join(directory, f"{sha256}_{secure_filename(filename)}")
 
+def cover_url(cover_blob_id: Optional[int]) -> Optional[str]:
+    """封面的预览地址"""
+    return f"{COVER_URL_PREFIX}{cover_blob_id}" if cover_blob_id else None
+
+
+# 教材列表: 文件信息随列表一起 join 取出(前端预览需要 blob_id.id / mime_type)，其余外键只输出ID
+# 较大的文本列默认不查询，需通过 include 参数显式请求
+MATERIAL_LARGE_FIELDS = ('description',)
+MATERIAL_COMPUTED_FIELDS = {'cover': lambda item: cover_url(item['cover_blob_id'])}
+MATERIAL_LIST_PROJECTION = Projection(
+    Material, exclude=MATERIAL_LARGE_FIELDS, join={'blob_id': Projection(Blob)}, computed=MATERIAL_COMPUTED_FIELDS
+)
+# 导出包含全部列
+MATERIAL_EXPORT_PROJECTION = Projection(Material, join={'blob_id': Projection(Blob)}, computed=MATERIAL_COMPUTED_FIELDS)
+_list_projections: Dict[frozenset, Projection] = {frozenset(): MATERIAL_LIST_PROJECTION}
+
+class MaterialService:
     @staticmethod
     def get_materials(
         page: int = 1,
@@ -36,23 +63,183 @@ class MaterialService:
         display_name: Optional[str] = None,
         description: Optional[str] = None,
         category_ids: Optional[str] = None,
-        type: Optional[str] = None
+        type: Optional[str] = None,
+        cursor: Optional[str] = None,
+        order_by: str = 'id',
+        total_mode: Optional[str] = None,
+        include_descendants: bool = False,
+        include: Optional[str] = None
     ) -> Dict:
+        """
+        :param include: 逗号分隔的大字段名(如 description)，列表默认不返回这些列
+        """
+        projection = MaterialService._list_projection(include)
+        query, scores = MaterialService._filter_materials(display_name, description, category_ids, type, include_descendants)
+        # 传入 cursor 参数(可为空字符串表示第一页)时使用游标分页，按游标键排序
+        if cursor is not None:
+            return cursor_paginate(query, cursor, page_size, order_by, total_mode or 'none', projection)
+        if scores:
+            query = query.order_by(sum(scores[1:], scores[0]).desc(), Material.id.desc())
+        return paginate_query(query, page, page_size, total_mode or 'exact', projection)
+
+    @staticmethod
+    def _list_projection(include: Optional[str]) -> Projection:
+        """按请求的大字段选择列表投影，每种组合只构造一次"""
+        fields = frozenset(name.strip() for name in (include or '').split(',') if name.strip())
+        unknown = fields - set(MATERIAL_LARGE_FIELDS)
+        if unknown:
+            raise BadRequestException(f"Unsupported include fields: {', '.join(sorted(unknown))}")
+        projection = _list_projections.get(fields)
+        if projection is None:
+            projection = _list_projections[fields] = Projection(
+                Material,
+                exclude=[name for name in MATERIAL_LARGE_FIELDS if name not in fields],
+                join={'blob_id': Projection(Blob)},
+                computed=MATERIAL_COMPUTED_FIELDS
+            )
+        return projection
+
+    @staticmethod
+    def export_materials(
+        display_name: Optional[str] = None,
+        description: Optional[str] = None,
+        category_ids: Optional[str] = None,
+        type: Optional[str] = None,
+        include_descendants: bool = False
+    ) -> Iterator[Dict]:
+        """按ID顺序逐行导出符合条件的教材，通过服务端游标读取；筛选条件在开始输出前校验"""
+        query, _ = MaterialService._filter_materials(display_name, description, category_ids, type, include_descendants)
+        query = MATERIAL_EXPORT_PROJECTION.apply(query.order_by(Material.id))
+        return (MATERIAL_EXPORT_PROJECTION.serialize(material, {}) for material in iterate_query(query))
+
+    @staticmethod
+    def _filter_materials(
+        display_name: Optional[str],
+        description: Optional[str],
+        category_ids: Optional[str],
+        type: Optional[str],
+        include_descendants: bool
+    ):
+        """构造教材筛选查询，返回 (查询, 全文检索相关度表达式列表)"""
         query = Material.select()
-        if display_name:
-            query = query.where(Material.display_name.contains(display_name))
-        if description:
-            query = query.where(Material.description.contains(description))
+        # 全文检索，返回的相关度表达式用于排序
+        scores = []
+        for field, keyword in (('display_name', display_name), ('description', description)):
+            if keyword:
+                query, score = search_engine.apply(query, field, keyword)
+                if score is not None:
+                    scores.append(score)
         if category_ids:
-            category_id_list = category_ids.split(',')
-            conditions = [
-                fn.FIND_IN_SET(cat_id, Material.category_ids) > 0
-                for cat_id in category_id_list
-            ]
-            query = query.where(conditions[0] if len(conditions) == 1 else reduce(operator.or_, conditions))
+            query = query.where(Material.id.in_(
+                MaterialService._material_ids_in_categories(
+                    MaterialService._parse_category_filter(category_ids), include_descendants
+                )
+            ))
         if type:
             query = query.where(Material.material_type == type)
-        return paginate_query(query, page, page_size)
+        return query, scores
+
+    @staticmethod
+    def _parse_category_filter(value) -> List[int]:
+        """解析筛选条件中的分类ID: 逗号分隔的字符串，或批量接口 JSON 中的ID列表"""
+        try:
+            if isinstance(value, (list, tuple)):
+                return [int(id_) for id_ in value]
+            return parse_category_ids(str(value))
+        except (TypeError, ValueError):
+            raise BadRequestException("category_ids must be a comma separated list of integers")
+
+    @staticmethod
+    def _normalize_category_ids(value) -> str:
+        """校验创建/更新时提交的分类ID并规范为逗号分隔的字符串"""
+        try:
+            category_ids = parse_category_ids(value) if isinstance(value, str) else [int(id_) for id_ in value]
+        except (TypeError, ValueError):
+            raise ValidationException("category_ids must be a comma separated list of integers")
+        return ','.join(str(id_) for id_ in dict.fromkeys(category_ids))
+
+    @staticmethod
+    def _material_ids_in_categories(category_ids: List[int], include_descendants: bool = False):
+        """属于任一给定分类(可选包含其子孙分类)的教材ID子查询"""
+        if include_descendants:
+            category_filter = MaterialCategory.category_id.in_(
+                CategoryClosure.select(CategoryClosure.descendant).where(CategoryClosure.ancestor.in_(category_ids))
+            )
+        else:
+            category_filter = MaterialCategory.category_id.in_(category_ids)
+        return MaterialCategory.select(MaterialCategory.material_id).where(category_filter)
+
+    @staticmethod
+    def _decode_cover(value: str) -> Tuple[bytes, str]:
+        """解析 base64 / data URL 格式的封面图片，返回 (图片内容, MIME 类型)"""
+        match = DATA_URL_PATTERN.match(value)
+        mime_type = (match.group('mime') if match else None) or 'image/jpeg'
+        if not mime_type.lower().startswith('image/'):
+            raise ValidationException("Cover must be an image")
+        payload = value[match.end():] if match else value
+        try:
+            return base64.b64decode(''.join(payload.split()), validate=True), mime_type.lower()
+        except (binascii.Error, ValueError):
+            raise ValidationException("Cover must be a base64 encoded image or a blob preview URL")
+
+    @staticmethod
+    def _get_cover_blob(blob_id) -> int:
+        try:
+            blob = BlobService.get_blob(int(blob_id))
+        except (TypeError, ValueError):
+            raise ValidationException("cover_blob_id must be an integer")
+        except NotFoundException as e:
+            raise ValidationException(e.message)
+        if not blob.mime_type.lower().startswith('image/'):
+            raise ValidationException("Cover must be an image")
+        return blob.id
+
+    @staticmethod
+    def _resolve_cover(data: Dict, current: Optional[int], pins: List[int]) -> Optional[int]:
+        """
+        从请求数据中取出封面并返回新的封面 blob ID，两者都未提供时保持不变:
+        - cover_blob_id: 已通过 /api/blob/upload 上传的图片，为空表示移除封面
+        - cover: base64 / data URL 图片(旧客户端)，或接口返回的预览地址，空字符串表示移除封面
+        base64 图片以 blob 保存，内容相同的封面只保存一份；保存时持有的引用记入 pins，
+        由调用方在事务提交后通过 BlobService.release_pins 释放
+        """
+        if 'cover_blob_id' in data:
+            cover_blob_id = data.pop('cover_blob_id')
+            data.pop('cover', None)
+            return MaterialService._get_cover_blob(cover_blob_id) if cover_blob_id not in (None, '') else None
+        cover = data.pop('cover', None)
+        if cover is None:
+            return current
+        cover = cover.strip()
+        if not cover:
+            return None
+
+        path = urlparse(cover).path
+        if path.startswith(COVER_URL_PREFIX):
+            blob_id = path[len(COVER_URL_PREFIX):]
+            if blob_id == str(current):
+                return current
+            return MaterialService._get_cover_blob(blob_id)
+
+        content, mime_type = MaterialService._decode_cover(cover)
+        if len(content) > MATERIAL_COVER_MAX_SIZE:
+            raise ValidationException(f"Cover size exceeds {MATERIAL_COVER_MAX_SIZE // (1024 * 1024)}MB limit")
+        extension = mimetypes.guess_extension(mime_type) or ''
+        blob = BlobService.ingest_stream(io.BytesIO(content), f"cover{extension}", mime_type,
+                                         max_size=MATERIAL_COVER_MAX_SIZE, acquire=True)
+        pins.append(blob.id)
+        return blob.id
+
+    @staticmethod
+    def _swap_cover(old: Optional[int], new: Optional[int], released: List[int]) -> None:
+        """封面变化时调整引用计数，需在事务中调用；旧封面记入 released，在事务提交后清理"""
+        if new == old:
+            return
+        if new:
+            BlobService.acquire(new)
+        if old:
+            BlobService.release_many({old: 1})
+            released.append(old)
 
     @staticmethod
     def create_material(data: Dict, current_user_id: int) -> Material:
@@ -63,70 +250,65 @@ class MaterialService:
             if field not in data:
                 raise ValidationException(f"Missing required field: {field}")
 
-        # 处理文件上传
-        blob_id = None
-        if 'file' not in request.files:
-            raise ValidationException("File is required for upload type material")
-        
-        file = request.files['file']
-        if file.filename == '':
-            raise ValidationException("No file selected")
+        data['category_ids'] = MaterialService._normalize_category_ids(data['category_ids'])
+
+        # 文件可以是表单中的 file，或已通过分片上传接口(/api/blob/uploads)上传完成的 blob_id。
+        # 表单文件已由 werkzeug 先缓存到内存/临时文件，这里再读一遍写入存储；
+        # 分片上传时请求体直接流式写入磁盘，大文件应优先使用该方式
+        if data.get('blob_id'):
+            try:
+                blob = BlobService.get_blob(int(data.pop('blob_id')))
+            except (TypeError, ValueError):
+                raise ValidationException("blob_id must be an integer")
+            except NotFoundException as e:
+                raise ValidationException(e.message)
+            # 与 store_file(acquire=True) 一样先持有引用，避免 blob 在教材创建前被删除
+            try:
+                BlobService.acquire(blob.id)
+            except NotFoundException as e:
+                raise ValidationException(e.message)
+        else:
+            data.pop('blob_id', None)
+            if 'file' not in request.files:
+                raise ValidationException("File is required for upload type material")
+
+            file = request.files['file']
+            if file.filename == '':
+                raise ValidationException("No file selected")
 
-        try:
             # 获取文件信息
             filename = secure_filename(file.filename)
             mime_type = file.content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
 
-            # 创建临时文件
-            temp_path = os.path.join(current_app.config['UPLOAD_FOLDER'], 'temp', filename)
-            os.makedirs(os.path.dirname(temp_path), exist_ok=True)
-            file.save(temp_path)
-
-            # 计算文件大小和SHA256
-            file_size = os.path.getsize(temp_path)
-            with open(temp_path, 'rb') as f:
-                sha256 = MaterialService._calculate_sha256(f.read())
-
-            # 检查是否已存在相同的文件
-            existing_blob = Blob.get_or_none(Blob.sha256 == sha256)
-            if existing_blob:
-                blob_id = existing_blob.id
-                # 删除临时文件
-                os.remove(temp_path)
-            else:
-                # 生成最终存储路径
-                file_path = MaterialService._get_file_path(filename, sha256)
-                
-                # 移动文件到最终位置
-                shutil.move(temp_path, file_path)
-
-                # 创建数据库记录
-                blob = Blob.create(
-                    file_name=filename,
-                    file_path=file_path,
-                    mime_type=mime_type,
-                    file_size=file_size,
-                    sha256=sha256
-                )
-                blob_id = blob.id
-
-        except Exception as e:
-            # 清理临时文件
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-            raise ValidationException(f"File upload failed: {str(e)}")
-
-        # 添加创建者和更新者信息
-        data['created_by'] = current_user_id
-        data['updated_by'] = current_user_id
-        data['created_at'] = datetime.now()
-        data['updated_at'] = datetime.now()
-        
-        # 如果是上传类型，添加blob_id
-        data['blob_id'] = blob_id
+            # 边写入边计算哈希，相同内容的文件复用已有blob；
+            # 保存时持有引用，避免复用的 blob 在教材创建前被并发删除
+            try:
+                blob = BlobService.ingest_stream(file.stream, filename, mime_type, acquire=True)
+            except ValidationException as e:
+                raise ValidationException(f"File upload failed: {e.message}")
+        blob_id = blob.id
+        pins = [blob_id]
+        try:
+            data['cover_blob_id'] = MaterialService._resolve_cover(data, None, pins)
 
-        # 创建教材
-        material = Material.create(**data)
+            # 添加创建者和更新者信息
+            data['created_by'] = current_user_id
+            data['updated_by'] = current_user_id
+            data['created_at'] = datetime.now()
+            data['updated_at'] = datetime.now()
+
+            # 如果是上传类型，添加blob_id
+            data['blob_id'] = blob_id
+
+            # 创建教材并增加文件和封面的引用计数
+            with db.atomic():
+                material = Material.create(**data)
+                BlobService.acquire(blob_id)
+                MaterialService._swap_cover(None, material.cover_blob_id_id, [])
+        finally:
+            # 创建失败时新保存的文件没有其他引用，随之删除
+            BlobService.release_pins(pins)
+        search_engine.index(material)
         return material
 
     @staticmethod
@@ -134,11 +316,30 @@ class MaterialService:
         material = Material.get_or_none(Material.id == material_id)
         if not material:
             raise NotFoundException("Material not found")
+        if 'category_ids' in data:
+            data['category_ids'] = MaterialService._normalize_category_ids(data['category_ids'])
         data['updated_by'] = request.user_id
         data['updated_at'] = datetime.now()
-        for key, value in data.items():
-            setattr(material, key, value)
-        material.save()
+        old_blob_id = material.blob_id_id
+        old_cover_id = material.cover_blob_id_id
+        pins: List[int] = []
+        released: List[int] = []
+        try:
+            data['cover_blob_id'] = MaterialService._resolve_cover(data, old_cover_id, pins)
+            for key, value in data.items():
+                setattr(material, key, value)
+            with db.atomic():
+                material.save()
+                if material.blob_id_id != old_blob_id:
+                    BlobService.acquire(material.blob_id_id)
+                    BlobService.release_many({old_blob_id: 1})
+                    released.append(old_blob_id)
+                MaterialService._swap_cover(old_cover_id, material.cover_blob_id_id, released)
+        finally:
+            BlobService.release_pins(pins)
+        # 不再被引用的文件在事务提交后删除，事务回滚时不会留下指向已删除文件的记录
+        BlobService.delete_unreferenced(released)
+        search_engine.index(material)
         return material
 
     @staticmethod
@@ -146,7 +347,176 @@ class MaterialService:
         material = Material.get_or_none(Material.id == material_id)
         if not material:
             raise NotFoundException("Material not found")
-        material.delete_instance()
+        references = Counter(blob_id for blob_id in (material.blob_id_id, material.cover_blob_id_id) if blob_id)
+        with db.atomic():
+            MaterialCategory.delete().where(MaterialCategory.material_id == material_id).execute()
+            Comment.delete().where(Comment.material == material_id).execute()
+            material.delete_instance()
+            BlobService.release_many(references)
+        # 没有其他教材引用的文件在事务提交后删除
+        BlobService.delete_unreferenced(references)
+        search_engine.remove(material_id)
+
+    @staticmethod
+    def resolve_batch_ids(ids: Optional[List] = None, filters: Optional[Dict] = None) -> List[int]:
+        """
+        解析批量操作的目标: 直接给出的ID列表，或与列表接口相同的筛选条件
+        :param filters: display_name / description / category_ids / type / include_descendants
+        """
+        if (ids is None) == (filters is None):
+            raise ValidationException("Exactly one of ids or filter is required")
+        if ids is not None:
+            try:
+                # 去重并保持请求中的顺序
+                result = list(dict.fromkeys(int(id_) for id_ in ids))
+            except (TypeError, ValueError):
+                raise ValidationException("ids must be a list of integers")
+        else:
+            if not isinstance(filters, dict) or not filters:
+                raise ValidationException("filter must be a non-empty object")
+            unknown = set(filters) - set(MATERIAL_BATCH_FILTERS)
+            if unknown:
+                raise ValidationException(f"Unsupported filter fields: {', '.join(sorted(unknown))}")
+            try:
+                query, _ = MaterialService._filter_materials(
+                    filters.get('display_name'),
+                    filters.get('description'),
+                    filters.get('category_ids'),
+                    filters.get('type'),
+                    bool(filters.get('include_descendants'))
+                )
+            except BadRequestException as e:
+                raise ValidationException(e.message)
+            query = query.select(Material.id).order_by(Material.id).limit(MATERIAL_BATCH_MAX_SIZE + 1)
+            result = [id_ for (id_,) in query.tuples()]
+        if len(result) > MATERIAL_BATCH_MAX_SIZE:
+            raise ValidationException(f"A batch can contain at most {MATERIAL_BATCH_MAX_SIZE} materials")
+        return result
+
+    @staticmethod
+    def _batch_report(ids: List[int], succeeded: set, status: str) -> Dict:
+        results = [
+            {'id': id_, 'status': status} if id_ in succeeded else {'id': id_, 'status': 'error', 'message': 'Material not found'}
+            for id_ in ids
+        ]
+        return {'total': len(ids), 'succeeded': len(succeeded), 'failed': len(ids) - len(succeeded), 'results': results}
+
+    @staticmethod
+    def _existing_ids(chunk: List[int]) -> set:
+        return {id_ for (id_,) in Material.select(Material.id).where(Material.id.in_(chunk)).tuples()}
+
+    @staticmethod
+    def batch_publish(ids: List[int], is_publish: bool, current_user_id: int) -> Dict:
+        """批量发布/取消发布，每个分块一条 UPDATE ... WHERE id IN (...)，各自一个事务"""
+        succeeded = set()
+        now = datetime.now()
+        for start in range(0, len(ids), MATERIAL_BATCH_CHUNK_SIZE):
+            chunk = ids[start:start + MATERIAL_BATCH_CHUNK_SIZE]
+            with db.atomic():
+                existing = MaterialService._existing_ids(chunk)
+                if existing:
+                    (Material
+                     .update(publish_status='public' if is_publish else 'private', updated_by=current_user_id, updated_at=now)
+                     .where(Material.id.in_(list(existing)))
+                     .execute())
+            succeeded |= existing
+        return MaterialService._batch_report(ids, succeeded, 'updated')
+
+    @staticmethod
+    def batch_delete(ids: List[int]) -> Dict:
+        """
+        批量删除教材及其分类关联、评论，并按 blob 合并减少引用计数
+        计数归零的文件在分块事务提交后删除
+        """
+        succeeded = set()
+        for start in range(0, len(ids), MATERIAL_BATCH_CHUNK_SIZE):
+            chunk = ids[start:start + MATERIAL_BATCH_CHUNK_SIZE]
+            with db.atomic():
+                rows = list(Material
+                            .select(Material.id, Material.blob_id, Material.cover_blob_id)
+                            .where(Material.id.in_(chunk))
+                            .tuples())
+                existing = [material_id for material_id, _, _ in rows]
+                # 教材文件和封面都按 blob 合并计数
+                references = Counter(blob_id for _, file_id, cover_id in rows for blob_id in (file_id, cover_id) if blob_id)
+                if existing:
+                    MaterialCategory.delete().where(MaterialCategory.material_id.in_(existing)).execute()
+                    Comment.delete().where(Comment.material.in_(existing)).execute()
+                    Material.delete().where(Material.id.in_(existing)).execute()
+                    BlobService.release_many(references)
+            if existing:
+                BlobService.delete_unreferenced(references)
+                for material_id in existing:
+                    search_engine.remove(material_id)
+            succeeded.update(existing)
+        return MaterialService._batch_report(ids, succeeded, 'deleted')
+
+    @staticmethod
+    def batch_set_categories(ids: List[int], category_ids: List, mode: str, current_user_id: int) -> Dict:
+        """
+        批量修改教材分类，同时维护 category_ids 字段和 material_categories 关联表
+        :param mode: replace 替换为给定分类 / add 追加 / remove 移除
+        """
+        if mode not in ('replace', 'add', 'remove'):
+            raise ValidationException(f"Unsupported mode: {mode}")
+        try:
+            category_ids = list(dict.fromkeys(int(id_) for id_ in category_ids))
+        except (TypeError, ValueError):
+            raise ValidationException("category_ids must be a list of integers")
+        if not category_ids and mode != 'replace':
+            raise ValidationException("category_ids is required")
+        found = {id_ for (id_,) in Category.select(Category.id).where(Category.id.in_(category_ids)).tuples()} if category_ids else set()
+        missing = [id_ for id_ in category_ids if id_ not in found]
+        if missing:
+            raise ValidationException(f"Categories not found: {', '.join(map(str, missing))}")
+
+        succeeded = set()
+        now = datetime.now()
+        for start in range(0, len(ids), MATERIAL_BATCH_CHUNK_SIZE):
+            chunk = ids[start:start + MATERIAL_BATCH_CHUNK_SIZE]
+            with db.atomic():
+                current = dict(Material.select(Material.id, Material.category_ids).where(Material.id.in_(chunk)).tuples())
+                # 按结果分组，分类相同的教材合并为一条 UPDATE
+                groups: Dict[str, List[int]] = {}
+                for material_id, value in current.items():
+                    if mode == 'replace':
+                        new_ids = category_ids
+                    elif mode == 'add':
+                        new_ids = list(dict.fromkeys(parse_category_ids(value, skip_invalid=True) + category_ids))
+                    else:
+                        new_ids = [id_ for id_ in parse_category_ids(value, skip_invalid=True) if id_ not in category_ids]
+                    groups.setdefault(','.join(map(str, new_ids)), []).append(material_id)
+                for value, material_ids in groups.items():
+                    (Material
+                     .update(category_ids=value, updated_by=current_user_id, updated_at=now)
+                     .where(Material.id.in_(material_ids))
+                     .execute())
+
+                existing = list(current)
+                if existing:
+                    if mode == 'add':
+                        MaterialService._insert_category_links(existing, category_ids, ignore_existing=True)
+                    elif mode == 'remove':
+                        MaterialCategory.delete().where(
+                            MaterialCategory.material_id.in_(existing) & MaterialCategory.category_id.in_(category_ids)
+                        ).execute()
+                    else:
+                        MaterialCategory.delete().where(MaterialCategory.material_id.in_(existing)).execute()
+                        MaterialService._insert_category_links(existing, category_ids)
+            succeeded.update(current)
+        return MaterialService._batch_report(ids, succeeded, 'updated')
+
+    @staticmethod
+    def _insert_category_links(material_ids: List[int], category_ids: List[int], ignore_existing: bool = False) -> None:
+        """写入教材与分类的全部组合，分批 insert_many 以免超过数据库参数个数上限"""
+        links = [{'material_id': m, 'category_id': c} for m in material_ids for c in category_ids]
+        # 每行两个参数，SQLite 默认上限为 999 个
+        batch_size = 400
+        for start in range(0, len(links), batch_size):
+            query = MaterialCategory.insert_many(links[start:start + batch_size])
+            if ignore_existing:
+                query = query.on_conflict_ignore()
+            query.execute()
 
     @staticmethod
     def toggle_publish(material_id: int, is_publish: bool, current_user_id: int) -> Material:
@@ -162,15 +532,24 @@ class MaterialService:
 
     @staticmethod
     def get_material_content(material_id: int) -> str:
-        material = Material.get_or_none(Material.id == material_id)
-        if not material:
+        # 一次联表查询取出教材对应文件的 sha256 和存储位置
+        row = (Material
+               .select(Material.id, Blob.sha256, Blob.file_path)
+               .join(Blob, JOIN.LEFT_OUTER, on=(Material.blob_id == Blob.id))
+               .where(Material.id == material_id)
+               .dicts()
+               .first())
+        if not row:
             raise NotFoundException("Material not found")
-        blob = Blob.get_or_none(Blob.id == material.blob_id)
-        if not blob:
+        if not row['sha256']:
             raise NotFoundException("Material blob not found")
-        with open(blob.file_path, 'rb') as file:
-            content = file.read()
-        return content.decode('utf-8')
+
+        def load() -> bytes:
+            with get_blob_store().open(row['file_path']) as file:
+                return file.read()
+
+        # 文件按内容寻址，以 sha256 为缓存键无需失效处理
+        return content_cache.get_text(row['sha256'], load)
     @staticmethod
     def save_material_content(material_id: int, content: str, current_user_id: int) -> Material:
         material = Material.get_or_none(Material.id == material_id)
@@ -0,0 +1,161 @@
+import logging
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+import bcrypt
+from werkzeug.security import generate_password_hash, check_password_hash
+from app.config import Config
+from app.exceptions.customer_exceptions import TooManyRequestsException
+
+logger = logging.getLogger(__name__)
+
+PASSWORD_ALGORITHMS = ('pbkdf2', 'bcrypt')
+# bcrypt 只使用密码的前 72 字节，新版 bcrypt 对更长的密码直接抛出 ValueError；
+# 与当前算法无关地统一限制，以免切换到 bcrypt 后已有密码无法重新哈希
+PASSWORD_MAX_BYTES = 72
+
+
+def password_too_long(password: str) -> bool:
+    return len(password.encode('utf-8')) > PASSWORD_MAX_BYTES
+
+
+# 以下函数在工作进程中执行，必须是模块级函数以便序列化
+def _hash_password(password: str, algorithm: str, cost: int) -> str:
+    if algorithm == 'bcrypt':
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=cost)).decode('ascii')
+    return generate_password_hash(password, method=f'pbkdf2:sha256:{cost}')
+
+
+def _verify_password(password: str, password_hash: str) -> bool:
+    if password_hash.startswith('$2'):
+        if password_too_long(password):
+            # 超长密码不可能是设置时通过校验的密码，视为不匹配
+            return False
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('ascii'))
+    return check_password_hash(password_hash, password)
+
+
+def _hash_params(password_hash: str):
+    """从哈希串中解析出 (算法, 成本)，无法识别时返回 (None, None)"""
+    if password_hash.startswith('$2'):
+        # $2b$12$...
+        parts = password_hash.split('$')
+        return 'bcrypt', int(parts[2]) if len(parts) > 2 and parts[2].isdigit() else None
+    method = password_hash.split('$', 1)[0]
+    parts = method.split(':')
+    if parts[0] == 'pbkdf2':
+        # werkzeug 省略迭代次数时使用其默认值，视为需要重新哈希
+        return 'pbkdf2', int(parts[2]) if len(parts) > 2 and parts[2].isdigit() else None
+    return None, None
+
+
+class PasswordHasher:
+    """
+    密码哈希/校验在独立的进程池中执行，避免大量登录时占满请求线程
+    排队中的任务数超过上限时直接拒绝(TooManyRequestsException)，而不是无限堆积
+    """
+
+    def __init__(self, algorithm: str, cost: int, workers: int, max_pending: int, timeout: float):
+        if algorithm not in PASSWORD_ALGORITHMS:
+            raise ValueError(f"Unsupported password algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self.cost = cost
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor: Optional[Executor] = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        # 首次使用时才创建进程池
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _reset_executor(self, executor: Executor) -> None:
+        """工作进程异常退出后进程池不再可用，丢弃后在下次使用时重新创建"""
+        with self._executor_lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def _call_many(self, fn, args_list: List[tuple]) -> List:
+        """
+        在进程池中并行执行一组调用并等待全部结果，每个任务的等待时间不超过 timeout；
+        进程池损坏时重建一次，超时视为服务繁忙
+        """
+        for attempt in range(2):
+            executor = self._get_executor()
+            try:
+                futures = [executor.submit(fn, *args) for args in args_list]
+                return [future.result(timeout=self.timeout) for future in futures]
+            except BrokenProcessPool:
+                logger.warning('Password hashing pool is broken, recreating it')
+                self._reset_executor(executor)
+            except FutureTimeoutError:
+                raise TooManyRequestsException("密码处理超时，请稍后重试")
+        raise TooManyRequestsException("服务繁忙，请稍后重试")
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise TooManyRequestsException("服务繁忙，请稍后重试")
+        try:
+            if self.workers <= 0:
+                return fn(*args)
+            return self._call_many(fn, [args])[0]
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        return self._run(_hash_password, password, self.algorithm, self.cost)
+
+    def hash_many(self, passwords: List[str]) -> List[str]:
+        """
+        批量哈希: 每次只向进程池提交与进程数相同的任务，并为每个任务占用一个排队名额，
+        等这一小批完成后再提交下一批。登录等交互请求的任务最多排在一小批之后，
+        不会因为批量导入占满进程池而超时
+        """
+        results: List[str] = []
+        batch_size = max(1, self.workers)
+        for start in range(0, len(passwords), batch_size):
+            batch = passwords[start:start + batch_size]
+            acquired = 0
+            try:
+                # 名额被交互请求占满时稍作等待，而不是让整个导入失败
+                for _ in batch:
+                    if not self._slots.acquire(timeout=self.timeout):
+                        raise TooManyRequestsException("服务繁忙，请稍后重试")
+                    acquired += 1
+                args_list = [(password, self.algorithm, self.cost) for password in batch]
+                if self.workers <= 0:
+                    results.extend(_hash_password(*args) for args in args_list)
+                else:
+                    results.extend(self._call_many(_hash_password, args_list))
+            finally:
+                for _ in range(acquired):
+                    self._slots.release()
+        return results
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        return self._run(_verify_password, password, password_hash)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """哈希的算法或成本与当前配置不一致时返回 True，登录成功后据此重新哈希"""
+        return _hash_params(password_hash) != (self.algorithm, self.cost)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    Config.PASSWORD_HASH_ALGORITHM,
+    Config.PASSWORD_BCRYPT_ROUNDS if Config.PASSWORD_HASH_ALGORITHM == 'bcrypt' else Config.PASSWORD_PBKDF2_ITERATIONS,
+    Config.PASSWORD_HASH_WORKERS,
+    Config.PASSWORD_HASH_MAX_PENDING,
+    Config.PASSWORD_HASH_TIMEOUT
+)
@@ -0,0 +1,196 @@
+import bisect
+import math
+from abc import ABC, abstractmethod
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from peewee import Case, Value
+from playhouse.mysql_ext import Match
+from app.config import Config
+from app.models.material import Material
+
+# 可全文检索的教材字段
+SEARCH_FIELDS = ('display_name', 'description')
+
+# ASCII 单词 / 其他文字(中文等)连续片段
+_TOKEN_RE = re.compile(r'[0-9a-zA-Z]+|[^\W\d_a-zA-Z]+')
+# MySQL 布尔模式下的运算符，用户输入中需要去掉
+_BOOLEAN_OPERATORS_RE = re.compile(r'[+\-<>()~*"@]')
+
+NGRAM_SIZE = 2  # 与 MySQL ngram_token_size 默认值一致
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """分词: ASCII 单词转小写，中文等按 ngram 切分(不足 ngram 长度时保留原片段)"""
+    tokens = []
+    for run in _TOKEN_RE.findall(text or ''):
+        if run.isascii():
+            tokens.append(run.lower())
+        elif len(run) <= NGRAM_SIZE:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + NGRAM_SIZE] for i in range(len(run) - NGRAM_SIZE + 1))
+    return tokens
+
+
+class SearchEngine(ABC):
+    """
+    教材全文检索接口
+    apply() 在查询上追加检索条件，并返回可用于排序的相关度表达式
+    """
+
+    @abstractmethod
+    def apply(self, query, field: str, keyword: str):
+        """返回 (追加了检索条件的查询, 相关度表达式)，关键词为空时相关度为 None"""
+
+    def index(self, material: Material) -> None:
+        """教材创建或更新后调用"""
+
+    def remove(self, material_id: int) -> None:
+        """教材删除后调用"""
+
+
+class MySQLFulltextSearch(SearchEngine):
+    """
+    基于 MySQL FULLTEXT 索引(ngram 分词器)的检索
+    索引由 InnoDB 随写入自动维护，index/remove 无需额外操作
+    """
+
+    @staticmethod
+    def _boolean_query(keyword: str) -> str:
+        # 每个词都必须出现(+)，并允许前缀匹配(*)
+        terms = _BOOLEAN_OPERATORS_RE.sub(' ', keyword).split()
+        return ' '.join(f'+{term}*' for term in terms)
+
+    def apply(self, query, field: str, keyword: str):
+        expression = self._boolean_query(keyword)
+        if not expression:
+            return query, None
+        score = Match(getattr(Material, field), Value(expression), 'IN BOOLEAN MODE')
+        return query.where(score), score
+
+
+class _FieldIndex:
+    """单个字段的倒排索引: token -> {教材ID: 词频}"""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.documents: Dict[int, Counter] = {}
+        self._sorted_tokens: Optional[List[str]] = None
+
+    def add(self, doc_id: int, text: Optional[str]) -> None:
+        self.discard(doc_id)
+        counts = Counter(tokenize(text))
+        if not counts:
+            return
+        self.documents[doc_id] = counts
+        for token, count in counts.items():
+            if token not in self.postings:
+                self._sorted_tokens = None
+            self.postings.setdefault(token, {})[doc_id] = count
+
+    def discard(self, doc_id: int) -> None:
+        counts = self.documents.pop(doc_id, None)
+        if not counts:
+            return
+        for token in counts:
+            docs = self.postings[token]
+            docs.pop(doc_id, None)
+            if not docs:
+                del self.postings[token]
+                self._sorted_tokens = None
+
+    def _expand(self, term: str) -> List[str]:
+        """前缀匹配: 返回以 term 开头的所有 token"""
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self.postings)
+        tokens = self._sorted_tokens
+        start = bisect.bisect_left(tokens, term)
+        matched = []
+        for token in tokens[start:]:
+            if not token.startswith(term):
+                break
+            matched.append(token)
+        return matched
+
+    def search(self, keyword: str) -> Dict[int, float]:
+        """所有词都必须命中(前缀即可)，按 TF-IDF 累加得分"""
+        total = len(self.documents) or 1
+        scores: Optional[Dict[int, float]] = None
+        for term in tokenize(keyword):
+            term_scores: Dict[int, float] = {}
+            for token in self._expand(term):
+                docs = self.postings[token]
+                idf = math.log(1 + total / len(docs))
+                for doc_id, count in docs.items():
+                    term_scores[doc_id] = term_scores.get(doc_id, 0.0) + count * idf
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc_id: score + term_scores[doc_id] for doc_id, score in scores.items() if doc_id in term_scores}
+            if not scores:
+                return {}
+        return scores or {}
+
+
+class InvertedIndexSearch(SearchEngine):
+    """
+    纯 Python 的进程内倒排索引，用于 SQLite / 本地测试
+    首次检索时从数据库加载，之后随教材的增删改增量更新
+    命中结果以 IN 列表和 CASE 表达式传回数据库(每条约 3 个参数)，只保留得分最高的 max_hits 条，
+    以免超过 SQLite 的参数个数上限
+    """
+
+    def __init__(self, max_hits: int = Config.SEARCH_MAX_HITS):
+        self.max_hits = max_hits
+        self._lock = threading.Lock()
+        self._fields: Optional[Dict[str, _FieldIndex]] = None
+
+    def _ensure_loaded(self) -> Dict[str, _FieldIndex]:
+        if self._fields is None:
+            fields = {name: _FieldIndex() for name in SEARCH_FIELDS}
+            columns = [Material.id] + [getattr(Material, name) for name in SEARCH_FIELDS]
+            for row in Material.select(*columns).dicts().iterator():
+                for name in SEARCH_FIELDS:
+                    fields[name].add(row['id'], row[name])
+            self._fields = fields
+        return self._fields
+
+    def search(self, field: str, keyword: str) -> List[Tuple[int, float]]:
+        """返回 (教材ID, 得分)，按得分从高到低排序"""
+        with self._lock:
+            scores = self._ensure_loaded()[field].search(keyword)
+        return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+
+    def apply(self, query, field: str, keyword: str):
+        if not tokenize(keyword):
+            return query, None
+        hits = self.search(field, keyword)[:self.max_hits]
+        if not hits:
+            return query.where(Material.id.in_([])), None
+        score = Case(Material.id, [(doc_id, round(value, 6)) for doc_id, value in hits], 0)
+        return query.where(Material.id.in_([doc_id for doc_id, _ in hits])), score
+
+    def index(self, material: Material) -> None:
+        with self._lock:
+            if self._fields is None:
+                return
+            for name in SEARCH_FIELDS:
+                self._fields[name].add(material.id, getattr(material, name))
+
+    def remove(self, material_id: int) -> None:
+        with self._lock:
+            if self._fields is None:
+                return
+            for index in self._fields.values():
+                index.discard(material_id)
+
+
+def create_search_engine(backend: str = Config.SEARCH_BACKEND) -> SearchEngine:
+    if backend == 'memory':
+        return InvertedIndexSearch()
+    return MySQLFulltextSearch()
+
+
+search_engine = create_search_engine()
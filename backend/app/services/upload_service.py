@@ -0,0 +1,239 @@
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime
+from typing import BinaryIO, Dict, List, Optional
+from flask import current_app
+from peewee import fn
+from werkzeug.utils import secure_filename
+import mimetypes
+from app.config import Config
+from app.database import db
+from app.models.upload_session import UploadSession, UploadPart
+from app.services.blob_service import BlobService, CHUNK_SIZE
+from app.exceptions.customer_exceptions import NotFoundException, ValidationException, BadRequestException
+
+logger = logging.getLogger(__name__)
+
+
+class UploadService:
+    """分片(可续传)上传: 创建会话 -> 逐个上传分片 -> 查询已接收分片 -> 合并完成"""
+
+    @staticmethod
+    def _session_dir(upload_id: str) -> str:
+        return os.path.join(current_app.config['UPLOAD_FOLDER'], 'sessions', upload_id)
+
+    @staticmethod
+    def _part_path(upload_id: str, part_number: int) -> str:
+        return os.path.join(UploadService._session_dir(upload_id), f'{part_number}.part')
+
+    @staticmethod
+    def _to_json(session: UploadSession, parts: Optional[List[UploadPart]] = None) -> Dict:
+        result = {
+            'upload_id': session.upload_id,
+            'file_name': session.file_name,
+            'mime_type': session.mime_type,
+            'total_size': session.total_size,
+            'part_size': session.part_size,
+            'status': session.status,
+            'blob_id': session.blob_id,
+            'expires_at': session.expires_at.isoformat(),
+        }
+        if parts is not None:
+            result['parts'] = [
+                {'part_number': part.part_number, 'size': part.size, 'sha256': part.sha256}
+                for part in parts
+            ]
+        return result
+
+    @staticmethod
+    def get_session(upload_id: str, current_user_id: int) -> UploadSession:
+        """获取当前用户的上传会话"""
+        session = UploadSession.get_or_none(
+            (UploadSession.upload_id == upload_id) & (UploadSession.created_by == current_user_id)
+        )
+        if not session or session.expires_at < datetime.now():
+            raise NotFoundException(f"Upload session {upload_id} not found")
+        return session
+
+    @staticmethod
+    def initiate(file_name: str, mime_type: Optional[str], total_size: Optional[int], current_user_id: int) -> Dict:
+        """创建上传会话"""
+        file_name = secure_filename(file_name or '')
+        if not file_name:
+            raise ValidationException("file_name is required")
+        if total_size is not None and not 0 <= total_size <= Config.UPLOAD_MAX_FILE_SIZE:
+            raise ValidationException(f"total_size must be between 0 and {Config.UPLOAD_MAX_FILE_SIZE}")
+
+        upload_id = uuid.uuid4().hex
+        os.makedirs(UploadService._session_dir(upload_id), exist_ok=True)
+        session = UploadSession.create(
+            upload_id=upload_id,
+            file_name=file_name,
+            mime_type=mime_type or mimetypes.guess_type(file_name)[0] or 'application/octet-stream',
+            total_size=total_size,
+            part_size=Config.UPLOAD_PART_SIZE,
+            expires_at=datetime.now() + Config.UPLOAD_SESSION_TTL,
+            created_by=current_user_id,
+            updated_by=current_user_id
+        )
+        return UploadService._to_json(session)
+
+    @staticmethod
+    def put_part(upload_id: str, part_number: int, stream: BinaryIO, current_user_id: int) -> Dict:
+        """接收一个分片，直接流式写入磁盘；重复上传同一分片会覆盖之前的内容"""
+        session = UploadService.get_session(upload_id, current_user_id)
+        if session.status != 'uploading':
+            raise BadRequestException("Upload session is already completed")
+        if not 1 <= part_number <= Config.UPLOAD_MAX_PARTS:
+            raise ValidationException(f"part_number must be between 1 and {Config.UPLOAD_MAX_PARTS}")
+
+        # request.stream 不受 MAX_CONTENT_LENGTH 限制，写入时按分片上限和会话剩余容量截止
+        remaining = UploadService._remaining_size(session, part_number)
+        part_path = UploadService._part_path(upload_id, part_number)
+        os.makedirs(os.path.dirname(part_path), exist_ok=True)
+        temp_path = f'{part_path}.{uuid.uuid4().hex}.tmp'
+        sha256_hash = hashlib.sha256()
+        size = 0
+        try:
+            with open(temp_path, 'wb') as part_file:
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                    size += len(chunk)
+                    if size > Config.UPLOAD_MAX_PART_SIZE:
+                        raise ValidationException(f"Part size exceeds {Config.UPLOAD_MAX_PART_SIZE} bytes")
+                    if size > remaining:
+                        raise ValidationException(f"Uploaded parts exceed {UploadService._size_limit(session)} bytes")
+                    sha256_hash.update(chunk)
+                    part_file.write(chunk)
+            if size == 0:
+                raise ValidationException("Part body is empty")
+
+            with db.atomic():
+                # 并发上传的其他分片可能已经占用了剩余容量
+                if size > UploadService._remaining_size(session, part_number):
+                    raise ValidationException(f"Uploaded parts exceed {UploadService._size_limit(session)} bytes")
+                os.replace(temp_path, part_path)
+                UploadPart.delete().where(
+                    (UploadPart.session == session) & (UploadPart.part_number == part_number)
+                ).execute()
+                UploadPart.create(session=session, part_number=part_number, size=size, sha256=sha256_hash.hexdigest())
+                # 有活动的会话顺延过期时间
+                session.expires_at = datetime.now() + Config.UPLOAD_SESSION_TTL
+                session.updated_by = current_user_id
+                session.save()
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        return {'part_number': part_number, 'size': size, 'sha256': sha256_hash.hexdigest()}
+
+    @staticmethod
+    def _size_limit(session: UploadSession) -> int:
+        return session.total_size if session.total_size is not None else Config.UPLOAD_MAX_FILE_SIZE
+
+    @staticmethod
+    def _remaining_size(session: UploadSession, part_number: int) -> int:
+        """会话还能接收的字节数，同一分片重传时不计算其旧内容"""
+        used = UploadPart.select(fn.COALESCE(fn.SUM(UploadPart.size), 0)).where(
+            (UploadPart.session == session) & (UploadPart.part_number != part_number)
+        ).scalar()
+        return max(UploadService._size_limit(session) - used, 0)
+
+    @staticmethod
+    def describe(upload_id: str, current_user_id: int) -> Dict:
+        """查询会话状态及已接收的分片"""
+        session = UploadService.get_session(upload_id, current_user_id)
+        parts = list(session.parts.order_by(UploadPart.part_number))
+        return UploadService._to_json(session, parts)
+
+    @staticmethod
+    def complete(upload_id: str, current_user_id: int) -> Dict:
+        """按顺序合并所有分片，同时计算整个文件的SHA256，并登记为blob(按sha256去重)"""
+        session = UploadService.get_session(upload_id, current_user_id)
+        if session.status == 'completed':
+            return UploadService._to_json(session)
+
+        parts = list(session.parts.order_by(UploadPart.part_number))
+        if not parts:
+            raise BadRequestException("No parts have been uploaded")
+        expected = list(range(1, len(parts) + 1))
+        if [part.part_number for part in parts] != expected:
+            missing = sorted(set(range(1, parts[-1].part_number + 1)) - {part.part_number for part in parts})
+            raise BadRequestException(f"Missing parts: {missing}")
+        file_size = sum(part.size for part in parts)
+        if session.total_size is not None and file_size != session.total_size:
+            raise BadRequestException(f"Uploaded {file_size} bytes, expected {session.total_size}")
+        if file_size > Config.UPLOAD_MAX_FILE_SIZE:
+            raise ValidationException(f"File size exceeds {Config.UPLOAD_MAX_FILE_SIZE} bytes")
+
+        fd, temp_path = BlobService.create_temp_file()
+        try:
+            sha256_hash = hashlib.sha256()
+            with os.fdopen(fd, 'wb') as target:
+                for part in parts:
+                    with open(UploadService._part_path(upload_id, part.part_number), 'rb') as source:
+                        for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                            sha256_hash.update(chunk)
+                            target.write(chunk)
+            blob = BlobService.store_file(temp_path, session.file_name, session.mime_type, file_size, sha256_hash.hexdigest())
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        with db.atomic():
+            UploadPart.delete().where(UploadPart.session == session).execute()
+            session.status = 'completed'
+            session.blob = blob
+            session.updated_by = current_user_id
+            session.save()
+        shutil.rmtree(UploadService._session_dir(upload_id), ignore_errors=True)
+        return UploadService._to_json(session)
+
+    @staticmethod
+    def abort(upload_id: str, current_user_id: int) -> None:
+        """放弃上传，删除会话和已上传的分片"""
+        session = UploadService.get_session(upload_id, current_user_id)
+        UploadService._delete_session(session)
+
+    @staticmethod
+    def _delete_session(session: UploadSession) -> None:
+        with db.atomic():
+            UploadPart.delete().where(UploadPart.session == session).execute()
+            session.delete_instance()
+        shutil.rmtree(UploadService._session_dir(session.upload_id), ignore_errors=True)
+
+    @staticmethod
+    def sweep_expired() -> int:
+        """删除已过期的会话及其分片文件，返回清理的会话数"""
+        expired = UploadSession.select().where(UploadSession.expires_at < datetime.now())
+        count = 0
+        for session in expired:
+            UploadService._delete_session(session)
+            count += 1
+        return count
+
+
+class UploadSweeper(threading.Thread):
+    """后台定期清理过期的上传会话"""
+
+    def __init__(self, app, interval: int):
+        super().__init__(name='upload-sweeper', daemon=True)
+        self.app = app
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                with self.app.app_context(), db.connection_context():
+                    count = UploadService.sweep_expired()
+                if count:
+                    logger.info('Removed %d expired upload sessions', count)
+            except Exception:
+                logger.exception('Failed to sweep expired upload sessions')
+
+    def stop(self):
+        self._stopped.set()
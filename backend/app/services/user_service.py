@@ -1,16 +1,63 @@
-from typing import List, Optional
-import bcrypt
+import csv
+import io
+from typing import IO, Dict, Iterator, List, Optional
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+import orjson
+from peewee import IntegrityError
+from app.config import Config
+from app.database import db
+from app.utils.pagination import cursor_paginate
+from app.utils.projection import Projection
+from app.utils.streaming import iterate_query
 from app.models.user import User
 from app.models.role import Role
+from app.utils.token_cache import token_versions
+from app.services.password_service import PASSWORD_MAX_BYTES, password_hasher, password_too_long
+from app.exceptions.customer_exceptions import ValidationException
 from flask import abort, request
 
+# 批量导入时 IN 查询和 insert_many 的分批大小
+USER_IMPORT_BATCH_SIZE = 500
+
+# 用户列表输出的列，不包含密码
+USER_LIST_PROJECTION = Projection(User, fields=['id', 'username', 'role_id', 'avatar', 'created_at', 'updated_at'])
+USER_LIST_MAX_PAGE_SIZE = 200
+
 class UserService:
     @staticmethod
-    def get_all_users() -> List[User]:
-        """获取所有用户"""
-        return User.select()
+    def get_all_users() -> List[Dict]:
+        """获取所有用户(不加载密码列)，与分页接口使用相同的输出格式"""
+        return USER_LIST_PROJECTION.serialize_many(USER_LIST_PROJECTION.apply(User.select()))
+
+    @staticmethod
+    def filter_users(role_id: Optional[int] = None, username: Optional[str] = None):
+        """按角色和用户名前缀筛选用户，前缀匹配可以使用 username 索引"""
+        query = User.select()
+        if role_id is not None:
+            query = query.where(User.role_id == role_id)
+        if username:
+            query = query.where(User.username.startswith(username))
+        return query
+
+    @staticmethod
+    def get_users(
+        cursor: Optional[str] = None,
+        page_size: int = 20,
+        role_id: Optional[int] = None,
+        username: Optional[str] = None,
+        total_mode: str = 'none'
+    ) -> Dict:
+        """按ID倒序游标分页获取用户列表"""
+        page_size = min(page_size, USER_LIST_MAX_PAGE_SIZE)
+        query = UserService.filter_users(role_id, username)
+        return cursor_paginate(query, cursor, page_size, 'id', total_mode, USER_LIST_PROJECTION)
+
+    @staticmethod
+    def export_users(role_id: Optional[int] = None, username: Optional[str] = None) -> Iterator[Dict]:
+        """逐行导出用户，按ID顺序通过服务端游标读取，不会一次把整张表载入内存"""
+        query = USER_LIST_PROJECTION.apply(UserService.filter_users(role_id, username)).order_by(User.id)
+        for user in iterate_query(query):
+            yield USER_LIST_PROJECTION.serialize(user, {})
 
     @staticmethod
     def get_user_by_id(user_id: int) -> Optional[User]:
@@ -27,20 +74,19 @@ class UserService:
         :param current_user_role_id: 当前操作用户的角色ID
         """
         # 检查权限
-        if current_user_role_id == 2:  # 老师
-            if role_id != 3:  # 老师只能创建学生
-                abort(403, description="老师只能创建学生账号")
-        elif current_user_role_id == 1:  # 管理员可以创建所有类型用户
-            pass
-        else:
-            abort(403, description="没有创建用户的权限")
+        error = UserService._check_create_permission(role_id, current_user_role_id)
+        if error:
+            abort(403, description=error)
 
         # 检查用户名是否已存在
         if User.get_or_none(User.username == username):
             abort(400, description="用户名已存在")
 
+        if password_too_long(password):
+            abort(400, description=f"密码不能超过{PASSWORD_MAX_BYTES}字节")
+
         # 密码加密
-        password_hash = generate_password_hash(password)
+        password_hash = password_hasher.hash(password)
 
         # 创建用户
         return User.create(
@@ -53,6 +99,141 @@ class UserService:
             updated_by=request.user_id
         )
 
+    @staticmethod
+    def _check_create_permission(role_id: int, current_user_role_id: int) -> Optional[str]:
+        """检查当前用户能否创建指定角色的账号，不能时返回原因"""
+        if current_user_role_id == 2:  # 老师
+            if role_id != 3:  # 老师只能创建学生
+                return "老师只能创建学生账号"
+        elif current_user_role_id == 1:  # 管理员可以创建所有类型用户
+            pass
+        else:
+            return "没有创建用户的权限"
+        return None
+
+    @staticmethod
+    def parse_import(stream: IO[bytes], file_format: str) -> List[Dict]:
+        """
+        解析批量导入的数据
+        :param stream: 上传的文件或请求体
+        :param file_format: csv(表头为 username,password,role_id) 或 json(对象数组)
+        """
+        if file_format == 'csv':
+            reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+            rows = []
+            try:
+                for row in reader:
+                    if len(rows) >= Config.USER_IMPORT_MAX_ROWS:
+                        raise ValidationException(f"最多一次导入 {Config.USER_IMPORT_MAX_ROWS} 个用户")
+                    rows.append(row)
+            except UnicodeDecodeError:
+                raise ValidationException("CSV 文件应为 UTF-8 编码")
+            except csv.Error as e:
+                raise ValidationException(f"CSV 格式错误: {e}")
+            return rows
+        if file_format == 'json':
+            try:
+                rows = orjson.loads(stream.read())
+            except orjson.JSONDecodeError:
+                raise ValidationException("JSON 格式错误")
+            if isinstance(rows, dict):
+                rows = rows.get('users')
+            if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                raise ValidationException("JSON 内容应为用户对象数组")
+            if len(rows) > Config.USER_IMPORT_MAX_ROWS:
+                raise ValidationException(f"最多一次导入 {Config.USER_IMPORT_MAX_ROWS} 个用户")
+            return rows
+        raise ValidationException(f"Unsupported import format: {file_format}")
+
+    @staticmethod
+    def import_users(rows: List[Dict], current_user_role_id: int, current_user_id: int,
+                     default_role_id: Optional[int] = None) -> Dict:
+        """
+        批量创建用户，逐行返回结果；校验失败的行跳过，其余行在一个事务中写入
+        :param rows: 每行包含 username、password，可选 role_id(缺省时使用 default_role_id)
+        :param current_user_role_id: 当前操作用户的角色ID
+        :param current_user_id: 当前操作用户的ID，与 create_user 一样记为创建者和更新者
+        :param default_role_id: 行内未指定角色时使用的角色ID
+        """
+        results: List[Dict] = []
+        pending: List[Dict] = []  # 通过校验待写入的行
+        seen = set()
+        for index, row in enumerate(rows, start=1):
+            username = str(row.get('username') or '').strip()
+            password = str(row.get('password') or '')
+            result = {'row': index, 'username': username}
+            results.append(result)
+
+            role_id = row.get('role_id') or default_role_id
+            try:
+                role_id = int(role_id)
+            except (TypeError, ValueError):
+                role_id = None
+
+            if not username or not password or role_id is None:
+                error = "缺少 username、password 或 role_id"
+            elif password_too_long(password):
+                error = f"密码不能超过{PASSWORD_MAX_BYTES}字节"
+            elif username in seen:
+                error = "导入数据中用户名重复"
+            else:
+                error = UserService._check_create_permission(role_id, current_user_role_id)
+            if error:
+                result.update(status='error', message=error)
+                continue
+            seen.add(username)
+            pending.append({'result': result, 'username': username, 'password': password, 'role_id': role_id})
+
+        # 一次 IN 查询找出已存在的用户名(分批以免超过数据库参数个数上限)
+        existing = set()
+        usernames = [item['username'] for item in pending]
+        for start in range(0, len(usernames), USER_IMPORT_BATCH_SIZE):
+            batch = usernames[start:start + USER_IMPORT_BATCH_SIZE]
+            existing.update(username for (username,) in User.select(User.username).where(User.username.in_(batch)).tuples())
+        for item in pending:
+            if item['username'] in existing:
+                item['result'].update(status='error', message="用户名已存在")
+        pending = [item for item in pending if item['username'] not in existing]
+
+        # 密码哈希分小批在进程池中并行计算，批之间让出进程给登录等请求
+        password_hashes = password_hasher.hash_many([item['password'] for item in pending])
+
+        now = datetime.now()
+        records = [
+            {
+                'username': item['username'],
+                'password': password_hash,
+                'role_id': item['role_id'],
+                'created_at': now,
+                'updated_at': now,
+                'created_by': current_user_id,
+                'updated_by': current_user_id,
+            }
+            for item, password_hash in zip(pending, password_hashes)
+        ]
+        try:
+            with db.atomic():
+                for start in range(0, len(records), USER_IMPORT_BATCH_SIZE):
+                    User.insert_many(records[start:start + USER_IMPORT_BATCH_SIZE]).execute()
+        except IntegrityError:
+            # 校验之后有并发创建的同名用户，整批回滚
+            raise ValidationException("导入期间用户名被占用，请重新导入")
+
+        ids = {}
+        for start in range(0, len(pending), USER_IMPORT_BATCH_SIZE):
+            batch = [item['username'] for item in pending[start:start + USER_IMPORT_BATCH_SIZE]]
+            ids.update(User.select(User.username, User.id).where(User.username.in_(batch)).tuples())
+        for item in pending:
+            item['result'].update(status='created', id=ids.get(item['username']))
+
+        created = len(pending)
+        return {
+            'total': len(results),
+            'created': created,
+            'failed': len(results) - created,
+            'results': results,
+        }
+
     @staticmethod
     def delete_user(user_id: int, current_user_role_id: int, current_user_id: int) -> bool:
         """
@@ -81,6 +262,7 @@ class UserService:
             abort(403, description="没有删除用户的权限")
 
         user.delete_instance()
+        token_versions.forget(user_id)
         return True
 
     @staticmethod
@@ -107,6 +289,12 @@ class UserService:
         else:
             abort(403, description="没有修改用户的权限")
 
+        if password and password_too_long(password):
+            abort(400, description=f"密码不能超过{PASSWORD_MAX_BYTES}字节")
+
+        # 角色或密码变更后，之前签发的 token 全部失效
+        revoke = (role_id is not None and role_id != user.role_id) or bool(password)
+
         # 只更新提供的字段
         if role_id is not None:
             user.role_id = role_id
@@ -115,14 +303,44 @@ class UserService:
             user.avatar = avatar
 
         if password:
-            password_hash = generate_password_hash(password)
+            password_hash = password_hasher.hash(password)
             user.password = password_hash
 
+        if revoke:
+            user.token_version += 1
+
         user.updated_at = datetime.now()
         user.updated_by = request.user_id
         user.save()
+        if revoke:
+            token_versions.set(user.id, user.token_version)
         return user
 
+    @staticmethod
+    def revoke_tokens(user_id: int, current_user_role_id: int) -> bool:
+        """
+        吊销用户已签发的所有 token
+        :param user_id: 用户ID
+        :param current_user_role_id: 当前操作用户的角色ID
+        """
+        user = User.get_or_none(User.id == user_id)
+        if not user:
+            return False
+
+        # 检查权限
+        if current_user_role_id == 2:  # 老师
+            if user.role_id != 3:  # 老师只能吊销学生
+                abort(403, description="老师只能吊销学生账号的登录")
+        elif current_user_role_id != 1:
+            abort(403, description="没有吊销登录的权限")
+
+        User.update(
+            token_version=User.token_version + 1,
+            updated_at=datetime.now()
+        ).where(User.id == user_id).execute()
+        token_versions.set(user_id, User.select(User.token_version).where(User.id == user_id).scalar())
+        return True
+
 class RoleService:
     @staticmethod
     def get_all_roles() -> List[Role]:
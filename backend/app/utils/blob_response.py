@@ -0,0 +1,147 @@
+import os
+import uuid
+from typing import Iterator, List, Optional, Tuple
+from flask import current_app, request, send_file, redirect
+from app.models.blob import Blob
+from app.services.blob_service import CHUNK_SIZE
+from app.services.blob_store import get_blob_store
+from app.exceptions.customer_exceptions import NotFoundException
+
+# blob 按内容(sha256)寻址，同一 ID 的内容永远不会变化，可以长期缓存
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def _read_range(file_path: str, start: int, end: int) -> Iterator[bytes]:
+    """分块读取文件的 [start, end) 区间"""
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _resolve_ranges(length: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    解析 Range 请求头，返回 [start, end) 区间列表
+    返回 None 表示应发送整个文件，返回空列表表示所有区间都无法满足
+    """
+    requested = request.range
+    if requested is None or requested.units != 'bytes':
+        return None
+    if len(requested.ranges) > current_app.config['BLOB_MAX_RANGES']:
+        return None
+
+    ranges = []
+    for start, stop in requested.ranges:
+        if start < 0:
+            # 后缀区间: bytes=-500
+            start, stop = max(0, length + start), length
+        else:
+            stop = length if stop is None else min(stop, length)
+        if start < stop:
+            ranges.append((start, stop))
+    return ranges
+
+
+def _if_range_matches(blob: Blob) -> bool:
+    """If-Range 校验: 只有实体未变化时才按 Range 返回部分内容"""
+    if 'If-Range' not in request.headers:
+        return True
+    if_range = request.if_range
+    if if_range.etag is not None:
+        return if_range.etag == blob.sha256
+    if if_range.date is not None and blob.created_at is not None:
+        return blob.created_at.replace(microsecond=0) <= if_range.date.replace(tzinfo=None)
+    return False
+
+
+def _offload(response, blob: Blob, file_path: str):
+    """由 Web 服务器直接发送文件内容，Python 进程只返回响应头"""
+    mode = current_app.config['BLOB_SENDFILE_MODE']
+    if mode == 'x-accel':
+        relative_path = os.path.relpath(os.path.abspath(file_path), os.path.abspath(current_app.config['UPLOAD_FOLDER']))
+        response.headers['X-Accel-Redirect'] = current_app.config['BLOB_ACCEL_PREFIX'].rstrip('/') + '/' + relative_path.replace(os.sep, '/')
+    else:
+        response.headers['X-Sendfile'] = os.path.abspath(file_path)
+    return response
+
+
+def send_blob(blob: Blob):
+    """
+    发送 blob 内容，支持:
+    - 以 sha256 作为强 ETag，If-None-Match 命中时返回 304
+    - 单个或多个字节区间(multipart/byteranges)，以及 If-Range
+    - 可选的 X-Accel-Redirect / X-Sendfile，由 nginx 等直接发送文件
+    - 对象存储后端重定向到预签名地址
+    """
+    response_class = current_app.response_class
+    headers = {
+        'ETag': f'"{blob.sha256}"',
+        'Cache-Control': IMMUTABLE_CACHE_CONTROL,
+        'Accept-Ranges': 'bytes',
+    }
+
+    if request.if_none_match.contains(blob.sha256) or request.if_none_match.star_tag:
+        return response_class(status=304, headers=headers)
+
+    store = get_blob_store()
+    file_path = store.local_path(blob.file_path)
+    if file_path is None:
+        response = redirect(store.presigned_url(blob.file_path, blob.file_name, blob.mime_type))
+        response.headers['Cache-Control'] = 'private, no-store'
+        return response
+    if not os.path.exists(file_path):
+        raise NotFoundException(f"File of blob {blob.id} not found")
+
+    if current_app.config['BLOB_SENDFILE_MODE']:
+        # Range 和 If-Range 交给 Web 服务器处理
+        response = response_class(mimetype=blob.mime_type, headers=headers)
+        return _offload(response, blob, file_path)
+
+    length = os.path.getsize(file_path)
+    ranges = _resolve_ranges(length) if _if_range_matches(blob) else None
+
+    if ranges is None:
+        # 整个文件: send_file 会使用 wsgi.file_wrapper，由服务器实现零拷贝发送
+        response = send_file(file_path, mimetype=blob.mime_type, conditional=False, etag=False)
+        response.headers.update(headers)
+        return response
+
+    if not ranges:
+        headers['Content-Range'] = f'bytes */{length}'
+        return response_class(status=416, headers=headers)
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers['Content-Range'] = f'bytes {start}-{end - 1}/{length}'
+        headers['Content-Length'] = str(end - start)
+        return response_class(_read_range(file_path, start, end), status=206,
+                              mimetype=blob.mime_type, headers=headers, direct_passthrough=True)
+
+    boundary = uuid.uuid4().hex
+    parts = []
+    for start, end in ranges:
+        part_header = (
+            f'--{boundary}\r\n'
+            f'Content-Type: {blob.mime_type}\r\n'
+            f'Content-Range: bytes {start}-{end - 1}/{length}\r\n\r\n'
+        ).encode('latin-1')
+        parts.append((part_header, start, end))
+    closing = f'--{boundary}--\r\n'.encode('latin-1')
+
+    def generate():
+        for part_header, start, end in parts:
+            yield part_header
+            yield from _read_range(file_path, start, end)
+            yield b'\r\n'
+        yield closing
+
+    headers['Content-Length'] = str(
+        sum(len(part_header) + (end - start) + 2 for part_header, start, end in parts) + len(closing)
+    )
+    return response_class(generate(), status=206, content_type=f'multipart/byteranges; boundary={boundary}',
+                          headers=headers, direct_passthrough=True)
@@ -0,0 +1,141 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """线程安全的进程内 LRU 缓存，按条目的字节数之和淘汰"""
+
+    def __init__(self, max_bytes: int, max_item_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes if max_item_bytes is not None else max_bytes
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key: str, value: Any, size: int) -> None:
+        """写入缓存，size 为条目占用的字节数，超过单条上限的条目不缓存"""
+        if size > self.max_item_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._items[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._items:
+                _, (_, evicted_size) = self._items.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'items': len(self._items),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+class RedisCacheTier:
+    """基于 Redis 的共享缓存层，多个进程/节点共用；依赖 redis 包，仅在配置了地址时需要安装"""
+
+    def __init__(self, url: str, ttl: int, prefix: str = 'cache:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("Shared cache tier requires redis (pip install redis)")
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            value = self.client.get(self.prefix + key)
+        except Exception:
+            # 共享层不可用时退化为只用本地缓存
+            self.errors += 1
+            logger.warning('Shared cache get failed', exc_info=True)
+            return None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        try:
+            self.client.set(self.prefix + key, value, ex=self.ttl)
+        except Exception:
+            self.errors += 1
+            logger.warning('Shared cache set failed', exc_info=True)
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'errors': self.errors}
+
+
+class ContentCache:
+    """
+    两级缓存: 进程内 LRU + 可选的共享缓存层
+    适用于按内容哈希寻址、内容永不改变的数据，因此不需要失效处理
+    """
+
+    def __init__(self, local: LRUCache, shared: Optional[RedisCacheTier] = None):
+        self.local = local
+        self.shared = shared
+
+    def get_text(self, key: str, loader: Callable[[], bytes], encoding: str = 'utf-8') -> str:
+        """读取文本内容，两级缓存都未命中时调用 loader 加载原始字节"""
+        text = self.local.get(key)
+        if text is not None:
+            return text
+
+        data = self.shared.get(key) if self.shared else None
+        if data is None:
+            data = loader()
+            if self.shared and len(data) <= self.local.max_item_bytes:
+                self.shared.set(key, data)
+
+        text = data.decode(encoding)
+        self.local.set(key, text, len(data))
+        return text
+
+    def stats(self) -> dict:
+        result = {'local': self.local.stats()}
+        if self.shared:
+            result['shared'] = self.shared.stats()
+        return result
+
+
+def create_content_cache(config) -> ContentCache:
+    shared = None
+    if config.CONTENT_CACHE_REDIS_URL:
+        shared = RedisCacheTier(config.CONTENT_CACHE_REDIS_URL, config.CONTENT_CACHE_SHARED_TTL, prefix='content:')
+    return ContentCache(
+        LRUCache(config.CONTENT_CACHE_MAX_BYTES, config.CONTENT_CACHE_MAX_ITEM_BYTES),
+        shared
+    )
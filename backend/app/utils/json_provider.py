@@ -0,0 +1,61 @@
+import time
+from decimal import Decimal
+from typing import Any
+import orjson
+from flask import current_app
+from app.utils.metrics import request_metrics
+
+try:
+    from flask.json.provider import JSONProvider
+except ImportError:
+    # Flask < 2.2 没有 JSONProvider，接口保持一致，升级后可直接赋值给 app.json 生效
+    JSONProvider = object
+
+JSON_MIMETYPE = 'application/json; charset=utf-8'
+
+# datetime/date/UUID/dataclass 由 orjson 原生处理；非字符串键(如 int)转为字符串
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    基于 orjson 的 JSON 编解码
+    与 Flask 2.2+ 的 JSONProvider 接口一致；当前 Flask 版本通过本模块的 jsonify 使用
+    """
+    mimetype = JSON_MIMETYPE
+
+    def __init__(self, app):
+        self._app = app
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        """与 flask.jsonify 的参数规则相同: 单个位置参数、多个位置参数(数组)或关键字参数(对象)"""
+        if args and kwargs:
+            raise TypeError('jsonify() behavior undefined when passed both args and kwargs')
+        data = args[0] if len(args) == 1 else (args or kwargs)
+        start = time.perf_counter()
+        body = dumps_bytes(data)
+        request_metrics.on_serialize(time.perf_counter() - start)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def jsonify(*args: Any, **kwargs: Any):
+    """替代 flask.jsonify，使用当前应用的 OrjsonProvider 序列化"""
+    return current_app.json.response(*args, **kwargs)
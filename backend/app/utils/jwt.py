@@ -1,26 +1,34 @@
 import jwt
 from datetime import datetime, timedelta
 from functools import wraps
-from flask import request, jsonify
+from flask import request
+from app.utils.json_provider import jsonify
 from app.config import Config
 from app.models.user import User
+from app.utils.token_cache import verified_token_cache, token_versions
 from typing import List, Optional
 import uuid
 
-def create_access_token(identity: int) -> str:
+def create_access_token(identity: int, role_id: Optional[int] = None, token_version: Optional[int] = None) -> str:
     """
     创建访问令牌
     :param identity: 用户ID
+    :param role_id: 角色ID，调用方已持有用户信息时传入，避免再查一次库
+    :param token_version: 用户当前的 token 版本号，与 role_id 一同传入
     :return: JWT token字符串
     """
-    # 获取用户角色信息
-    user = User.get_or_none(User.id == identity)
-    if not user:
-        raise ValueError('用户不存在')
-        
+    if role_id is None or token_version is None:
+        # 获取用户角色信息
+        user = User.get_or_none(User.id == identity)
+        if not user:
+            raise ValueError('用户不存在')
+        role_id, token_version = user.role_id, user.token_version
+    token_versions.set(identity, token_version)
+
     payload = {
         'user_id': identity,
-        'role_id': user.role_id,
+        'role_id': role_id,
+        'ver': token_version,
         'exp': datetime.utcnow() + Config.JWT_ACCESS_TOKEN_EXPIRES
     }
     return jwt.encode(payload, Config.JWT_SECRET_KEY, algorithm='HS256')
@@ -39,7 +47,14 @@ def jwt_required(allowed_roles: Optional[List[int]] = None):
                 
             try:
                 token = token.split(' ')[1]
-                payload = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=['HS256'])
+                payload = verified_token_cache.get(token)
+                if payload is None:
+                    payload = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=['HS256'])
+                    verified_token_cache.set(token, payload)
+
+                # 用户已删除、角色/密码已修改或登录已吊销时 token 版本号不再匹配
+                if not token_versions.is_current(payload['user_id'], payload.get('ver', 0)):
+                    return jsonify({'message': 'token已失效'}), 401
                 
                 # 将用户信息存储到request中
                 request.user_id = payload['user_id']
@@ -0,0 +1,274 @@
+"""
+请求级性能指标: 按路由统计延迟分布、SQL 条数和耗时、序列化耗时、响应字节数
+
+- 每个请求的统计保存在线程局部变量中，SQL 通过 db.add_query_listener 计入当前请求，
+  后台线程执行的 SQL 不属于任何请求，直接忽略
+- /metrics 以 Prometheus 文本格式输出；指标按进程统计，多进程部署时每个进程分别抓取
+- 开启 METRICS_SERVER_TIMING 时在响应头 Server-Timing 中带上 db / serialize / app 耗时，
+  便于在浏览器开发者工具中查看；该响应头对所有客户端可见，默认关闭
+- 超过阈值的慢请求记录日志，附带执行的 SQL 语句
+- 流式响应在 after_request 之后才生成内容，其序列化耗时和字节数不计入
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from flask import Flask, g, request
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_MIMETYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# 请求耗时(秒)和单个请求 SQL 条数的分桶
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# 标签中的请求方法限定为标准方法，其他任意方法名归为 OTHER，避免产生无限多的时间序列
+KNOWN_METHODS = frozenset(['GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'])
+
+
+class Histogram:
+    """累积分布直方图，对外按 Prometheus 的 le 语义输出"""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> Iterable[Tuple[str, int]]:
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield _format_number(bound), total
+        yield '+Inf', self.count
+
+
+class RequestStats:
+    """单个请求的统计，只由处理该请求的线程写入"""
+    __slots__ = ('start', 'queries', 'db_time', 'serialize_time', 'statements', 'recorded')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.statements: List[Tuple[str, float]] = []
+        self.recorded = False
+
+
+class _RouteSeries:
+    __slots__ = ('duration', 'queries', 'statuses', 'db_seconds', 'serialize_seconds', 'response_bytes', 'slow')
+
+    def __init__(self):
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.statuses: Dict[int, int] = {}
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.response_bytes = 0
+        self.slow = 0
+
+
+class RequestMetrics:
+    """按 (blueprint, endpoint, method) 汇总请求指标"""
+
+    def __init__(self, slow_request_seconds: float = 1.0, max_statements: int = 50):
+        self.slow_request_seconds = slow_request_seconds
+        self.max_statements = max_statements
+        self._series: Dict[Tuple[str, str, str], _RouteSeries] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    # ---- 当前请求 ----
+
+    def begin(self) -> RequestStats:
+        stats = self._local.stats = RequestStats()
+        return stats
+
+    def end(self) -> None:
+        self._local.stats = None
+
+    def on_query(self, sql: str, params: Any, elapsed: float) -> None:
+        """db 查询监听函数"""
+        stats = getattr(self._local, 'stats', None)
+        if stats is None:
+            return
+        stats.queries += 1
+        stats.db_time += elapsed
+        # 只保留前若干条语句供慢请求日志使用
+        if len(stats.statements) < self.max_statements:
+            stats.statements.append((sql, elapsed))
+
+    def on_serialize(self, elapsed: float) -> None:
+        """模型转换为字典、编码为 JSON 的耗时"""
+        stats = getattr(self._local, 'stats', None)
+        if stats is not None:
+            stats.serialize_time += elapsed
+
+    # ---- 汇总 ----
+
+    def record(self, blueprint: str, endpoint: str, method: str, status: int,
+               stats: RequestStats, duration: float, response_bytes: int) -> None:
+        if stats.recorded:
+            return
+        stats.recorded = True
+        slow = duration >= self.slow_request_seconds
+        key = (blueprint, endpoint, method)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _RouteSeries()
+            series.duration.observe(duration)
+            series.queries.observe(stats.queries)
+            series.statuses[status] = series.statuses.get(status, 0) + 1
+            series.db_seconds += stats.db_time
+            series.serialize_seconds += stats.serialize_time
+            series.response_bytes += response_bytes
+            if slow:
+                series.slow += 1
+        if slow:
+            self._log_slow(method, endpoint, status, stats, duration)
+
+    def _log_slow(self, method: str, endpoint: str, status: int, stats: RequestStats, duration: float) -> None:
+        lines = [f'  {elapsed * 1000:.1f}ms  {sql}' for sql, elapsed in stats.statements]
+        if stats.queries > len(stats.statements):
+            lines.append(f'  ... {stats.queries - len(stats.statements)} more')
+        logger.warning(
+            'Slow request %s %s (%s) status=%s duration=%.1fms queries=%d db=%.1fms serialize=%.1fms%s',
+            method, request.full_path.rstrip('?'), endpoint, status, duration * 1000,
+            stats.queries, stats.db_time * 1000, stats.serialize_time * 1000, ''.join('\n' + line for line in lines)
+        )
+
+    def render(self, gauges: Optional[Dict[str, Tuple[str, float]]] = None) -> str:
+        """
+        Prometheus 文本格式
+        :param gauges: 额外的指标 {名称: (类型, 值)}，如连接池和缓存状态
+        """
+        with self._lock:
+            snapshot = [(key, _copy_series(series)) for key, series in sorted(self._series.items())]
+
+        out: List[str] = []
+        _header(out, 'http_requests_total', 'counter', 'Requests by route and status')
+        for key, series in snapshot:
+            for status, count in sorted(series.statuses.items()):
+                out.append(f'http_requests_total{_labels(key, status=status)} {count}')
+
+        for name, attr, help_text in (
+            ('http_request_duration_seconds', 'duration', 'Request latency'),
+            ('http_request_db_queries', 'queries', 'SQL statements per request'),
+        ):
+            _header(out, name, 'histogram', help_text)
+            for key, series in snapshot:
+                histogram = getattr(series, attr)
+                for bound, count in histogram.cumulative():
+                    out.append(f'{name}_bucket{_labels(key, le=bound)} {count}')
+                out.append(f'{name}_sum{_labels(key)} {_format_number(histogram.sum)}')
+                out.append(f'{name}_count{_labels(key)} {histogram.count}')
+
+        for name, attr, help_text in (
+            ('http_request_db_seconds_total', 'db_seconds', 'Time spent executing SQL'),
+            ('http_request_serialize_seconds_total', 'serialize_seconds', 'Time spent serializing responses'),
+            ('http_response_bytes_total', 'response_bytes', 'Response body bytes (excluding streamed responses)'),
+            ('http_requests_slow_total', 'slow', 'Requests slower than the slow request threshold'),
+        ):
+            _header(out, name, 'counter', help_text)
+            for key, series in snapshot:
+                out.append(f'{name}{_labels(key)} {_format_number(getattr(series, attr))}')
+
+        for name, (metric_type, value) in (gauges or {}).items():
+            _header(out, name, metric_type)
+            out.append(f'{name} {_format_number(value)}')
+        out.append('')
+        return '\n'.join(out)
+
+
+def _copy_series(series: _RouteSeries) -> _RouteSeries:
+    copy = _RouteSeries()
+    for histogram_name in ('duration', 'queries'):
+        source, target = getattr(series, histogram_name), getattr(copy, histogram_name)
+        target.counts = list(source.counts)
+        target.sum = source.sum
+        target.count = source.count
+    copy.statuses = dict(series.statuses)
+    copy.db_seconds = series.db_seconds
+    copy.serialize_seconds = series.serialize_seconds
+    copy.response_bytes = series.response_bytes
+    copy.slow = series.slow
+    return copy
+
+
+def _header(out: List[str], name: str, metric_type: str, help_text: Optional[str] = None) -> None:
+    if help_text:
+        out.append(f'# HELP {name} {help_text}')
+    out.append(f'# TYPE {name} {metric_type}')
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(key: Tuple[str, str, str], **extra: Any) -> str:
+    blueprint, endpoint, method = key
+    pairs = [('blueprint', blueprint), ('endpoint', endpoint), ('method', method)] + list(extra.items())
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_number(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _server_timing(stats: RequestStats, duration: float) -> str:
+    return (f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries", '
+            f'serialize;dur={stats.serialize_time * 1000:.2f}, '
+            f'app;dur={duration * 1000:.2f}')
+
+
+# 进程内的请求指标，JSON 序列化等处通过它上报当前请求的耗时
+request_metrics = RequestMetrics(Config.METRICS_SLOW_REQUEST_MS / 1000, Config.METRICS_SLOW_SQL_LIMIT)
+
+
+def install_request_metrics(app: Flask, metrics: RequestMetrics, database, server_timing: bool = False) -> None:
+    """
+    注册请求钩子和 SQL 监听。需在其他 before_request 之前调用，以便连接池等待时间计入请求耗时
+    """
+    database.add_query_listener(metrics.on_query)
+
+    @app.before_request
+    def _metrics_begin():
+        g.request_stats = metrics.begin()
+
+    def _record(status: int, response_bytes: int) -> Optional[Tuple[RequestStats, float]]:
+        stats = g.pop('request_stats', None)
+        if stats is None:
+            return None
+        duration = time.perf_counter() - stats.start
+        # 未匹配到路由的请求(404 等)归为一类，方法名也限定在固定集合内，避免按请求内容产生大量标签
+        method = request.method if request.method in KNOWN_METHODS else 'OTHER'
+        metrics.record(request.blueprint or '', request.endpoint or 'unmatched', method,
+                       status, stats, duration, response_bytes)
+        return stats, duration
+
+    @app.after_request
+    def _metrics_record(response):
+        # 流式响应没有固定长度，按 0 计
+        size = response.calculate_content_length() if not response.is_streamed else None
+        recorded = _record(response.status_code, size or 0)
+        if recorded and server_timing:
+            response.headers['Server-Timing'] = _server_timing(*recorded)
+        return response
+
+    @app.teardown_request
+    def _metrics_teardown(exc):
+        # 未处理的异常不会经过 after_request
+        if exc is not None:
+            _record(500, 0)
+        metrics.end()
@@ -1,7 +1,98 @@
+import base64
+import time
+from datetime import datetime
 from math import ceil
-from peewee import Query
+from typing import Optional
+import orjson
+from peewee import Query, MySQLDatabase
+from app.exceptions.customer_exceptions import BadRequestException
+from app.utils.projection import Projection
 
-def paginate_query(query: Query, page: int = 1, page_size: int = 10):
+# 游标分页支持的排序键，均按倒序(最新的在前)翻页
+CURSOR_KEYS = {
+    'id': ('id',),
+    'created_at': ('created_at', 'id'),
+}
+
+# 总数统计方式: exact 精确 COUNT / approx 近似值 / none 不统计
+TOTAL_MODES = ('exact', 'approx', 'none')
+
+# 近似总数缓存 {sql: (过期时间, 总数)}
+COUNT_CACHE_TTL = 30
+COUNT_CACHE_MAX_SIZE = 1024
+_count_cache = {}
+
+
+def encode_cursor(values) -> str:
+    """将排序键的值编码为不透明的游标字符串"""
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(orjson.dumps(values)).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, key: str) -> list:
+    """解析游标字符串，游标无效时抛出 BadRequestException"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = orjson.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list) or len(values) != len(CURSOR_KEYS[key]):
+            raise ValueError(cursor)
+        if key == 'created_at':
+            values[0] = datetime.fromisoformat(values[0])
+        return values
+    except (ValueError, TypeError, orjson.JSONDecodeError):
+        raise BadRequestException("Invalid cursor")
+
+
+def _table_row_estimate(model) -> Optional[int]:
+    """从表统计信息中读取行数估计值(仅 MySQL)"""
+    database = model._meta.database
+    if not isinstance(database, MySQLDatabase):
+        return None
+    row = database.execute_sql(
+        'SELECT TABLE_ROWS FROM information_schema.TABLES '
+        'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+        (model._meta.table_name,)
+    ).fetchone()
+    return int(row[0]) if row and row[0] is not None else None
+
+
+def count_query(query: Query, mode: str = 'exact') -> Optional[int]:
+    """
+    按指定方式统计查询总数
+    approx: 无过滤条件时读取表统计信息，否则使用短期缓存的 COUNT 结果
+    """
+    if mode == 'none':
+        return None
+    if mode == 'exact':
+        return query.count()
+
+    if query._where is None:
+        estimate = _table_row_estimate(query.model)
+        if estimate is not None:
+            return estimate
+
+    sql, params = query.sql()
+    cache_key = (sql, tuple(params))
+    now = time.monotonic()
+    cached = _count_cache.get(cache_key)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    total = query.count()
+    if len(_count_cache) >= COUNT_CACHE_MAX_SIZE:
+        _count_cache.clear()
+    _count_cache[cache_key] = (now + COUNT_CACHE_TTL, total)
+    return total
+
+
+def _serialize_page(query: Query, projection: Optional[Projection]) -> list:
+    if projection is None:
+        return [item.to_json() for item in query]
+    return projection.serialize_many(projection.apply(query))
+
+
+def paginate_query(query: Query, page: int = 1, page_size: int = 10, total_mode: str = 'exact',
+                   projection: Optional[Projection] = None):
     """
     对 Peewee 查询进行分页处理
     
@@ -9,6 +100,8 @@ def paginate_query(query: Query, page: int = 1, page_size: int = 10):
         query: Peewee Query 对象
         page: 当前页码 (从1开始)
         page_size: 每页数量
+        total_mode: 总数统计方式 (exact/approx)
+        projection: 查询投影，声明选取的列和展开的外键；为空时使用 to_json
         
     Returns:
         dict: {
@@ -26,7 +119,7 @@ def paginate_query(query: Query, page: int = 1, page_size: int = 10):
     page_size = max(1, page_size)
     
     # 计算总记录数
-    total = query.count()
+    total = count_query(query, 'approx' if total_mode == 'approx' else 'exact')
     
     # 计算总页数
     total_pages = ceil(total / page_size)
@@ -38,7 +131,7 @@ def paginate_query(query: Query, page: int = 1, page_size: int = 10):
     offset = (page - 1) * page_size
     
     # 获取当前页的数据
-    items = [item.to_json() for item in query.offset(offset).limit(page_size)]
+    items = _serialize_page(query.offset(offset).limit(page_size), projection)
     
     return {
         'items': items,
@@ -48,4 +141,67 @@ def paginate_query(query: Query, page: int = 1, page_size: int = 10):
         'total_pages': total_pages,
         'has_next': page < total_pages,
         'has_prev': page > 1
-    } 
\ No newline at end of file
+    }
+
+
+def cursor_paginate(query: Query, cursor: Optional[str] = None, page_size: int = 10,
+                    key: str = 'id', total_mode: str = 'none', projection: Optional[Projection] = None):
+    """
+    基于游标(keyset)的分页，不使用 OFFSET
+    
+    Args:
+        query: Peewee Query 对象
+        cursor: 上一页返回的 next_cursor，为空时从第一页开始
+        page_size: 每页数量
+        key: 排序键 (id/created_at)，按倒序翻页
+        total_mode: 总数统计方式 (exact/approx/none)
+        projection: 查询投影，声明选取的列和展开的外键；为空时使用 to_json
+        
+    Returns:
+        dict: {
+            'items': list of items for current page,
+            'page_size': number of items per page,
+            'next_cursor': cursor for the next page, None on the last page,
+            'has_next': whether there is a next page,
+            'total': total number of items (None when total_mode is none)
+        }
+    """
+    if key not in CURSOR_KEYS:
+        raise BadRequestException(f"Unsupported cursor key: {key}")
+    if total_mode not in TOTAL_MODES:
+        raise BadRequestException(f"Unsupported total mode: {total_mode}")
+    page_size = max(1, page_size)
+
+    model = query.model
+    fields = [getattr(model, name) for name in CURSOR_KEYS[key]]
+    total = count_query(query, total_mode)
+
+    if cursor:
+        values = decode_cursor(cursor, key)
+        if len(fields) == 1:
+            query = query.where(fields[0] < values[0])
+        else:
+            query = query.where(
+                (fields[0] < values[0]) |
+                ((fields[0] == values[0]) & (fields[1] < values[1]))
+            )
+
+    query = query.order_by(*[field.desc() for field in fields]).limit(page_size + 1)
+    if projection is not None:
+        query = projection.apply(query)
+    rows = list(query)
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+
+    next_cursor = None
+    if has_next:
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, name) for name in CURSOR_KEYS[key]])
+
+    return {
+        'items': projection.serialize_many(rows) if projection is not None else [row.to_json() for row in rows],
+        'page_size': page_size,
+        'next_cursor': next_cursor,
+        'has_next': has_next,
+        'total': total
+    }
@@ -0,0 +1,58 @@
+import threading
+from typing import Any, List, Optional, Tuple
+from app.database import db
+
+
+class QueryCounter:
+    """
+    统计代码块内当前线程执行的 SQL 条数和耗时
+
+        with QueryCounter() as counter:
+            MaterialService.get_materials(page_size=100)
+        print(counter.count, counter.statements)
+    """
+
+    def __init__(self, database=db):
+        self.database = database
+        self.statements: List[Tuple[str, Any, float]] = []
+        self._thread_id: Optional[int] = None
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def elapsed(self) -> float:
+        return sum(item[2] for item in self.statements)
+
+    def _listener(self, sql: str, params: Any, elapsed: float) -> None:
+        # 只统计进入代码块的线程，避免其他请求/后台线程的查询混入
+        if threading.get_ident() == self._thread_id:
+            self.statements.append((sql, params, elapsed))
+
+    def __enter__(self) -> 'QueryCounter':
+        self._thread_id = threading.get_ident()
+        self.database.add_query_listener(self._listener)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.database.remove_query_listener(self._listener)
+
+
+class assert_max_queries(QueryCounter):
+    """
+    代码块内执行的 SQL 超过上限时抛出 AssertionError，用于发现 N+1 查询
+
+        with assert_max_queries(3):
+            client.get('/api/material/materials?page_size=100')
+    """
+
+    def __init__(self, limit: int, database=db):
+        super().__init__(database)
+        self.limit = limit
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        super().__exit__(exc_type, exc, tb)
+        if exc_type is None and self.count > self.limit:
+            lines = '\n'.join(f'  {sql}' for sql, _, _ in self.statements)
+            raise AssertionError(f"Expected at most {self.limit} queries, executed {self.count}:\n{lines}")
@@ -0,0 +1,114 @@
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from peewee import DateField, DateTimeField, ForeignKeyField, Model, UUIDField
+import pytz
+
+SHANGHAI_TZ = pytz.timezone("Asia/Shanghai")
+
+
+def _format_datetime(value: datetime) -> str:
+    return value.astimezone(SHANGHAI_TZ).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _format_date(value: date) -> str:
+    return value.strftime("%Y-%m-%d")
+
+
+# 字段类型 -> 值转换函数，决定接口中日期时间的输出格式
+FIELD_CONVERTERS: Dict[type, Callable[[Any], Any]] = {
+    DateTimeField: _format_datetime,
+    DateField: _format_date,
+    UUIDField: str,
+}
+
+
+class ModelSerializer:
+    """
+    按模型类预先编译的序列化器
+    字段列表和转换函数只在创建时计算一次，序列化每一行时不再做反射
+    """
+
+    def __init__(self, model):
+        self.model = model
+        # 模型可通过 hidden_fields 声明不对外输出的字段(如密码)
+        self.hidden = hidden = frozenset(getattr(model, 'hidden_fields', ()))
+        # (字段名, 转换函数或None, 是否外键)
+        self.columns: List[Tuple[str, Optional[Callable], bool]] = [
+            (name, FIELD_CONVERTERS.get(type(field)), isinstance(field, ForeignKeyField))
+            for name, field in model._meta.fields.items()
+            if name not in hidden
+        ]
+        self._converters = {name: converter for name, converter, _ in self.columns}
+
+    def serialize(self, instance: Model) -> Dict[str, Any]:
+        """序列化模型实例，外键输出为ID；已通过 join 加载的关联对象会展开"""
+        data = instance.__data__
+        item = {}
+        for name, converter, is_foreign_key in self.columns:
+            if is_foreign_key:
+                item[name] = self._related(instance, name)
+                continue
+            value = data.get(name)
+            if value is None or converter is None or isinstance(value, str):
+                item[name] = value
+            else:
+                item[name] = converter(value)
+        return item
+
+    def _related(self, instance: Model, name: str):
+        # 只使用已加载的关联对象，不触发懒加载查询
+        related = instance.__rel__.get(name)
+        if related is None:
+            return instance.__data__.get(name)
+        return get_serializer(type(related)).serialize(related)
+
+    def serialize_dict(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """序列化 .dicts() 查询结果的一行，外键保持为ID"""
+        converters = self._converters
+        item = {}
+        for name, value in row.items():
+            if name in self.hidden:
+                continue
+            converter = converters.get(name)
+            if value is None or converter is None or isinstance(value, str):
+                item[name] = value
+            else:
+                item[name] = converter(value)
+        return item
+
+    def serialize_dicts(self, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [self.serialize_dict(row) for row in rows]
+
+    def serialize_tuples(self, rows: Iterable[Sequence], columns: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """
+        序列化 .tuples() 查询结果，外键保持为ID
+        :param columns: 每个元组对应的字段名，默认为 Model.select() 的字段顺序
+        """
+        if columns is None:
+            columns = [field.name for field in self.model._meta.sorted_fields]
+        plan = [(index, name, self._converters.get(name)) for index, name in enumerate(columns) if name not in self.hidden]
+        result = []
+        for row in rows:
+            item = {}
+            for index, name, converter in plan:
+                value = row[index]
+                if value is None or converter is None or isinstance(value, str):
+                    item[name] = value
+                else:
+                    item[name] = converter(value)
+            result.append(item)
+        return result
+
+    def serialize_many(self, instances: Iterable[Model]) -> List[Dict[str, Any]]:
+        return [self.serialize(instance) for instance in instances]
+
+
+_serializers: Dict[type, ModelSerializer] = {}
+
+
+def get_serializer(model) -> ModelSerializer:
+    """获取模型类对应的序列化器，首次调用时编译并缓存"""
+    serializer = _serializers.get(model)
+    if serializer is None:
+        serializer = _serializers[model] = ModelSerializer(model)
+    return serializer
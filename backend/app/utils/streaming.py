@@ -0,0 +1,109 @@
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional
+import orjson
+from flask import Response, stream_with_context
+from peewee import MySQLDatabase
+from app.database import db
+from app.exceptions.customer_exceptions import BadRequestException
+from app.utils.json_provider import JSON_MIMETYPE
+
+try:
+    from pymysql.cursors import SSCursor
+except ImportError:
+    SSCursor = None
+
+# 支持的流式输出格式: json(整体为一个 JSON 数组) / ndjson(每行一个 JSON 对象)
+STREAM_FORMATS = ('json', 'ndjson')
+
+# 攒够这么多字节再写出一块，避免每行一次 write
+STREAM_CHUNK_BYTES = 64 * 1024
+
+STREAM_MIMETYPES = {
+    'json': JSON_MIMETYPE,
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def iterate_query(query, database=db) -> Iterator[Any]:
+    """
+    逐行迭代查询结果，不在内存中缓存整个结果集
+    MySQL 使用服务端游标(SSCursor)，行数据在读取时才从服务器传输；
+    其他数据库使用 query.iterator()
+    迭代结束前同一连接上不能执行其他查询
+    """
+    if SSCursor is None or not isinstance(database, MySQLDatabase):
+        yield from query.iterator(database)
+        return
+
+    sql, params = query.sql()
+    cursor = database.connection().cursor(SSCursor)
+    try:
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        database.notify_query(sql, params, time.perf_counter() - start)
+        yield from query._get_cursor_wrapper(cursor).iterator()
+    finally:
+        cursor.close()
+
+
+def _chunked(pieces: Iterable[bytes]) -> Iterator[bytes]:
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= STREAM_CHUNK_BYTES:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def iter_json_array(items: Iterable[Any], envelope: Optional[Dict[str, Any]] = None, key: str = 'data') -> Iterator[bytes]:
+    """
+    编码为 JSON 数组并分块输出
+    :param envelope: 不为空时输出一个对象，数组放在 key 字段中，其余字段来自 envelope
+    """
+    def pieces():
+        if envelope is None:
+            yield b'['
+        else:
+            head = orjson.dumps({**envelope, key: []})
+            # 去掉末尾的 "[]}"，数组内容在其后流式写入
+            yield head[:-3] + b'['
+        first = True
+        for item in items:
+            yield orjson.dumps(item) if first else b',' + orjson.dumps(item)
+            first = False
+        yield b']' if envelope is None else b']}'
+
+    return _chunked(pieces())
+
+
+def iter_ndjson(items: Iterable[Any]) -> Iterator[bytes]:
+    """编码为 NDJSON(每行一个对象)并分块输出"""
+    return _chunked(orjson.dumps(item, option=orjson.OPT_APPEND_NEWLINE) for item in items)
+
+
+def stream_json(
+    items: Iterable[Any],
+    fmt: str = 'json',
+    envelope: Optional[Dict[str, Any]] = None,
+    filename: Optional[str] = None,
+    status: int = 200
+) -> Response:
+    """
+    以流式响应输出一组对象，内存占用与行数无关
+    生成器在请求上下文中执行，数据库连接在输出完成后才归还连接池
+    :param fmt: json 或 ndjson
+    :param envelope: 仅 json 格式有效，见 iter_json_array
+    :param filename: 不为空时作为附件下载
+    """
+    if fmt not in STREAM_FORMATS:
+        raise BadRequestException(f"Unsupported format: {fmt}")
+    body = iter_ndjson(items) if fmt == 'ndjson' else iter_json_array(items, envelope)
+    headers = {}
+    if filename:
+        headers['Content-Disposition'] = f'attachment; filename={filename}.{fmt}'
+    return Response(stream_with_context(body), status=status, mimetype=STREAM_MIMETYPES[fmt], headers=headers)
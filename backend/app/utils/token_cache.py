@@ -0,0 +1,144 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from app.config import Config
+from app.database import db
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+class VerifiedTokenCache:
+    """
+    已验签 token 的缓存，键为 token 的 sha256
+    命中时跳过 JWT 解析和 HMAC 校验；条目在 TTL 和 token 自身的过期时间中较早者失效
+    """
+
+    def __init__(self, ttl: int, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[dict]:
+        if self.ttl <= 0:
+            return None
+        key = self._key(token)
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, payload = item
+            if expires_at <= time.time():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return payload
+
+    def set(self, token: str, payload: dict) -> None:
+        if self.ttl <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if 'exp' in payload:
+            expires_at = min(expires_at, payload['exp'])
+        key = self._key(token)
+        with self._lock:
+            self._items[key] = (expires_at, payload)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+class TokenVersionRegistry:
+    """
+    用户 token 版本号的内存映射 {用户ID: token_version}
+    token 中携带签发时的版本号，与当前版本不一致即视为已吊销；
+    映射由后台线程定期全量刷新，未命中的用户单独查一次库
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 值为 None 表示用户已不存在
+        self._versions: Dict[int, Optional[int]] = {}
+        # 每次 set 递增的序号，以及每个用户最近一次 set 时的序号；
+        # 查库结果只覆盖查询开始后没有再被 set 过的条目，避免用旧数据覆盖刚写入的吊销
+        self._generation = 0
+        self._set_at: Dict[int, int] = {}
+
+    def is_current(self, user_id: int, version: int) -> bool:
+        with self._lock:
+            known = user_id in self._versions
+            current = self._versions.get(user_id)
+        if not known:
+            current = self._load(user_id)
+        return current is not None and current == version
+
+    def _load(self, user_id: int) -> Optional[int]:
+        with self._lock:
+            started_at = self._generation
+        current = (User
+                   .select(User.token_version)
+                   .where(User.id == user_id)
+                   .scalar())
+        with self._lock:
+            if self._set_at.get(user_id, 0) > started_at:
+                return self._versions.get(user_id)
+            self._versions[user_id] = current
+        return current
+
+    def set(self, user_id: int, version: Optional[int]) -> None:
+        """本进程内修改了用户版本号后立即更新映射，不必等待下一次刷新"""
+        with self._lock:
+            self._generation += 1
+            self._versions[user_id] = version
+            self._set_at[user_id] = self._generation
+
+    def forget(self, user_id: int) -> None:
+        self.set(user_id, None)
+
+    def refresh(self) -> None:
+        with self._lock:
+            started_at = self._generation
+        versions = dict(User.select(User.id, User.token_version).tuples())
+        with self._lock:
+            # 查询期间 set 过的条目保留内存中的值，其余以快照为准
+            for user_id, generation in self._set_at.items():
+                if generation > started_at:
+                    versions[user_id] = self._versions.get(user_id)
+            self._versions = versions
+            # 更早的 set 已在写库之后发生，快照中已包含，不必再记录
+            self._set_at = {user_id: generation for user_id, generation in self._set_at.items()
+                            if generation > started_at}
+
+
+class TokenVersionRefresher(threading.Thread):
+    """后台定期刷新 token 版本号映射，使其他进程中的吊销/角色变更生效"""
+
+    def __init__(self, app, registry: TokenVersionRegistry, interval: int):
+        super().__init__(name='token-version-refresher', daemon=True)
+        self.app = app
+        self.registry = registry
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                with self.app.app_context(), db.connection_context():
+                    self.registry.refresh()
+            except Exception:
+                logger.exception('Failed to refresh token versions')
+
+    def stop(self):
+        self._stopped.set()
+
+
+verified_token_cache = VerifiedTokenCache(Config.JWT_VERIFY_CACHE_TTL, Config.JWT_VERIFY_CACHE_SIZE)
+token_versions = TokenVersionRegistry()
@@ -0,0 +1,113 @@
+"""
+JSON 响应编码性能对比: 旧的响应路径(标准库 jsonify 或教材路由的 orjson 元组，再经 after_request 改写响应头)与 OrjsonProvider
+
+在临时 SQLite 库中造数，按各接口实际返回的数据结构测量编码一个响应的耗时:
+
+    python scripts/bench_json.py --rows 2000 --repeat 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+from datetime import datetime
+
+os.environ['DB_ENGINE'] = 'sqlite'
+os.environ['DB_SQLITE_PATH'] = os.path.join(tempfile.mkdtemp(), 'bench_json.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import flask
+import orjson
+from app import create_app
+from app.database import db
+from app.models import User, Role, Category, CategoryClosure, Blob, Material, MaterialCategory
+from app.services.material import MaterialService
+from app.services.category_service import CategoryService
+from app.services.user_service import UserService
+from app.utils.json_provider import jsonify
+
+
+def _rewrite_content_type(response):
+    """旧的 after_request 钩子"""
+    if response.mimetype == 'application/json':
+        response.headers['Content-Type'] = 'application/json; charset=utf-8'
+    return response
+
+
+def legacy_jsonify(payload):
+    """旧的 jsonify 路径: 标准库 json 编码"""
+    return _rewrite_content_type(flask.jsonify(payload))
+
+
+def legacy_orjson_tuple(payload):
+    """旧的教材路由: orjson.dumps 返回元组，由 Flask 组装响应"""
+    app = flask.current_app
+    return _rewrite_content_type(app.make_response((orjson.dumps(payload), 200, {'Content-Type': 'application/json'})))
+
+
+def seed(rows: int) -> None:
+    db.create_tables([User, Role, Category, CategoryClosure, Blob, Material, MaterialCategory])
+    now = datetime.now()
+    User.insert_many([
+        {'username': f'student{i}', 'password': 'x', 'role_id': 3, 'created_at': now, 'updated_at': now}
+        for i in range(rows)
+    ]).execute()
+    Category.insert_many([
+        {'display_name': f'分类{i}', 'parent_id': i // 10 or None, 'created_by': 1, 'updated_by': 1,
+         'created_at': now, 'updated_at': now}
+        for i in range(rows)
+    ]).execute()
+    Blob.insert_many([
+        {'file_name': f'{i}.pdf', 'file_path': f'{i}.pdf', 'mime_type': 'application/pdf', 'file_size': 1024,
+         'sha256': f'{i:064d}', 'created_at': now, 'updated_at': now}
+        for i in range(rows)
+    ]).execute()
+    Material.insert_many([
+        {'display_name': f'教材{i}', 'description': '课程讲义' * 20, 'category_ids': str(i % 50 + 1),
+         'blob_id': i + 1, 'material_type': 'upload', 'created_by': 1, 'updated_by': 1,
+         'created_at': now, 'updated_at': now}
+        for i in range(rows)
+    ]).execute()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON 响应编码性能对比')
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.test_request_context(), db.connection_context():
+        seed(args.rows)
+        # (接口, 旧的响应方式, 响应数据)
+        endpoints = [
+            ('GET /material/materials?page_size=100', legacy_orjson_tuple, MaterialService.get_materials(page_size=100)),
+            ('GET /user/users', legacy_jsonify, [{
+                'id': user.id,
+                'username': user.username,
+                'role_id': user.role_id,
+                'avatar': user.avatar,
+                'created_at': user.created_at,
+            } for user in UserService.get_all_users()]),
+            ('GET /user/users?page_size=200', legacy_jsonify, UserService.get_users(page_size=200)),
+            ('GET /category/categories', legacy_jsonify, {
+                'data': CategoryService.get_all_categories(),
+                'message': 'Categories retrieved successfully'
+            }),
+        ]
+
+        print(f'{args.rows} rows, best of {args.repeat}')
+        print(f'  {"endpoint":<40} {"before":>10} {"after":>10} {"speedup":>8}')
+        for name, legacy_response, payload in endpoints:
+            # 旧的用户列表在路由中调用 isoformat()，新的交给 orjson 处理 datetime
+            legacy_payload = [
+                {**item, 'created_at': item['created_at'].isoformat()} for item in payload
+            ] if isinstance(payload, list) else payload
+            assert legacy_response(legacy_payload).get_json() == jsonify(payload).get_json()
+            before = min(timeit.repeat(lambda: legacy_response(legacy_payload), number=1, repeat=args.repeat))
+            after = min(timeit.repeat(lambda: jsonify(payload), number=1, repeat=args.repeat))
+            print(f'  {name:<40} {before * 1000:8.2f}ms {after * 1000:8.2f}ms {before / after:7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+序列化性能对比: 旧的反射式 to_json 与按模型编译的序列化器
+
+    python scripts/bench_serializer.py --rows 5000 --repeat 5
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from peewee import SqliteDatabase, Model, DateTimeField, DateField, UUIDField, ForeignKeyField, DeferredForeignKey
+import pytz
+from app.models import User, Category
+from app.utils.serializer import get_serializer
+
+
+def legacy_to_json(instance):
+    """旧版 BaseModel.to_json 的实现，仅用于对比"""
+    item = {}
+    for column, column_info in instance._meta.fields.items():
+        try:
+            column_type = type(column_info)
+            column_value = getattr(instance, column)
+            item[column] = legacy_normalize(column_value, column_type)
+        except Exception as e:
+            print(e)
+    return item
+
+
+def legacy_normalize(value, field_type):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value
+    if isinstance(value, Model):
+        return legacy_to_json(value)
+    if field_type == UUIDField:
+        return str(value)
+    elif field_type == DateTimeField:
+        return value.astimezone(pytz.timezone("Asia/Shanghai")).strftime("%Y-%m-%d %H:%M:%S")
+    elif field_type == DateField:
+        return value.strftime("%Y-%m-%d")
+    elif isinstance(field_type, (ForeignKeyField, DeferredForeignKey)):
+        return value
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description='序列化性能对比')
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    database = SqliteDatabase(':memory:')
+    with database.bind_ctx([User, Category]):
+        database.create_tables([User, Category])
+        now = datetime.now()
+        Category.insert_many([
+            {'display_name': f'分类{i}', 'parent_id': i // 10 or None, 'created_at': now, 'updated_at': now}
+            for i in range(args.rows)
+        ]).execute()
+
+        serializer = get_serializer(Category)
+        instances = list(Category.select())
+        dict_rows = list(Category.select().dicts())
+        tuple_rows = list(Category.select().tuples())
+        assert [legacy_to_json(c) for c in instances] == serializer.serialize_many(instances)
+
+        cases = [
+            ('legacy to_json', lambda: [legacy_to_json(c) for c in instances]),
+            ('compiled (model)', lambda: serializer.serialize_many(instances)),
+            ('compiled (dicts)', lambda: serializer.serialize_dicts(dict_rows)),
+            ('compiled (tuples)', lambda: serializer.serialize_tuples(tuple_rows)),
+            ('query + legacy', lambda: [legacy_to_json(c) for c in Category.select()]),
+            ('query + dicts', lambda: serializer.serialize_dicts(Category.select().dicts())),
+        ]
+        print(f'{args.rows} rows, best of {args.repeat}')
+        for name, fn in cases:
+            best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+            print(f'  {name:<20} {best * 1000:9.2f} ms  {best / args.rows * 1e6:7.2f} us/row')
+
+
+if __name__ == '__main__':
+    main()
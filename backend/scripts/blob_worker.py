@@ -0,0 +1,56 @@
+"""
+独立运行的上传后处理 worker (缩略图/文本提取/元数据)
+
+与 Web 进程共享 blob_jobs 表作为任务队列，可同时运行多个实例。
+使用独立 worker 时可将 Web 进程的 BLOB_JOB_POLL_INTERVAL 设为 0:
+
+    python scripts/blob_worker.py              # 持续处理
+    python scripts/blob_worker.py --once       # 处理完当前到期的任务后退出
+    python scripts/blob_worker.py --backfill   # 先为已有的 blob 补建任务
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('BLOB_JOB_POLL_INTERVAL', '0')  # 不在 create_app 中再启动进程内 worker
+
+from app import create_app
+from app.database import db
+from app.services.blob_job_service import BlobJobService, make_worker_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--once', action='store_true', help='处理完当前到期的任务后退出')
+    parser.add_argument('--backfill', action='store_true', help='为已有的 blob 补建处理任务')
+    parser.add_argument('--interval', type=float, default=5, help='队列为空时的轮询间隔(秒)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    app = create_app()
+    worker_id = make_worker_id()
+    lock_timeout = app.config['BLOB_JOB_LOCK_TIMEOUT']
+
+    with app.app_context():
+        if args.backfill:
+            with db.connection_context():
+                print(f"enqueued jobs for {BlobJobService.backfill()} blobs")
+
+        while True:
+            with db.connection_context():
+                BlobJobService.requeue_stale(lock_timeout)
+                processed = BlobJobService.process_pending(worker_id)
+            if processed:
+                logging.info('processed %d blob jobs', processed)
+            elif args.once:
+                break
+            else:
+                time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -22,6 +22,7 @@ CREATE TABLE IF NOT EXISTS users (
     password VARCHAR(255) NOT NULL,
     role_id INTEGER NOT NULL,
     avatar VARCHAR(255),
+    token_version INTEGER NOT NULL DEFAULT 0,
     created_at DATETIME NOT NULL,
     updated_at DATETIME NOT NULL,
     created_by INTEGER,
@@ -49,10 +50,12 @@ CREATE TABLE IF NOT EXISTS blobs (
     mime_type VARCHAR(255) NOT NULL,
     file_size BIGINT NOT NULL,
     sha256 VARCHAR(64) NOT NULL,
+    ref_count INTEGER NOT NULL DEFAULT 0,
     created_at DATETIME NOT NULL,
     updated_at DATETIME NOT NULL,
     created_by INTEGER,
     updated_by INTEGER,
+    UNIQUE INDEX blobs_sha256 (sha256),
     FOREIGN KEY (created_by) REFERENCES users(id),
     FOREIGN KEY (updated_by) REFERENCES users(id)
 )CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
@@ -63,18 +66,81 @@ CREATE TABLE IF NOT EXISTS materials (
     category_ids VARCHAR(255) NOT NULL,
     blob_id INTEGER NOT NULL,
     description TEXT,
-    cover MEDIUMTEXT,
+    cover_blob_id INTEGER,
     publish_status VARCHAR(20) DEFAULT 'private',
+    comment_count INTEGER NOT NULL DEFAULT 0,
     created_at DATETIME NOT NULL,
     updated_at DATETIME NOT NULL,
     created_by INTEGER,
     updated_by INTEGER,
     material_type VARCHAR(20) DEFAULT 'upload',
     FOREIGN KEY (blob_id) REFERENCES blobs(id),
+    FOREIGN KEY (cover_blob_id) REFERENCES blobs(id) ON DELETE SET NULL,
     FOREIGN KEY (created_by) REFERENCES users(id),
     FOREIGN KEY (updated_by) REFERENCES users(id)
 )CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
 
+CREATE TABLE IF NOT EXISTS material_categories (
+    material_id INTEGER NOT NULL,
+    category_id INTEGER NOT NULL,
+    PRIMARY KEY (material_id, category_id),
+    UNIQUE INDEX materialcategory_category_id_material_id (category_id, material_id)
+)CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS upload_sessions (
+    id INTEGER PRIMARY KEY AUTO_INCREMENT,
+    upload_id VARCHAR(255) NOT NULL UNIQUE,
+    file_name VARCHAR(255) NOT NULL,
+    mime_type VARCHAR(255) NOT NULL,
+    total_size BIGINT,
+    part_size INTEGER NOT NULL,
+    status VARCHAR(255) NOT NULL,
+    blob_id INTEGER,
+    expires_at DATETIME NOT NULL,
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL,
+    created_by INTEGER,
+    updated_by INTEGER,
+    INDEX uploadsession_expires_at (expires_at),
+    FOREIGN KEY (blob_id) REFERENCES blobs(id) ON DELETE SET NULL,
+    FOREIGN KEY (created_by) REFERENCES users(id),
+    FOREIGN KEY (updated_by) REFERENCES users(id)
+)CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS upload_parts (
+    id INTEGER PRIMARY KEY AUTO_INCREMENT,
+    session_id INTEGER NOT NULL,
+    part_number INTEGER NOT NULL,
+    size BIGINT NOT NULL,
+    sha256 VARCHAR(64) NOT NULL,
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL,
+    UNIQUE INDEX uploadpart_session_id_part_number (session_id, part_number),
+    FOREIGN KEY (session_id) REFERENCES upload_sessions(id) ON DELETE CASCADE
+)CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS blob_jobs (
+    id INTEGER PRIMARY KEY AUTO_INCREMENT,
+    sha256 VARCHAR(255) NOT NULL,
+    kind VARCHAR(255) NOT NULL,
+    blob_id INTEGER,
+    status VARCHAR(255) NOT NULL,
+    attempts INTEGER NOT NULL,
+    max_attempts INTEGER NOT NULL,
+    run_after DATETIME NOT NULL,
+    locked_by VARCHAR(255),
+    locked_at DATETIME,
+    last_error TEXT,
+    result JSON,
+    result_blob_id INTEGER,
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL,
+    UNIQUE INDEX blobjob_sha256_kind (sha256, kind),
+    INDEX blobjob_status_run_after (status, run_after),
+    FOREIGN KEY (blob_id) REFERENCES blobs(id) ON DELETE SET NULL,
+    FOREIGN KEY (result_blob_id) REFERENCES blobs(id) ON DELETE SET NULL
+)CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
+
 CREATE TABLE IF NOT EXISTS comments (
     id INTEGER PRIMARY KEY AUTO_INCREMENT,
     material_id INTEGER NOT NULL,
@@ -90,6 +156,21 @@ CREATE TABLE IF NOT EXISTS comments (
     FOREIGN KEY (updated_by) REFERENCES users(id)
 )CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
 
+CREATE TABLE IF NOT EXISTS category_closure (
+    ancestor INTEGER NOT NULL,
+    descendant INTEGER NOT NULL,
+    depth INTEGER NOT NULL,
+    PRIMARY KEY (ancestor, descendant),
+    UNIQUE INDEX categoryclosure_descendant_ancestor (descendant, ancestor)
+)CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS cache_generations (
+    name VARCHAR(255) PRIMARY KEY,
+    generation BIGINT NOT NULL DEFAULT 0
+)CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
+
+INSERT INTO cache_generations (name, generation) VALUES ('categories', 0);
+
 -- 插入角色数据
 INSERT INTO roles (id, display_name, created_at, updated_at) VALUES
 (1, '管理员', NOW(), NOW()),
@@ -111,9 +192,40 @@ INSERT INTO categories (display_name, parent_id, created_at, updated_at, created
 ('试卷', 1, NOW(), NOW(), 1, 1),
 ('教学视频', NULL, NOW(), NOW(), 1, 1);
 
+-- 示例分类的闭包表数据 (示例数据只有两层)
+INSERT INTO category_closure (ancestor, descendant, depth)
+SELECT id, id, 0 FROM categories;
+INSERT INTO category_closure (ancestor, descendant, depth)
+SELECT parent_id, id, 1 FROM categories WHERE parent_id IS NOT NULL;
+
 -- 添加索引
 ALTER TABLE users ADD INDEX idx_username (username);
+ALTER TABLE users ADD INDEX users_role_id_id (role_id, id);
 ALTER TABLE materials ADD INDEX idx_blob_id (blob_id);
 ALTER TABLE comments ADD INDEX idx_material_id (material_id);
+ALTER TABLE comments ADD INDEX comments_material_id_created_at (material_id, created_at);
 ALTER TABLE comments ADD INDEX idx_user_id (user_id);
-ALTER TABLE categories ADD INDEX idx_parent_id (parent_id);
\ No newline at end of file
+ALTER TABLE categories ADD INDEX idx_parent_id (parent_id);
+ALTER TABLE materials ADD INDEX idx_created_at_id (created_at, id);
+ALTER TABLE materials ADD FULLTEXT INDEX ft_display_name (display_name) WITH PARSER ngram;
+ALTER TABLE materials ADD FULLTEXT INDEX ft_description (description) WITH PARSER ngram;
+
+-- 记录已包含在本脚本中的迁移 (见 scripts/migrate.py)
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    name VARCHAR(255) PRIMARY KEY,
+    applied_at DATETIME NOT NULL
+)CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
+
+INSERT INTO schema_migrations (name, applied_at) VALUES
+('0001_material_keyset_index.py', NOW()),
+('0002_category_closure.py', NOW()),
+('0003_cache_generations.py', NOW()),
+('0004_material_categories.py', NOW()),
+('0005_material_fulltext.py', NOW()),
+('0006_upload_sessions.py', NOW()),
+('0007_blob_sha256_unique.py', NOW()),
+    ('0008_user_token_version.py', NOW()),
+    ('0009_user_role_index.py', NOW()),
+    ('0010_comment_counts.py', NOW()),
+    ('0011_blob_jobs.py', NOW()),
+    ('0012_material_cover_blobs.py', NOW());
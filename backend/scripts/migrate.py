@@ -0,0 +1,54 @@
+"""
+数据库迁移脚本
+
+按文件名顺序执行 scripts/migrations 下尚未执行的迁移，已执行的迁移记录在 schema_migrations 表中。
+每个迁移文件需提供 upgrade(db) 函数。
+
+    python scripts/migrate.py
+"""
+import importlib.util
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from peewee import Model, CharField, DateTimeField
+from app.database import db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+
+class SchemaMigration(Model):
+    name = CharField(primary_key=True)
+    applied_at = DateTimeField(default=datetime.now)
+
+    class Meta:
+        database = db
+        table_name = 'schema_migrations'
+
+
+def _load(name):
+    spec = importlib.util.spec_from_file_location(name[:-3], os.path.join(MIGRATIONS_DIR, name))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def main():
+    with db.connection_context():
+        db.create_tables([SchemaMigration])
+        applied = {row.name for row in SchemaMigration.select()}
+
+        for name in sorted(os.listdir(MIGRATIONS_DIR)):
+            if not name.endswith('.py') or name in applied:
+                continue
+            print(f'Applying {name} ...')
+            with db.atomic():
+                _load(name).upgrade(db)
+                SchemaMigration.create(name=name)
+        print('Done.')
+
+
+if __name__ == '__main__':
+    main()
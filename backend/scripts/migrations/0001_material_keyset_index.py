@@ -0,0 +1,9 @@
+"""为教材游标分页添加 (created_at, id) 索引"""
+from playhouse.migrate import SchemaMigrator, migrate
+
+
+def upgrade(db):
+    migrator = SchemaMigrator.from_database(db)
+    migrate(
+        migrator.add_index('materials', ('created_at', 'id'), False),
+    )
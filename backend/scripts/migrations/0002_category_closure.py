@@ -0,0 +1,22 @@
+"""创建分类闭包表 category_closure，并根据现有 categories.parent_id 回填"""
+from app.models.category import Category, CategoryClosure
+
+BATCH_SIZE = 1000
+
+
+def upgrade(db):
+    db.create_tables([CategoryClosure])
+
+    parents = {row.id: row.parent_id for row in Category.select(Category.id, Category.parent_id)}
+    rows = []
+    for category_id in parents:
+        # 沿 parent_id 向上遍历，遇到缺失的父分类或环时停止
+        ancestor, depth, seen = category_id, 0, set()
+        while ancestor is not None and ancestor in parents and ancestor not in seen:
+            seen.add(ancestor)
+            rows.append({'ancestor': ancestor, 'descendant': category_id, 'depth': depth})
+            ancestor, depth = parents[ancestor], depth + 1
+
+    CategoryClosure.delete().execute()
+    for start in range(0, len(rows), BATCH_SIZE):
+        CategoryClosure.insert_many(rows[start:start + BATCH_SIZE]).execute()
@@ -0,0 +1,7 @@
+"""创建进程间共享的缓存版本号表 cache_generations"""
+from app.models.cache_generation import CacheGeneration
+
+
+def upgrade(db):
+    db.create_tables([CacheGeneration])
+    CacheGeneration.insert(name='categories', generation=0).on_conflict_ignore().execute()
@@ -0,0 +1,25 @@
+"""创建教材-分类关联表 material_categories，并拆分现有的 materials.category_ids 字符串回填"""
+from app.models.material import Material, MaterialCategory, parse_category_ids
+
+BATCH_SIZE = 1000
+
+
+def upgrade(db):
+    db.create_tables([MaterialCategory])
+    MaterialCategory.delete().execute()
+
+    rows = []
+    for material in Material.select(Material.id, Material.category_ids).iterator():
+        try:
+            category_ids = parse_category_ids(material.category_ids)
+        except ValueError:
+            # 历史数据中的非数字片段直接忽略，不中断迁移
+            category_ids = parse_category_ids(material.category_ids, skip_invalid=True)
+            print(f'  material {material.id}: ignored invalid category_ids {material.category_ids!r}')
+        for category_id in set(category_ids):
+            rows.append({'material_id': material.id, 'category_id': category_id})
+        if len(rows) >= BATCH_SIZE:
+            MaterialCategory.insert_many(rows).execute()
+            rows = []
+    if rows:
+        MaterialCategory.insert_many(rows).execute()
@@ -0,0 +1,9 @@
+"""为教材名称和描述添加 FULLTEXT 索引(ngram 分词器，支持中文)，仅 MySQL 需要"""
+from peewee import MySQLDatabase
+
+
+def upgrade(db):
+    if not isinstance(db, MySQLDatabase):
+        return
+    db.execute_sql('ALTER TABLE materials ADD FULLTEXT INDEX ft_display_name (display_name) WITH PARSER ngram')
+    db.execute_sql('ALTER TABLE materials ADD FULLTEXT INDEX ft_description (description) WITH PARSER ngram')
@@ -0,0 +1,6 @@
+"""创建分片上传会话表 upload_sessions 和分片表 upload_parts"""
+from app.models.upload_session import UploadSession, UploadPart
+
+
+def upgrade(db):
+    db.create_tables([UploadSession, UploadPart])
@@ -0,0 +1,33 @@
+"""
+blobs.sha256 去重并添加唯一索引，新增引用计数列 ref_count
+重复的 blob 保留 ID 最小的一条，教材引用改指向保留的记录
+"""
+import os
+from peewee import fn, IntegerField
+from playhouse.migrate import SchemaMigrator, migrate
+from app.models.blob import Blob
+from app.models.material import Material
+
+
+def upgrade(db):
+    migrator = SchemaMigrator.from_database(db)
+    migrate(migrator.add_column('blobs', 'ref_count', IntegerField(default=0)))
+
+    duplicates = (Blob
+                  .select(Blob.sha256, fn.MIN(Blob.id).alias('keep_id'))
+                  .group_by(Blob.sha256)
+                  .having(fn.COUNT(Blob.id) > 1))
+    for row in duplicates.dicts():
+        keeper = Blob.get_by_id(row['keep_id'])
+        for blob in Blob.select().where((Blob.sha256 == row['sha256']) & (Blob.id != keeper.id)):
+            Material.update(blob_id=keeper.id).where(Material.blob_id == blob.id).execute()
+            blob.delete_instance()
+            if blob.file_path != keeper.file_path and os.path.exists(blob.file_path):
+                os.remove(blob.file_path)
+
+    migrate(migrator.add_index('blobs', ('sha256',), True))
+
+    references = (Material
+                  .select(fn.COUNT(Material.id))
+                  .where(Material.blob_id == Blob.id))
+    Blob.update(ref_count=references).execute()
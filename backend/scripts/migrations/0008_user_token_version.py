@@ -0,0 +1,8 @@
+"""users 表新增 token_version 列，用于吊销已签发的 token"""
+from peewee import IntegerField
+from playhouse.migrate import SchemaMigrator, migrate
+
+
+def upgrade(db):
+    migrator = SchemaMigrator.from_database(db)
+    migrate(migrator.add_column('users', 'token_version', IntegerField(default=0)))
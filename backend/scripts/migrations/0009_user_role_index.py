@@ -0,0 +1,9 @@
+"""为用户列表按角色筛选 + 游标分页添加 (role_id, id) 索引"""
+from playhouse.migrate import SchemaMigrator, migrate
+
+
+def upgrade(db):
+    migrator = SchemaMigrator.from_database(db)
+    migrate(
+        migrator.add_index('users', ('role_id', 'id'), False),
+    )
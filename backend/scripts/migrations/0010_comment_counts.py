@@ -0,0 +1,24 @@
+"""
+materials 表新增评论数列 comment_count 并按现有评论回填
+comments 表添加 (material_id, created_at) 索引，用于按教材分页读取评论
+"""
+from peewee import IntegerField, fn
+from playhouse.migrate import SchemaMigrator, migrate
+from app.models.comment import Comment
+from app.models.material import Material
+
+
+def upgrade(db):
+    migrator = SchemaMigrator.from_database(db)
+    migrate(
+        migrator.add_column('materials', 'comment_count', IntegerField(default=0)),
+        migrator.add_index('comments', ('material_id', 'created_at'), False),
+    )
+
+    counts = (Comment
+              .select(Comment.material, fn.COUNT(Comment.id))
+              .group_by(Comment.material)
+              .tuples())
+    with db.atomic():
+        for material_id, count in counts:
+            Material.update(comment_count=count).where(Material.id == material_id).execute()
@@ -0,0 +1,6 @@
+"""创建上传后处理任务表 blob_jobs，已有的 blob 可通过 python scripts/blob_worker.py --backfill 补建任务"""
+from app.models.blob_job import BlobJob
+
+
+def upgrade(db):
+    db.create_tables([BlobJob])
@@ -0,0 +1,108 @@
+"""
+教材封面从 materials.cover 中的 base64 文本迁移为 blob
+
+materials 表新增 cover_blob_id，逐条解码已有封面并保存为 blob(内容相同的封面只保存一份)，
+然后删除 cover 列。无法解析的封面会被丢弃并打印教材ID。
+
+迁移只依赖 BlobService.store_file，不经过教材服务的校验逻辑；封面不创建后台处理任务，
+需要缩略图等结果时执行 python scripts/blob_worker.py --backfill 补建。
+每条封面转换后立即清空 cover，列的增删按现有表结构判断，中途失败后可以重新执行。
+"""
+import base64
+import binascii
+import hashlib
+import mimetypes
+import os
+import re
+from flask import Flask
+from peewee import ForeignKeyField
+from playhouse.migrate import SchemaMigrator, migrate
+from app.config import Config
+from app.models.blob import Blob
+from app.services.blob_service import BlobService
+
+# 迁移时的规则固定下来，不随教材服务的后续修改而变化
+COVER_MAX_SIZE = 2 * 1024 * 1024
+DATA_URL_PATTERN = re.compile(r'^data:(?P<mime>[\w.+-]+/[\w.+-]+)?(?:;[^,;]+)*;base64,', re.IGNORECASE)
+
+
+def _app():
+    """BlobService 需要应用上下文来获取存储后端，上传目录与 create_app 中的设置一致"""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config['UPLOAD_FOLDER'] = 'uploads'
+    return app
+
+
+def _decode(cover: str):
+    """解析 base64 / data URL 格式的封面，返回 (图片内容, MIME 类型)，无法解析时抛出 ValueError"""
+    cover = cover.strip()
+    match = DATA_URL_PATTERN.match(cover)
+    mime_type = ((match.group('mime') if match else None) or 'image/jpeg').lower()
+    if not mime_type.startswith('image/'):
+        raise ValueError('not an image')
+    payload = cover[match.end():] if match else cover
+    try:
+        content = base64.b64decode(''.join(payload.split()), validate=True)
+    except (binascii.Error, ValueError):
+        raise ValueError('invalid base64')
+    if not content:
+        raise ValueError('empty image')
+    if len(content) > COVER_MAX_SIZE:
+        raise ValueError(f'larger than {COVER_MAX_SIZE} bytes')
+    return content, mime_type
+
+
+def _store(content: bytes, mime_type: str) -> int:
+    """保存为 blob 并返回其ID，返回的 blob 已为教材持有一个引用"""
+    fd, temp_path = BlobService.create_temp_file()
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        file_name = f"cover{mimetypes.guess_extension(mime_type) or ''}"
+        blob = BlobService.store_file(temp_path, file_name, mime_type, len(content),
+                                      hashlib.sha256(content).hexdigest(), process=False, acquire=True)
+        return blob.id
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def upgrade(db):
+    migrator = SchemaMigrator.from_database(db)
+    columns = {column.name for column in db.get_columns('materials')}
+    if 'cover_blob_id' not in columns:
+        migrate(
+            migrator.add_column(
+                'materials', 'cover_blob_id',
+                ForeignKeyField(Blob, null=True, field=Blob.id, on_delete='SET NULL', column_name='cover_blob_id')
+            ),
+        )
+    if 'cover' not in columns:
+        return
+
+    # 先取ID再逐条读取封面，避免一次性把所有 base64 文本读入内存；已转换的记录 cover 为空
+    material_ids = [row[0] for row in db.execute_sql(
+        "SELECT id FROM materials WHERE cover IS NOT NULL AND cover <> '' ORDER BY id"
+    ).fetchall()]
+    converted = 0
+    with _app().app_context():
+        for material_id in material_ids:
+            cover = db.execute_sql('SELECT cover FROM materials WHERE id = %s' % db.param, (material_id,)).fetchone()[0]
+            try:
+                content, mime_type = _decode(cover)
+            except ValueError as e:
+                print(f'  material {material_id}: cover dropped ({e})')
+                cover_blob_id = None
+            else:
+                cover_blob_id = _store(content, mime_type)
+                converted += 1
+            db.execute_sql(
+                'UPDATE materials SET cover_blob_id = %s, cover = NULL WHERE id = %s' % (db.param, db.param),
+                (cover_blob_id, material_id)
+            )
+    if converted:
+        print(f'  {converted} covers stored as blobs; run python scripts/blob_worker.py --backfill '
+              f'to generate their thumbnails')
+
+    migrate(migrator.drop_column('materials', 'cover'))
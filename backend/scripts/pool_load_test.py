@@ -0,0 +1,55 @@
+"""
+连接池本地压测脚本
+
+使用 SQLite 作为后端，无需 MySQL 即可验证连接池的借出/归还逻辑:
+
+    DB_ENGINE=sqlite DB_MAX_CONNECTIONS=8 python scripts/pool_load_test.py --threads 32 --requests 200
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault('DB_ENGINE', 'sqlite')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.database import db
+
+
+def main():
+    parser = argparse.ArgumentParser(description='连接池压测')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=100, help='每个线程发出的请求数')
+    parser.add_argument('--hold', type=float, default=0.005, help='每个请求占用连接的秒数')
+    args = parser.parse_args()
+
+    app = create_app()
+
+    @app.route('/_pool_probe')
+    def _pool_probe():
+        db.execute_sql('SELECT 1')
+        time.sleep(args.hold)
+        return 'OK'
+
+    def worker(_):
+        client = app.test_client()
+        failures = 0
+        for _ in range(args.requests):
+            if client.get('/_pool_probe').status_code != 200:
+                failures += 1
+        return failures
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        failures = sum(executor.map(worker, range(args.threads)))
+    elapsed = time.perf_counter() - start
+
+    total = args.threads * args.requests
+    print(f'requests: {total}, failures: {failures}, elapsed: {elapsed:.2f}s, rps: {total / elapsed:.0f}')
+    print('pool:', db.pool_stats())
+
+
+if __name__ == '__main__':
+    main()
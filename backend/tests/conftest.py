@@ -0,0 +1,25 @@
+import os
+import sys
+import tempfile
+
+# 测试使用临时 SQLite 库，需在导入 app 之前设置
+os.environ['DB_ENGINE'] = 'sqlite'
+os.environ['DB_SQLITE_PATH'] = os.path.join(tempfile.mkdtemp(), 'test.db')
+os.environ['SEARCH_BACKEND'] = 'memory'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from app.database import db
+from app.models import User, Role, Category, CategoryClosure, Blob, Material, MaterialCategory
+
+
+@pytest.fixture
+def database():
+    """每个测试使用空表，结束后删除"""
+    models = [User, Role, Category, CategoryClosure, Blob, Material, MaterialCategory]
+    with db.connection_context():
+        db.create_tables(models)
+        try:
+            yield db
+        finally:
+            db.drop_tables(models)
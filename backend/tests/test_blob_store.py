@@ -0,0 +1,107 @@
+import io
+import os
+from urllib.parse import parse_qs, urlparse
+import pytest
+from app.services.blob_store import BlobStore, LocalBlobStore, S3BlobStore
+
+BUCKET = 'teaching-material'
+SHA256 = 'ab' * 32
+
+
+def test_blob_store_is_abstract():
+    with pytest.raises(TypeError):
+        BlobStore()
+
+
+@pytest.fixture
+def s3_store(monkeypatch):
+    # S3 后端为可选依赖，未安装 boto3 / moto 时跳过
+    boto3 = pytest.importorskip('boto3')
+    moto = pytest.importorskip('moto')
+    for name, value in (('AWS_ACCESS_KEY_ID', 'testing'), ('AWS_SECRET_ACCESS_KEY', 'testing'),
+                        ('AWS_DEFAULT_REGION', 'us-east-1')):
+        monkeypatch.setenv(name, value)
+    with moto.mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket=BUCKET)
+        yield S3BlobStore(bucket=BUCKET, prefix='/blobs/', fanout_depth=2, client=client)
+
+
+def test_s3_put_file_open_exists_delete(s3_store, tmp_path):
+    local_path = tmp_path / 'upload.part'
+    local_path.write_bytes(b'hello blob')
+    key = s3_store.key_for(SHA256, '讲义 1.pdf')
+    assert key == f'ab/ab/{SHA256}_1.pdf'
+
+    s3_store.put_file(str(local_path), key, 'application/pdf')
+    # 与本地存储一致，存入后本地临时文件被删除
+    assert not local_path.exists()
+    assert s3_store.exists(key)
+    assert s3_store.size(key) == 10
+    with s3_store.open(key) as body:
+        assert body.read() == b'hello blob'
+    head = s3_store.client.head_object(Bucket=BUCKET, Key=f'blobs/{key}')
+    assert head['ContentType'] == 'application/pdf'
+
+    s3_store.delete(key)
+    assert not s3_store.exists(key)
+    with pytest.raises(FileNotFoundError):
+        s3_store.size(key)
+    # 删除不存在的对象不报错
+    s3_store.delete(key)
+
+
+def test_s3_put_stream(s3_store):
+    key = s3_store.key_for(SHA256, 'a.txt')
+    s3_store.put_stream(io.BytesIO(b'streamed'), key, 'text/plain')
+    with s3_store.open(key) as body:
+        assert body.read() == b'streamed'
+    assert s3_store.local_path(key) is None
+
+
+def test_s3_presigned_url(s3_store):
+    key = s3_store.key_for(SHA256, 'a.pdf')
+    s3_store.put_stream(io.BytesIO(b'%PDF'), key, 'application/pdf')
+
+    url = urlparse(s3_store.presigned_url(key, 'a.pdf', 'application/pdf'))
+    params = parse_qs(url.query)
+    assert url.path.endswith(f'/blobs/{key}')
+    assert params['response-content-type'] == ['application/pdf']
+    assert params['response-content-disposition'] == ['inline; filename="a.pdf"']
+    assert 'X-Amz-Signature' in params or 'Signature' in params
+
+
+def test_local_put_file_open_delete(tmp_path):
+    store = LocalBlobStore(str(tmp_path / 'uploads'))
+    local_path = tmp_path / 'upload.part'
+    local_path.write_bytes(b'local')
+    key = store.key_for(SHA256, 'a.txt')
+
+    store.put_file(str(local_path), key)
+    assert not local_path.exists()
+    assert store.exists(key) and store.size(key) == 5
+    with store.open(key) as f:
+        assert f.read() == b'local'
+    assert store.presigned_url(key, 'a.txt', 'text/plain') is None
+
+    store.delete(key)
+    assert not store.exists(key)
+
+
+def test_local_put_stream_removes_temp_file_on_failure(tmp_path):
+    store = LocalBlobStore(str(tmp_path / 'uploads'))
+    key = store.key_for(SHA256, 'a.txt')
+
+    class BrokenStream(io.BytesIO):
+        def read(self, *args):
+            raise IOError('client disconnected')
+
+    with pytest.raises(IOError):
+        store.put_stream(BrokenStream(), key)
+    assert not store.exists(key)
+    assert os.listdir(os.path.dirname(store.local_path(key))) == []
+
+    store.put_stream(io.BytesIO(b'stream'), key)
+    with store.open(key) as f:
+        assert f.read() == b'stream'
+    assert os.listdir(os.path.dirname(store.local_path(key))) == [os.path.basename(store.local_path(key))]
@@ -0,0 +1,36 @@
+import pytest
+from app.services.password_service import PASSWORD_MAX_BYTES, PasswordHasher, password_too_long
+
+
+@pytest.fixture
+def hasher():
+    # 单进程执行，测试中不启动进程池
+    hasher = PasswordHasher('bcrypt', 4, workers=0, max_pending=4, timeout=10)
+    yield hasher
+    hasher.shutdown()
+
+
+def test_password_too_long_counts_utf8_bytes():
+    assert not password_too_long('a' * PASSWORD_MAX_BYTES)
+    assert password_too_long('a' * (PASSWORD_MAX_BYTES + 1))
+    assert password_too_long('密' * 25)  # 75 字节
+
+
+def test_verify_over_long_password_against_bcrypt_hash(hasher):
+    password = 'a' * PASSWORD_MAX_BYTES
+    password_hash = hasher.hash(password)
+    assert hasher.verify(password, password_hash)
+    # 新版 bcrypt 对超过 72 字节的密码抛出 ValueError，这里应视为不匹配
+    assert not hasher.verify(password + 'b', password_hash)
+
+
+def test_import_rejects_over_long_password(database, hasher, monkeypatch):
+    from app.services import user_service
+    monkeypatch.setattr(user_service, 'password_hasher', hasher)
+    report = user_service.UserService.import_users(
+        [{'username': 'short', 'password': 'secret'},
+         {'username': 'long', 'password': 'a' * (PASSWORD_MAX_BYTES + 1)}],
+        current_user_role_id=1, current_user_id=None, default_role_id=3
+    )
+    assert [row['status'] for row in report['results']] == ['created', 'error']
+    assert 'long' not in {user.username for user in user_service.User.select()}
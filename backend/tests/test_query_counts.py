@@ -0,0 +1,34 @@
+"""列表接口的 SQL 条数上限，防止 N+1 查询回归；上限与数据量无关"""
+import pytest
+from app.models import User, Role, Category, Blob, Material
+from app.services.material import MaterialService
+from app.services.category_service import CategoryService
+from app.services.role_service import RoleService
+from app.utils.query_counter import assert_max_queries
+
+ROWS = 50
+
+
+@pytest.fixture
+def seeded(database):
+    user = User.create(username='admin', password='x', role_id=1)
+    Role.create(display_name='admin', created_by=user, updated_by=user)
+    for i in range(ROWS):
+        category = Category.create(display_name=f'category {i}', created_by=user, updated_by=user)
+        blob = Blob.create(file_name=f'{i}.html', file_path=f'{i}.html', mime_type='text/html',
+                           file_size=1, sha256=f'{i:064d}', created_by=user, updated_by=user)
+        Material.create(display_name=f'material {i}', category_ids=str(category.id), blob_id=blob,
+                        material_type='create', created_by=user, updated_by=user)
+    return database
+
+
+@pytest.mark.parametrize('call, limit', [
+    pytest.param(lambda: MaterialService.get_materials(page_size=100), 2, id='materials page'),
+    pytest.param(lambda: MaterialService.get_materials(page_size=100, cursor=''), 1, id='materials cursor'),
+    pytest.param(lambda: CategoryService.get_all_categories(), 1, id='categories'),
+    pytest.param(lambda: [role.to_json() for role in RoleService.get_all_roles()], 1, id='roles'),
+])
+def test_list_query_count(seeded, call, limit):
+    with assert_max_queries(limit):
+        result = call()
+    assert result
@@ -0,0 +1,100 @@
+import sqlite3
+import pytest
+from app.models import Blob, Material
+from app.services.search_service import InvertedIndexSearch, SearchEngine, tokenize
+
+
+def _create_material(display_name, description=None):
+    blob = Blob.create(file_name='a.pdf', file_path=f'{display_name}.pdf', mime_type='application/pdf',
+                       file_size=1, sha256=f'{Blob.select().count():064d}')
+    return Material.create(display_name=display_name, description=description, category_ids='1', blob_id=blob)
+
+
+def _search(engine, field, keyword):
+    query, score = engine.apply(Material.select(Material.id, Material.display_name), field, keyword)
+    if score is not None:
+        query = query.order_by(score.desc(), Material.id.desc())
+    return [material.display_name for material in query]
+
+
+def test_search_engine_is_abstract():
+    with pytest.raises(TypeError):
+        SearchEngine()
+
+
+def test_tokenize_splits_ascii_words_and_cjk_ngrams():
+    assert tokenize('Python 数据结构') == ['python', '数据', '据结', '结构']
+    assert tokenize('C语') == ['c', '语']
+
+
+def test_ranking_by_term_frequency(database):
+    _create_material('线性代数', '矩阵 矩阵 矩阵 行列式')
+    _create_material('高等数学', '极限 矩阵')
+    _create_material('概率论', '随机变量')
+    engine = InvertedIndexSearch()
+
+    assert _search(engine, 'description', '矩阵') == ['线性代数', '高等数学']
+
+
+def test_all_terms_must_match(database):
+    _create_material('python basics', 'variables and loops')
+    _create_material('python web', 'flask and loops')
+    engine = InvertedIndexSearch()
+
+    assert _search(engine, 'description', 'flask loops') == ['python web']
+    assert _search(engine, 'description', 'flask django') == []
+
+
+def test_prefix_matching(database):
+    _create_material('Programming in Python')
+    _create_material('Program design')
+    _create_material('Prolog')
+    engine = InvertedIndexSearch()
+
+    assert sorted(_search(engine, 'display_name', 'progr')) == ['Program design', 'Programming in Python']
+    assert _search(engine, 'display_name', 'pyth') == ['Programming in Python']
+
+
+def test_incremental_index_and_remove(database):
+    first = _create_material('操作系统')
+    engine = InvertedIndexSearch()
+    assert _search(engine, 'display_name', '操作') == ['操作系统']
+
+    # 索引加载后，新增、修改和删除都通过 index/remove 增量更新
+    second = _create_material('操作系统实验')
+    engine.index(second)
+    assert sorted(_search(engine, 'display_name', '操作')) == ['操作系统', '操作系统实验']
+
+    first.display_name = '计算机网络'
+    first.save()
+    engine.index(first)
+    assert _search(engine, 'display_name', '操作') == ['操作系统实验']
+    assert _search(engine, 'display_name', '网络') == ['计算机网络']
+
+    Material.delete_by_id(second.id)
+    engine.remove(second.id)
+    assert _search(engine, 'display_name', '操作') == []
+
+
+def test_hits_are_capped_to_top_scores(database):
+    for i in range(5):
+        _create_material(f'doc {i}', ' '.join(['matrix'] * (i + 1)))
+    engine = InvertedIndexSearch(max_hits=2)
+
+    assert _search(engine, 'description', 'matrix') == ['doc 4', 'doc 3']
+
+
+def test_many_hits_stay_within_parameter_limit(database):
+    Blob.insert_many([
+        {'file_name': 'a.pdf', 'file_path': f'{i}.pdf', 'mime_type': 'application/pdf', 'file_size': 1,
+         'sha256': f'{i:064d}'}
+        for i in range(1000)
+    ]).execute()
+    Material.insert_many([
+        {'display_name': f'lecture {i}', 'category_ids': '1', 'blob_id': i + 1} for i in range(1000)
+    ]).execute()
+    # SQLite 3.32 之前的默认参数个数上限
+    database.connection().setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+    engine = InvertedIndexSearch()
+
+    assert len(_search(engine, 'display_name', 'lecture')) == engine.max_hits
@@ -0,0 +1,31 @@
+from app.models import User
+from app.utils.token_cache import TokenVersionRegistry
+
+
+def test_refresh_keeps_versions_set_during_the_snapshot(database, monkeypatch):
+    user = User.create(username='student', password='x', role_id=3, token_version=0)
+    other = User.create(username='other', password='x', role_id=3, token_version=5)
+    registry = TokenVersionRegistry()
+    registry.set(other.id, 4)  # 查询开始前的 set 以快照为准
+
+    select = User.select
+
+    def select_then_revoke(*fields):
+        # 模拟刷新读库之后、替换映射之前，另一个请求吊销了该用户的 token
+        query = select(*fields)
+        rows = list(query.tuples())
+        User.update(token_version=1).where(User.id == user.id).execute()
+        registry.set(user.id, 1)
+        monkeypatch.setattr(User, 'select', select)
+
+        class Snapshot:
+            def tuples(self):
+                return rows
+        return Snapshot()
+
+    monkeypatch.setattr(User, 'select', select_then_revoke)
+    registry.refresh()
+
+    assert registry.is_current(user.id, 1)
+    assert not registry.is_current(user.id, 0)
+    assert registry.is_current(other.id, 5)
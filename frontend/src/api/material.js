@@ -14,6 +14,7 @@ export const materialApi = {
      * @param {string} [params.description] - 描述关键词（模糊查询）
      * @param {string} [params.category_ids] - 分类ID列表（逗号分隔）
      * @param {string} [params.type] - 教材类型 (upload/create)
+     * @param {string} [params.include] - 需要返回的大字段(逗号分隔)，如 description
      * @returns {Promise<{data: {items: Array, total: number}, message: string}>}
      */
     getAllMaterials(params = {}) {
@@ -24,7 +25,8 @@ export const materialApi = {
                 display_name: params.display_name,
                 description: params.description,
                 category_ids: params.category_ids,
-                type: params.type
+                type: params.type,
+                include: params.include
             }
         });
     },
@@ -36,7 +38,7 @@ export const materialApi = {
      * @param {string} data.display_name - 教材名称
      * @param {string} data.category_ids - 分类ID列表
      * @param {string} data.description - 教材描述
-     * @param {string} data.cover - 封面图片(base64)
+     * @param {string} data.cover - 封面图片(base64)，保存为文件，列表中返回 cover_blob_id
      * @param {number} data.blob_id - 文件ID
      * @param {string} data.type - 教材类型 (upload/create)
      */